@@ -1,9 +1,11 @@
 from anonymizer.utils.data_processing import convert_to_string, check_columns, check_nan_fields
+from anonymizer.utils.registry import register_algorithm
 from Crypto.Cipher import AES, ChaCha20, Salsa20
 from Crypto.Util.Padding import pad
 from Crypto.Random import get_random_bytes
 import hashlib
 
+@register_algorithm('encrypt.chacha20', column_local=True)
 def encrypt_chacha20(df, columns, semaphore, **configuration):
     """
     Encrypts the values in the specified columns of the DataFrame using the ChaCha20 cipher.
@@ -51,6 +53,7 @@ def encrypt_chacha20(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('encrypt.aes', deterministic=True, column_local=True)
 def encrypt_aes(df, columns, semaphore, **configuration):
     """
     Encrypts the values in the specified columns of the DataFrame using the AES cipher.
@@ -94,6 +97,7 @@ def encrypt_aes(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('encrypt.salsa20', column_local=True)
 def encrypt_salsa20(df, columns, semaphore, **configuration):
     """
     Encrypts the values in the specified columns of the DataFrame using the Salsa20 cipher.
@@ -1,5 +1,9 @@
 from anonymizer.utils.data_processing import convert_to_numeric, check_nan_fields, check_columns
+from anonymizer.utils.registry import register_algorithm
+import numpy as np
+import pandas as pd
 
+@register_algorithm('generalize.percent', deterministic=True, column_local=True, cost='low')
 def percent_generalization(df, columns, semaphore, **configuration):
     """
     Applies a percent based generalization technique to one or more columns of a DataFrame.
@@ -27,6 +31,7 @@ def percent_generalization(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('generalize.age', deterministic=True, column_local=True, cost='low')
 def age_generalization(df, columns, semaphore, **configuration):
     """
     Applies a age based generalization technique to one or more columns of a DataFrame.
@@ -54,6 +59,170 @@ def age_generalization(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('generalize.mondrian', deterministic=True)
+def mondrian_generalization(df, columns, semaphore, **configuration):
+    """
+    Applies the Mondrian multidimensional generalization to the quasi-identifier columns of a DataFrame, so that
+    every combination of their generalized values is shared by at least k rows.
+
+    The rows are recursively split at the median of the quasi-identifier with the widest normalized range, as long
+    as both halves keep at least k rows. The values of each final partition are then generalized to their range
+    ("[min, max]") for numeric columns, or to their set ("{a, b}") for the other columns.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the data.
+        columns (list): Name of the quasi-identifier column(s) to be generalized.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        configuration (dict): A dictionary containing the generalization configuration parameters.
+            - k (int): Minimum number of rows of each partition.
+
+    Returns:
+        dict: The number of partitions and the size of the smallest one.
+    """
+    k = configuration.get('k')
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise ValueError("K should be a positive integer.")
+
+    check_columns(df, columns, semaphore)
+    check_nan_fields(df, columns, semaphore)
+
+    if len(df) < k:
+        raise ValueError("The data has fewer rows than k.")
+
+    semaphore.acquire()
+    try:
+        dimensions = [mondrian_dimension(df[column]) for column in columns]
+        partition_ids, partition_sizes = mondrian_partitions([codes for codes, _, _ in dimensions], [positions for _, positions, _ in dimensions], k)
+
+        for column, (codes, positions, labels) in zip(columns, dimensions):
+            df[column] = mondrian_labels(codes, partition_ids, len(partition_sizes), positions, labels)[partition_ids]
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return {"partitions": len(partition_sizes), "smallest_partition": int(partition_sizes.min())}
+
+def mondrian_dimension(values):
+    """
+    Encodes a quasi-identifier column as the ranks of its sorted distinct values.
+
+    Returns:
+        tuple: The rank of each row, the position of each distinct value (its numeric value, or its rank for
+            non-numeric columns), and the label of each distinct value, or None for numeric columns.
+    """
+    numeric = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+    if not numeric.isnull().any() and not pd.api.types.is_bool_dtype(numeric):
+        positions, codes = np.unique(numeric.to_numpy(), return_inverse=True)
+        return codes.astype(np.int64), positions.astype(float), None
+
+    codes, labels = pd.factorize(values.astype(str), sort=True)
+    return codes.astype(np.int64), np.arange(len(labels), dtype=float), np.asarray(labels, dtype=object)
+
+def mondrian_partitions(codes, positions, k):
+    """
+    Splits the rows into Mondrian partitions of at least k rows each.
+
+    Each partition keeps, for every dimension, the indexes of its rows sorted by that dimension. A median cut is then
+    a prefix of the sorted indexes of the cut dimension, and the other dimensions are split by filtering their sorted
+    indexes, which keeps them sorted without sorting again.
+
+    Args:
+        codes (list): The value rank of each row, one numpy array per dimension.
+        positions (list): The position of each distinct value, one numpy array per dimension.
+        k (int): Minimum number of rows of each partition.
+
+    Returns:
+        tuple: The partition of each row, and the size of each partition, as numpy arrays.
+    """
+    row_count = len(codes[0])
+    extents = [max(dimension_positions[-1] - dimension_positions[0], 1e-12) for dimension_positions in positions]
+    in_left = np.zeros(row_count, dtype=bool)
+
+    partition_ids = np.empty(row_count, dtype=np.int64)
+    partition_sizes = []
+    pending = [[np.argsort(dimension_codes, kind='stable') for dimension_codes in codes]]
+
+    while pending:
+        sorted_indexes = pending.pop()
+        size = len(sorted_indexes[0])
+        cut = mondrian_cut(sorted_indexes, codes, positions, extents, k) if size >= 2 * k else None
+
+        if cut is None:
+            partition_ids[sorted_indexes[0]] = len(partition_sizes)
+            partition_sizes.append(size)
+            continue
+
+        dimension, split = cut
+        left_rows = sorted_indexes[dimension][:split]
+        in_left[left_rows] = True
+        left, right = [], []
+        for dimension_indexes in sorted_indexes:
+            mask = in_left[dimension_indexes]
+            left.append(dimension_indexes[mask])
+            right.append(dimension_indexes[~mask])
+        in_left[left_rows] = False
+
+        pending.append(right)
+        pending.append(left)
+
+    return partition_ids, np.asarray(partition_sizes, dtype=np.int64)
+
+def mondrian_cut(sorted_indexes, codes, positions, extents, k):
+    """
+    Chooses the cut of a partition: the median of its widest dimension, relative to the whole data, that leaves at
+    least k rows on each side. Rows with the median value stay on the same side, so the sides have disjoint ranges.
+
+    Returns:
+        tuple: The dimension and the number of rows of the left side, or None when the partition cannot be cut.
+    """
+    size = len(sorted_indexes[0])
+    widths = []
+    for dimension, dimension_indexes in enumerate(sorted_indexes):
+        low, high = codes[dimension][dimension_indexes[0]], codes[dimension][dimension_indexes[-1]]
+        if high > low:
+            widths.append(((positions[dimension][high] - positions[dimension][low]) / extents[dimension], dimension))
+
+    for _, dimension in sorted(widths, reverse=True):
+        sorted_codes = codes[dimension][sorted_indexes[dimension]]
+        median = sorted_codes[(size - 1) // 2]
+        for side in ('right', 'left'):
+            split = int(np.searchsorted(sorted_codes, median, side=side))
+            if split >= k and size - split >= k:
+                return dimension, split
+
+    return None
+
+def mondrian_labels(codes, partition_ids, partition_count, positions, labels):
+    """
+    Generalizes the values of a dimension within each partition.
+
+    Returns:
+        numpy.ndarray: The label of each partition: the range of its values, or the set of its values when the
+            dimension is not numeric. Partitions with a single value keep that value.
+    """
+    if labels is None:
+        lows = np.full(partition_count, np.iinfo(np.int64).max)
+        highs = np.full(partition_count, -1)
+        np.minimum.at(lows, partition_ids, codes)
+        np.maximum.at(highs, partition_ids, codes)
+        bounds = {code: format_bound(positions[code]) for code in np.unique(np.concatenate((lows, highs))).tolist()}
+        return np.array([
+            bounds[low] if low == high else f"[{bounds[low]}, {bounds[high]}]"
+            for low, high in zip(lows.tolist(), highs.tolist())
+        ], dtype=object)
+
+    pairs = np.unique(partition_ids * len(labels) + codes)
+    pair_partitions, pair_codes = np.divmod(pairs, len(labels))
+    boundaries = np.flatnonzero(np.diff(pair_partitions)) + 1
+    return np.array([
+        labels[partition_codes[0]] if len(partition_codes) == 1 else "{" + ", ".join(labels[partition_codes]) + "}"
+        for partition_codes in np.split(pair_codes, boundaries)
+    ], dtype=object)
+
+def format_bound(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
 def age_generalize_func(value):
     if value >= 18:
         return 'Adult'
@@ -1,6 +1,8 @@
-from anonymizer.utils.data_processing import convert_to_string, check_nan_fields, check_columns
+from anonymizer.utils.data_processing import apply_string_transforms
+from anonymizer.utils.registry import register_algorithm, register_transform
 import hashlib
 
+@register_algorithm('hash.md5', deterministic=True, column_local=True)
 def apply_md5(df, columns, semaphore, **configuration):
     """
     Applies the MD5 hash function to the specified columns of a DataFrame.
@@ -13,22 +15,11 @@ def apply_md5(df, columns, semaphore, **configuration):
     Returns:
         None
     """
-
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
-
-    semaphore.acquire() 
-    try:
-        for column in columns:
-            df[column] = df[column].apply(lambda x: hashlib.md5(x.encode()).hexdigest())
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()  
+    apply_string_transforms(df, columns, semaphore, [md5_transform(**configuration)])
 
     return None
 
+@register_algorithm('hash.sha1', deterministic=True, column_local=True)
 def apply_sha1(df, columns, semaphore, **configuration):
     """
     Applies the SHA1 hash function to the specified columns of a DataFrame.
@@ -41,22 +32,11 @@ def apply_sha1(df, columns, semaphore, **configuration):
     Returns:
         None
     """
-
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
-
-    semaphore.acquire()  
-    try:
-        for column in columns:
-            df[column] = df[column].apply(lambda x: hashlib.sha1(x.encode()).hexdigest())
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()  
+    apply_string_transforms(df, columns, semaphore, [sha1_transform(**configuration)])
 
     return None
 
+@register_algorithm('hash.sha256', deterministic=True, column_local=True)
 def apply_sha256(df, columns, semaphore, **configuration):
     """
     Applies the SHA256 hash function to the specified columns of a DataFrame.
@@ -69,18 +49,36 @@ def apply_sha256(df, columns, semaphore, **configuration):
     Returns:
         None
     """
+    apply_string_transforms(df, columns, semaphore, [sha256_transform(**configuration)])
+
+    return None
 
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
+@register_transform('hash.md5')
+def md5_transform(**configuration):
+    """
+    Builds the column transform of the MD5 hash, which expects a column of strings.
 
-    semaphore.acquire()  
-    try:
-        for column in columns:
-            df[column] = df[column].apply(lambda x: hashlib.sha256(x.encode()).hexdigest())
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()  
+    Returns:
+        function: Function mapping a pandas.Series of strings to the Series of their MD5 hex digests.
+    """
+    return lambda column: column.apply(lambda x: hashlib.md5(x.encode()).hexdigest())
 
-    return None
+@register_transform('hash.sha1')
+def sha1_transform(**configuration):
+    """
+    Builds the column transform of the SHA1 hash, which expects a column of strings.
+
+    Returns:
+        function: Function mapping a pandas.Series of strings to the Series of their SHA1 hex digests.
+    """
+    return lambda column: column.apply(lambda x: hashlib.sha1(x.encode()).hexdigest())
+
+@register_transform('hash.sha256')
+def sha256_transform(**configuration):
+    """
+    Builds the column transform of the SHA256 hash, which expects a column of strings.
+
+    Returns:
+        function: Function mapping a pandas.Series of strings to the Series of their SHA256 hex digests.
+    """
+    return lambda column: column.apply(lambda x: hashlib.sha256(x.encode()).hexdigest())
@@ -1,6 +1,12 @@
-from anonymizer.utils.data_processing import convert_to_string, check_nan_fields, check_columns
+from anonymizer.utils.data_processing import convert_to_string, check_nan_fields, check_columns, apply_string_transforms
+from anonymizer.utils.data_patterns import PII_PATTERNS, compile_patterns
+from anonymizer.utils.registry import register_algorithm, register_transform
+import pandas as pd
 import re
 
+EMAIL_DOMAIN_PATTERN = re.compile(r"@([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+
+@register_algorithm('mask.full', deterministic=True, column_local=True, cost='low')
 def mask_full(df, columns, semaphore, **configuration):
     """
     Applies the '*' mask to all specified columns.
@@ -13,23 +19,23 @@ def mask_full(df, columns, semaphore, **configuration):
     Returns:
         None
     """
+    apply_string_transforms(df, columns, semaphore, [mask_full_transform(**configuration)])
 
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
+    return None
 
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = '*'
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()
 
-    return None
+@register_transform('mask.full')
+def mask_full_transform(**configuration):
+    """
+    Builds the column transform of the full mask, which expects a column of strings.
+
+    Returns:
+        function: Function mapping a pandas.Series of strings to a Series of '*' with the same index.
+    """
+    return lambda column: pd.Series('*', index=column.index, dtype=object)
 
 
+@register_algorithm('mask.range', deterministic=True, column_local=True)
 def mask_range(df, columns, semaphore, **configuration): 
     """
     Applies the '*' mask to a range of characters in each specified column.
@@ -45,6 +51,13 @@ def mask_range(df, columns, semaphore, **configuration):
     Returns:
         None
     """
+    apply_string_transforms(df, columns, semaphore, [mask_range_transform(**configuration)])
+
+    return None
+
+
+@register_transform('mask.range')
+def mask_range_transform(**configuration):
     start_index = configuration.get('start_index')
     if not start_index:
         raise ValueError("Start Index not provided in the configuration.")
@@ -64,21 +77,8 @@ def mask_range(df, columns, semaphore, **configuration):
     
     start_index -= 1
     end_index -= 1
-    
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
-
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = apply_range_mask(df[column], start_index, end_index)
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()
 
-    return None
+    return lambda column: apply_range_mask(column, start_index, end_index)
 
 
 def apply_range_mask(column, start_index, end_index):        
@@ -90,6 +90,7 @@ def apply_range_mask(column, start_index, end_index):
     return column
 
 
+@register_algorithm('mask.last_n_characters', deterministic=True, column_local=True)
 def mask_last_n_characters(df, columns, semaphore, **configuration): 
     """
     Applies the '*' mask to the last N characters of each specified column.
@@ -104,35 +105,24 @@ def mask_last_n_characters(df, columns, semaphore, **configuration):
     Returns:
         None
     """
-    n = configuration.get('n')
-    if not n:
-        raise ValueError("N Value not provided in the configuration.")
-    elif not isinstance(n, int):
-        raise ValueError("N should be an integer.")
-    elif n < 1:
-        raise ValueError("Start_index must be higher than zero.")
-    
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
-    
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = apply_last_n_character_mask(df[column], n)
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()
+    apply_string_transforms(df, columns, semaphore, [mask_last_n_characters_transform(**configuration)])
 
     return None
 
 
+@register_transform('mask.last_n_characters')
+def mask_last_n_characters_transform(**configuration):
+    n = check_n_configuration(configuration)
+
+    return lambda column: apply_last_n_character_mask(column, n)
+
+
 def apply_last_n_character_mask(column, n):
     masked_column = column.apply(lambda val: str(val)[:-min(n, len(str(val)))] + '*' * min(n, len(str(val))))
     return masked_column
 
 
+@register_algorithm('mask.first_n_characters', deterministic=True, column_local=True)
 def mask_first_n_characters(df, columns, semaphore, **configuration): 
     """
     Applies the '*' mask to the first N characters of each specified column.
@@ -147,6 +137,24 @@ def mask_first_n_characters(df, columns, semaphore, **configuration):
     Returns:
         None
     """
+    apply_string_transforms(df, columns, semaphore, [mask_first_n_characters_transform(**configuration)])
+
+    return None
+
+
+@register_transform('mask.first_n_characters')
+def mask_first_n_characters_transform(**configuration):
+    n = check_n_configuration(configuration)
+
+    return lambda column: apply_first_n_character_mask(column, n)
+
+
+def apply_first_n_character_mask(column, n):
+    masked_column = column.apply(lambda val: '*' * min(n, len(str(val))) + str(val)[min(n, len(str(val))):])
+    return masked_column
+
+
+def check_n_configuration(configuration):
     n = configuration.get('n')
     if not n:
         raise ValueError("N Value not provided in the configuration.")
@@ -154,28 +162,11 @@ def mask_first_n_characters(df, columns, semaphore, **configuration):
         raise ValueError("N should be an integer.")
     elif n < 1:
         raise ValueError("Start_index must be higher than zero.")
-    
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
 
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = apply_first_n_character_mask(df[column], n)
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()
-
-    return None
-
-
-def apply_first_n_character_mask(column, n):
-    masked_column = column.apply(lambda val: '*' * min(n, len(str(val))) + str(val)[min(n, len(str(val))):])
-    return masked_column
+    return n
 
 
+@register_algorithm('mask.email', deterministic=True, column_local=True)
 def mask_email(df, columns, semaphore, **configuration): 
     """
     Extracts the email domain from each specified column and replaces invalid values with 'email.com'.
@@ -188,24 +179,24 @@ def mask_email(df, columns, semaphore, **configuration):
     Returns:
         None
     """
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
+    apply_string_transforms(df, columns, semaphore, [mask_email_transform(**configuration)])
 
-    pattern = re.compile(r"@([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+    return None
 
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = df[column].str.extract(pattern).fillna("email.com")
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:
-        semaphore.release()
 
-    return None
+@register_transform('mask.email')
+def mask_email_transform(**configuration):
+    """
+    Builds the column transform of the email mask, which expects a column of strings.
+
+    Returns:
+        function: Function mapping a pandas.Series of emails to the Series of their domains, with 'email.com' for
+        values without a domain.
+    """
+    return lambda column: column.str.extract(EMAIL_DOMAIN_PATTERN, expand=False).fillna("email.com")
 
 
+@register_algorithm('mask.cpf', deterministic=True, column_local=True)
 def mask_cpf(df, columns, semaphore, **configuration): 
     """
     Applies the mask to CPFs, keeping only the first 3 digits and the last 2 digits visible.
@@ -218,21 +209,21 @@ def mask_cpf(df, columns, semaphore, **configuration):
     Returns:
         None
     """
+    apply_string_transforms(df, columns, semaphore, [mask_cpf_transform(**configuration)])
 
-    check_columns(df, columns, semaphore)
-    convert_to_string(df, columns, semaphore)
-    check_nan_fields(df, columns, semaphore)
+    return None
 
-    semaphore.acquire()
-    try:
-        for column in columns:
-            df[column] = apply_mask_cpf(df[column])
-    except Exception as e:
-        raise Exception("Unespected Error: " + str(e))
-    finally:    
-        semaphore.release()
 
-    return None
+@register_transform('mask.cpf')
+def mask_cpf_transform(**configuration):
+    """
+    Builds the column transform of the CPF mask, which expects a column of strings.
+
+    Returns:
+        function: Function mapping a pandas.Series of CPFs to the Series of masked CPFs, keeping the first 3 and the
+        last 2 digits of values with 11 or 14 characters and fully masking the others.
+    """
+    return apply_mask_cpf
 
 
 def apply_mask_cpf(column):
@@ -244,4 +235,54 @@ def apply_mask_cpf(column):
     column[mask_14] = column[mask_14].str[:3] + '.' + '*' * 3 + '.' + '*' * 3 + column[mask_14].str[-2:]
     column[~(mask_11 | mask_14)] = '***.***.***-**'
 
-    return column
\ No newline at end of file
+    return column
+
+
+@register_algorithm('mask.patterns', deterministic=True, column_local=True, cost='high')
+def mask_patterns(df, columns, semaphore, **configuration):
+    """
+    Masks every match of a named set of patterns (e.g. CPFs, CNPJs, phones and emails inside free text)
+    in a single scan per column.
+
+    Args:
+        df (pandas.DataFrame): The input DataFrame.
+        columns (list): A list of column names to apply the mask to.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        configuration (dict): A dictionary containing the mask configuration parameters.
+            - 'patterns' (list or dict, optional): Names of built-in patterns, or a dictionary mapping pattern names to
+              regular expressions. Defaults to every built-in Brazilian PII pattern.
+            - 'mask_char' (str, optional): The character used to mask each matched character. Defaults to '*'.
+
+    Returns:
+        dict: The number of matches of each pattern, per column.
+    """
+    patterns = configuration.get('patterns', list(PII_PATTERNS))
+    matcher, names = compile_patterns(patterns)
+
+    mask_char = configuration.get('mask_char', '*')
+    if not isinstance(mask_char, str) or len(mask_char) != 1:
+        raise ValueError("Mask char should be a single character.")
+
+    check_columns(df, columns, semaphore)
+    convert_to_string(df, columns, semaphore)
+    check_nan_fields(df, columns, semaphore)
+
+    pattern_hits = {}
+
+    semaphore.acquire()
+    try:
+        for column in columns:
+            hits = dict.fromkeys(names, 0)
+
+            def mask_match(match):
+                hits[match.lastgroup] += 1
+                return mask_char * (match.end() - match.start())
+
+            df[column] = df[column].str.replace(matcher, mask_match, regex=True)
+            pattern_hits[column] = hits
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return {"pattern_hits": pattern_hits}
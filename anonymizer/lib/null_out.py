@@ -1,5 +1,7 @@
 from anonymizer.utils.data_processing import check_columns
+from anonymizer.utils.registry import register_algorithm
 
+@register_algorithm('null_out.columns', deterministic=True, cost='low')
 def drop_columns(df, columns, semaphore, **configuration):
     """
     Drops the specified columns from a DataFrame.
@@ -1,8 +1,10 @@
 from anonymizer.utils.data_processing import  convert_to_datetime, convert_to_numeric, check_nan_fields, check_columns
+from anonymizer.utils.random_generation import get_random_generator
+from anonymizer.utils.registry import register_algorithm
 import pandas as pd
 import numpy as np
-import random
 
+@register_algorithm('perturb.date', seeded=True, column_local=True, cost='low')
 def perturb_date(df, columns, semaphore, **configuration):
     """
     Applies a date perturbation technique to specific columns of the DataFrame.
@@ -15,6 +17,8 @@ def perturb_date(df, columns, semaphore, **configuration):
             - unit (string): Unit of time to be added/subtracted (e.g., 'days', 'hours', 'minutes').
             - min_value (int): Minimum number of units to be added/subtracted.
             - max_value (int): Maximum number of units to be added/subtracted.
+            - profile (dict, optional): The column profiles of the task, used to speed up the datetime conversion.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter. Each column draws from its own child stream.
 
     Returns:
         None
@@ -52,13 +56,15 @@ def perturb_date(df, columns, semaphore, **configuration):
         raise ValueError(f"Unsupported unit: {unit}")
     
     check_columns(df, columns, semaphore)
-    convert_to_datetime(df, columns, semaphore)
+    convert_to_datetime(df, columns, semaphore, configuration.get('profile'))
     check_nan_fields(df, columns, semaphore)
 
     semaphore.acquire()  
     try:
-        for column in columns:
-            df[column] = df[column].apply(lambda x: x + pd.Timedelta(**{unit: random.randint(min_value, max_value)}))
+        for position, column in enumerate(columns):
+            generator = get_random_generator(configuration, position)
+            offsets = generator.integers(min_value, max_value, size=len(df[column]), endpoint=True)
+            df[column] = df[column] + pd.to_timedelta(offsets, unit=unit)
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
@@ -67,6 +73,7 @@ def perturb_date(df, columns, semaphore, **configuration):
     return None
 
 
+@register_algorithm('perturb.numeric_range', seeded=True, column_local=True, cost='low')
 def perturb_numeric_range(df, columns, semaphore, **configuration): 
     """
     Applies a numeric perturbation technique to specific columns of the DataFrame.
@@ -78,6 +85,7 @@ def perturb_numeric_range(df, columns, semaphore, **configuration):
         configuration (dict): A dictionary containing the perturbation configuration parameters.
             - min_value: Minimum of the range of the perturbation.
             - max_value: Maximum of the range of the perturbation.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter. Each column draws from its own child stream.
     
     Returns:
         None
@@ -106,11 +114,12 @@ def perturb_numeric_range(df, columns, semaphore, **configuration):
 
     semaphore.acquire()  
     try:
-        for column in columns:
+        for position, column in enumerate(columns):
+            generator = get_random_generator(configuration, position)
             if np.issubdtype(df[column].dtype, np.integer):
-                df[column] += np.random.randint(*perturbation_range, size=len(df[column]))
+                df[column] += generator.integers(*perturbation_range, size=len(df[column]))
             elif np.issubdtype(df[column].dtype, np.floating):
-                df[column] += np.random.uniform(*perturbation_range, size=len(df[column]))
+                df[column] += generator.uniform(*perturbation_range, size=len(df[column]))
             else:
                 raise ValueError(f"Column '{column}' is not of type int or float.")
     except ValueError as ve:
@@ -123,6 +132,7 @@ def perturb_numeric_range(df, columns, semaphore, **configuration):
     return None
 
 
+@register_algorithm('perturb.numeric_gaussian', seeded=True, column_local=True, cost='low')
 def perturb_numeric_gaussian(df, columns, semaphore, **configuration): 
     """
     Applies a Gaussian perturbation technique to specific columns of the DataFrame.
@@ -133,6 +143,7 @@ def perturb_numeric_gaussian(df, columns, semaphore, **configuration):
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
         configuration (dict): A dictionary containing the perturbation configuration parameters.
             - std: Standard deviation of the Gaussian perturbation.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter. Each column draws from its own child stream.
     
     Returns:
         None
@@ -150,11 +161,12 @@ def perturb_numeric_gaussian(df, columns, semaphore, **configuration):
 
     semaphore.acquire()  
     try:
-        for column in columns:
+        for position, column in enumerate(columns):
+            generator = get_random_generator(configuration, position)
             if np.issubdtype(df[column].dtype, np.integer):
-                df[column] += np.random.normal(scale=std, size=len(df[column])).astype(int)
+                df[column] += generator.normal(scale=std, size=len(df[column])).astype(int)
             elif np.issubdtype(df[column].dtype, np.floating):
-                df[column] += np.random.normal(scale=std, size=len(df[column]))
+                df[column] += generator.normal(scale=std, size=len(df[column]))
             else:
                 raise ValueError(f"Column '{column}' is not of type int or float.")
     except ValueError as ve:
@@ -166,6 +178,7 @@ def perturb_numeric_gaussian(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('perturb.numeric_laplacian', seeded=True, column_local=True, cost='low')
 def perturb_numeric_laplacian(df, columns, semaphore, **configuration): 
     """
     Applies a Laplacian perturbation technique to specific columns of the DataFrame.
@@ -176,6 +189,7 @@ def perturb_numeric_laplacian(df, columns, semaphore, **configuration):
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
         configuration (dict): A dictionary containing the perturbation configuration parameters.
             - value: Perturbation value.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter. Each column draws from its own child stream.
     
     Returns:
         None
@@ -193,11 +207,12 @@ def perturb_numeric_laplacian(df, columns, semaphore, **configuration):
 
     semaphore.acquire() 
     try:
-        for column in columns:
+        for position, column in enumerate(columns):
+            generator = get_random_generator(configuration, position)
             if np.issubdtype(df[column].dtype, np.integer):
-                df[column] += np.random.laplace(scale=value/np.sqrt(2), size=len(df[column]))
+                df[column] += generator.laplace(scale=value/np.sqrt(2), size=len(df[column]))
             elif np.issubdtype(df[column].dtype, np.floating):
-                df[column] += np.random.laplace(scale=value/np.sqrt(2), size=len(df[column]))
+                df[column] += generator.laplace(scale=value/np.sqrt(2), size=len(df[column]))
             else:
                 raise ValueError(f"Column '{column}' is not of type int or float.")
     except ValueError as ve:
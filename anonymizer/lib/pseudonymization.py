@@ -1,7 +1,20 @@
 from anonymizer.utils.data_processing import convert_to_string, check_nan_fields, check_columns
+from anonymizer.utils.registry import register_algorithm
+import base64
 import hashlib
+import numpy as np
 import pandas as pd
 
+BASE32_ALPHABET = np.frombuffer(b'abcdefghijklmnopqrstuvwxyz234567', dtype=np.uint8)
+BASE32_SHIFTS = np.arange(60, -1, -5, dtype=np.uint64)
+HEX_ALPHABET = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+HEX_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)
+
+# Fixed keys of the two 64-bit halves of the row pseudonyms. They are not secret: like the MD5 digests they replace,
+# the row pseudonyms are unkeyed, and the same row always gets the same pseudonym.
+ROW_HASH_KEYS = ['pseudonymize.row', 'row.pseudonymize']
+
+@register_algorithm('pseudonymize.columns', deterministic=True, column_local=True)
 def pseudonymize_columns(df, columns, semaphore, **configuration):
     """
     Pseudonymizes the values in the specified columns of a DataFrame.
@@ -30,6 +43,7 @@ def pseudonymize_columns(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('pseudonymize.rows', deterministic=True)
 def pseudonymize_rows(df, columns, semaphore, **configuration):
     """
     Pseudonymizes the rows of the DataFrame based on the specified columns.
@@ -38,10 +52,22 @@ def pseudonymize_rows(df, columns, semaphore, **configuration):
         df: pandas DataFrame.
         columns: List of columns to be used for pseudonymization.
         semaphore: threading.Semaphore to synchronize access to the DataFrame.
+        configuration: A dictionary containing the pseudonymization configuration parameters.
+            - 'output_column' (str, optional): Name of the column that receives the pseudonyms. Defaults to 'Object'.
+
+    The rows are hashed in batch over the column arrays, with two passes of pandas' vectorized 64-bit hash (SipHash)
+    under different fixed keys. Each column is hashed on its own before the hashes of a row are combined, so different
+    splits of the same characters (e.g. ('ab', 'c') and ('a', 'bc')) never produce the same pseudonym. Each pseudonym
+    is the output column name followed by the 32 hexadecimal digits of the two hashes.
 
     Returns:
         None
     """
+    output_column = configuration.get('output_column', 'Object')
+    if not output_column:
+        raise ValueError("Output column not provided in the configuration.")
+    elif not isinstance(output_column, str):
+        raise ValueError("Output column should be an string.")
 
     check_columns(df, columns, semaphore)
     convert_to_string(df, columns, semaphore)
@@ -49,13 +75,91 @@ def pseudonymize_rows(df, columns, semaphore, **configuration):
 
     semaphore.acquire()  
     try:
-        df['Object'] = df[columns].agg(''.join, axis=1)
+        hashes = [pd.util.hash_pandas_object(df[columns], index=False, hash_key=hash_key, categorize=False).to_numpy() for hash_key in ROW_HASH_KEYS]
         df.drop(columns, axis=1, inplace=True)
-    
-        df['Object'] = df['Object'].apply(lambda x: f'Object_{hashlib.md5(x.encode()).hexdigest()}' if pd.notnull(x) else x)
+
+        df[output_column] = f'{output_column}_' + pd.Series(encode_hex(*hashes), index=df.index, dtype=object)
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return None
+
+@register_algorithm('pseudonymize.fast', deterministic=True, column_local=True)
+def pseudonymize_fast(df, columns, semaphore, **configuration):
+    """
+    Pseudonymizes the values in the specified columns of a DataFrame with a keyed 64-bit hash.
+
+    The hash (SipHash, through pandas' vectorized hashing) is computed over whole columns at once and is not
+    cryptographic, so it is meant for internal analytics copies where compact and consistent tokens are enough.
+
+    Args:
+        df: pandas DataFrame.
+        columns: List of columns to be pseudonymized.
+        semaphore: threading.Semaphore to synchronize access to the DataFrame.
+        configuration: A dictionary containing the pseudonymization configuration parameters.
+            - 'key' (str): The secret key of the hash. The same key always produces the same tokens.
+            - 'format' (str, optional): 'base32' for 13 character tokens (default) or 'integer' for unsigned 64-bit integers.
+
+    Returns:
+        None
+    """
+    key = configuration.get('key')
+    if not key:
+        raise ValueError("Pseudonymization key not provided in the configuration.")
+    elif not isinstance(key, str):
+        raise ValueError("Pseudonymization key should be an string.")
+
+    token_format = configuration.get('format', 'base32')
+    if token_format not in ['base32', 'integer']:
+        raise ValueError(f"Unsupported format: {token_format}")
+
+    check_columns(df, columns, semaphore)
+    convert_to_string(df, columns, semaphore)
+    check_nan_fields(df, columns, semaphore)
+
+    hash_key = base64.b64encode(hashlib.sha256(key.encode()).digest()[:12]).decode()
+
+    semaphore.acquire()
+    try:
+        for column in columns:
+            hashes = pd.util.hash_array(df[column].to_numpy(dtype=object), hash_key=hash_key)
+            df[column] = hashes if token_format == 'integer' else encode_base32(hashes)
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
         semaphore.release()
 
-    return None
\ No newline at end of file
+    return None
+
+def encode_base32(hashes):
+    """
+    Encodes unsigned 64-bit integers as fixed length (13 characters) lowercase base32 strings.
+
+    Args:
+        hashes (numpy.ndarray): Array of uint64 values.
+
+    Returns:
+        numpy.ndarray: Array of base32 strings.
+    """
+    digits = (hashes[:, None] >> BASE32_SHIFTS) & np.uint64(31)
+    characters = np.ascontiguousarray(BASE32_ALPHABET[digits.astype(np.intp)])
+
+    return characters.view(f'S{len(BASE32_SHIFTS)}').ravel().astype(str)
+
+def encode_hex(*hashes):
+    """
+    Encodes arrays of unsigned 64-bit integers as lowercase hexadecimal strings of 16 characters per array, the
+    digits of each array following those of the previous one.
+
+    Args:
+        *hashes (numpy.ndarray): Arrays of uint64 values, of the same length.
+
+    Returns:
+        numpy.ndarray: Array of hexadecimal strings.
+    """
+    digits = np.concatenate([(array[:, None] >> HEX_SHIFTS) & np.uint64(15) for array in hashes], axis=1)
+    characters = np.ascontiguousarray(HEX_ALPHABET[digits.astype(np.intp)])
+
+    return characters.view(f'S{len(HEX_SHIFTS) * len(hashes)}').ravel().astype(str)
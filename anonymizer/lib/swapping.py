@@ -1,7 +1,10 @@
 from anonymizer.utils.data_processing import check_nan_fields, check_columns
+from anonymizer.utils.random_generation import get_random_generator
+from anonymizer.utils.registry import register_algorithm
 import pandas as pd
 import numpy as np
 
+@register_algorithm('swap.columns', seeded=True, column_local=True, cost='low')
 def swap_columns(df, columns, semaphore, **configuration):
     """
     Swaps the values in the specified columns of the DataFrame.
@@ -10,6 +13,8 @@ def swap_columns(df, columns, semaphore, **configuration):
         df (pandas.DataFrame): The DataFrame to be modified.
         columns (str or list): Name of the column(s) to be swapped.
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        configuration (dict): A dictionary containing the swapping configuration parameters.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter. Each column draws from its own child stream.
 
     Returns: 
         None
@@ -21,8 +26,9 @@ def swap_columns(df, columns, semaphore, **configuration):
 
     semaphore.acquire()  
     try:
-        for column in columns:
-            df[column] = np.random.permutation(df[column])
+        for position, column in enumerate(columns):
+            generator = get_random_generator(configuration, position)
+            df[column] = generator.permutation(df[column].to_numpy())
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
@@ -30,33 +36,58 @@ def swap_columns(df, columns, semaphore, **configuration):
 
     return None
 
+@register_algorithm('swap.rows', seeded=True, cost='low')
 def swap_rows(df, columns, semaphore, **configuration):
     """
     Swaps the rows of the DataFrame based on the values in the specified columns.
 
+    A single random permutation of the row positions is drawn and applied to every specified column,
+    so the values of a row stay together while moving to another row.
+
     Args:
         df (pandas.DataFrame): The DataFrame to be modified.
         columns (str or list): Name of the column(s) to be used for row swapping.
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        configuration (dict): A dictionary containing the swapping configuration parameters.
+            - group_by (str, optional): Stratification column. When provided, rows are only swapped with rows of the same group.
+            - seed_sequence (numpy.random.SeedSequence, optional): Seed sequence of the parameter.
     
     Returns: 
         None
     """
+    group_by = configuration.get('group_by')
+    if group_by is not None and not isinstance(group_by, str):
+        raise ValueError("Group By column should be an string.")
 
     check_columns(df, columns, semaphore)
+    if group_by is not None:
+        check_columns(df, [group_by], semaphore)
     check_nan_fields(df, columns, semaphore)
 
-    combined_column = '_combined_'
+    generator = get_random_generator(configuration)
 
     semaphore.acquire() 
     try:
-        df[combined_column] = df[columns].apply(tuple, axis=1)
-        df[combined_column] = np.random.permutation(df[combined_column])
-        df[columns] = pd.DataFrame(df[combined_column].tolist(), index=df.index)
-        df.drop(columns=[combined_column], inplace=True)
+        if group_by is None:
+            permutation = generator.permutation(len(df))
+        else:
+            permutation = group_permutation(df[group_by], generator)
+
+        for column in columns:
+            df[column] = df[column].take(permutation).to_numpy()
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
         semaphore.release()
 
-    return None
\ No newline at end of file
+    return None
+
+
+def group_permutation(group_column, generator):
+    codes, _ = pd.factorize(group_column, use_na_sentinel=False)
+    positions = np.argsort(codes, kind='stable')
+    shuffled_positions = np.lexsort((generator.random(len(codes)), codes))
+    permutation = np.empty(len(codes), dtype=np.intp)
+    permutation[positions] = shuffled_positions
+
+    return permutation
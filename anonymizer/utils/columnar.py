@@ -0,0 +1,118 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = 'manifest.json'
+
+class ColumnarWriter:
+    """
+    Writes a dataset, one row group at a time, to a columnar directory: one .npy file per column of each row group,
+    and a manifest of the columns and row groups, written on close.
+
+    Numeric, boolean and datetime columns are stored as they are, and string columns as fixed-width strings with a
+    mask of their missing values, so they can be memory-mapped. Columns that mix strings with other values are pickled.
+    """
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.columns = []
+        self.row_groups = []
+
+    def write(self, df):
+        """
+        Appends a row group.
+
+        Args:
+            df (pandas.DataFrame): The rows of the row group.
+        """
+        index = len(self.row_groups)
+        kinds = []
+        for position, column in enumerate(df.columns):
+            if column not in self.columns:
+                self.columns.append(column)
+            kinds.append(write_column(column_path(self.directory, index, position), df[column]))
+
+        self.row_groups.append({"rows": len(df), "columns": list(df.columns), "kinds": kinds})
+
+    def close(self):
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(manifest_path + '.tmp', 'w') as manifest_file:
+            json.dump({"columns": self.columns, "row_groups": self.row_groups}, manifest_file)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+class ColumnarReader:
+    """
+    Reads the row groups of a directory written by ColumnarWriter. Row groups are read one at a time, from
+    memory-mapped files, so reading takes memory proportional to the size of a row group, not of the dataset.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.columns = manifest['columns']
+        self.row_groups = manifest['row_groups']
+
+    @property
+    def row_count(self):
+        return sum(row_group['rows'] for row_group in self.row_groups)
+
+    def read_row_group(self, index):
+        """
+        Reads a row group. Columns that the row group does not have are filled with missing values, as they would be
+        in a DataFrame of the whole dataset.
+
+        Args:
+            index (int): The position of the row group.
+
+        Returns:
+            pandas.DataFrame: The rows of the row group, with every column of the dataset.
+        """
+        row_group = self.row_groups[index]
+        data = {
+            column: read_column(column_path(self.directory, index, position), kind)
+            for position, (column, kind) in enumerate(zip(row_group['columns'], row_group['kinds']))
+        }
+        df = pd.DataFrame(data, columns=row_group['columns'], index=pd.RangeIndex(row_group['rows']))
+        if row_group['columns'] != self.columns:
+            df = df.reindex(columns=self.columns)
+        return df
+
+    def iter_row_groups(self):
+        for index in range(len(self.row_groups)):
+            yield self.read_row_group(index)
+
+def column_path(directory, row_group_index, position):
+    return os.path.join(directory, f'{row_group_index}-{position}')
+
+def write_column(path, values):
+    """
+    Writes a column of a row group.
+
+    Returns:
+        str: The kind of the column file: 'array', 'string' or 'object'.
+    """
+    if values.dtype != object and isinstance(values.dtype, np.dtype):
+        np.save(path + '.npy', values.to_numpy())
+        return 'array'
+
+    missing = values.isna().to_numpy()
+    present = values[~missing]
+    if all(isinstance(value, str) for value in present):
+        np.save(path + '.npy', values.where(~missing, '').to_numpy(dtype=str))
+        np.save(path + '-missing.npy', missing)
+        return 'string'
+
+    np.save(path + '.npy', values.to_numpy(dtype=object), allow_pickle=True)
+    return 'object'
+
+def read_column(path, kind):
+    if kind == 'array':
+        return np.load(path + '.npy', mmap_mode='r')
+
+    if kind == 'string':
+        values = np.load(path + '.npy', mmap_mode='r').astype(object)
+        values[np.load(path + '-missing.npy', mmap_mode='r')] = None
+        return values
+
+    return np.load(path + '.npy', allow_pickle=True)
@@ -1,5 +1,12 @@
+import json
+import numpy as np
 import pandas as pd
+from collections import Counter
+from threading import Semaphore
 from anonymizer.utils.data_processing import check_columns
+from anonymizer.utils.sketches import HyperLogLog, hash_registers, hash_values, precision_for_error, standard_error
+
+CONFIDENCE_Z_SCORES = {0.95: 1.96}
 
 def calculate_k_anonymity(df, sensitive_columns, semaphore):
     """
@@ -13,13 +20,9 @@ def calculate_k_anonymity(df, sensitive_columns, semaphore):
     Returns:
         str: Minimum count among the grouped sensitive attribute combinations.
     """
-    check_columns(df, sensitive_columns, semaphore)
-
-    group_counts = df.groupby(sensitive_columns).size().reset_index(name='count')
-    min_count = str(group_counts['count'].min())
-    return min_count
+    return finalize_k_anonymity(summarize_k_anonymity(df, sensitive_columns, semaphore))
 
-def calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore):
+def calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore, relative_error=None):
     """
     Calculate the l-diversity of a dataset.
 
@@ -28,53 +31,434 @@ def calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore):
         sensitive_columns (list): List of columns containing sensitive attributes.
         diversity_columns (list): List of columns containing attributes for diversity measurement.
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        relative_error (float, optional): When given, the distinct values of each class are estimated with
+            HyperLogLog sketches of this relative standard error, instead of being counted exactly.
 
     Returns:
-        str: Average diversity among the unique sensitive attribute combinations.
+        str: Average diversity among the unique sensitive attribute combinations. In the approximate mode, a JSON
+            object with the 'estimate', its 'relative_standard_error', and its 'confidence_interval' at the given 'confidence'.
+    """
+    return finalize_l_diversity(summarize_l_diversity(df, sensitive_columns, diversity_columns, semaphore, relative_error))
+
+def calculate_t_closeness(df, sensitive_columns, closeness_columns, semaphore):
+    """
+    Calculate the t-closeness of a dataset.
+
+    Args:
+        df (pd.DataFrame): The dataset to analyze.
+        sensitive_columns (list): List of columns containing sensitive attributes.
+        closeness_columns (list): List of columns for t-closeness measurement.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+
+    Returns:
+        str: The t of each closeness column: the maximum Earth Mover's Distance between the distribution of the column
+            within an equivalence class and its distribution in the whole dataset.
     """
+    return finalize_t_closeness(summarize_t_closeness(df, sensitive_columns, closeness_columns, semaphore))
 
+def summarize_k_anonymity(df, sensitive_columns, semaphore):
+    """
+    Summarize a batch of rows for the k-anonymity: the size of each equivalence class.
+
+    Summaries of different batches can be merged (see merge_summaries), and finalized into the metric of the whole
+    dataset (see finalize_k_anonymity).
+
+    Args:
+        df (pd.DataFrame): The batch of rows.
+        sensitive_columns (list): List of columns containing sensitive attributes.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+
+    Returns:
+        dict: The summary, with the key 'class_counts' (the number of rows of each class).
+    """
     check_columns(df, sensitive_columns, semaphore)
-    check_columns(df, diversity_columns, semaphore)
 
-    unique_combinations = df[sensitive_columns].drop_duplicates()
-    min_diversities = []
+    return {"class_counts": count_classes(df, sensitive_columns)}
 
-    for _, group in unique_combinations.iterrows():
-        group_filter = None
-        for col in sensitive_columns:
-            if group_filter is None:
-                group_filter = (df[col] == group[col])
-            else:
-                group_filter &= (df[col] == group[col])
+def summarize_l_diversity(df, sensitive_columns, diversity_columns, semaphore, relative_error=None):
+    """
+    Summarize a batch of rows for the l-diversity: the equivalence classes, and the distinct values of each
+    diversity column within each class.
 
-        group_df = df[group_filter]
-        group_diversity = group_df[diversity_columns].nunique().min()
-        min_diversities.append(group_diversity)
+    Args:
+        df (pd.DataFrame): The batch of rows.
+        sensitive_columns (list): List of columns containing sensitive attributes.
+        diversity_columns (list): List of columns containing attributes for diversity measurement.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        relative_error (float, optional): When given, the distinct values are kept in HyperLogLog sketches of this
+            relative standard error, which take memory bounded by the sketch size instead of the number of values.
 
-    average_diversity = str(sum(min_diversities) / len(min_diversities))
-    return average_diversity
+    Returns:
+        dict: The summary, with the keys 'class_counts' and 'distinct_values' (one set per diversity column, for each
+            class), or 'precision' and 'sketches' (one sketch per diversity column, for each class) in the approximate mode.
+    """
+    check_columns(df, sensitive_columns, semaphore)
+    check_columns(df, diversity_columns, semaphore)
 
-def calculate_t_closeness(df, sensitive_columns, closeness_columns, semaphore):
+    if relative_error is not None:
+        precision = precision_for_error(relative_error)
+        return {"class_counts": count_classes(df, sensitive_columns), "precision": precision, "sketches": sketch_classes(df, sensitive_columns, diversity_columns, precision)}
+
+    distinct_values = {}
+    for position, column in enumerate(diversity_columns):
+        pairs = df[sensitive_columns + [column]].dropna().drop_duplicates()
+        for row in pairs.itertuples(index=False, name=None):
+            class_sets = distinct_values.setdefault(class_key(row[:-1]), [set() for _ in diversity_columns])
+            class_sets[position].add(row[-1])
+
+    return {"class_counts": count_classes(df, sensitive_columns), "distinct_values": distinct_values}
+
+def summarize_t_closeness(df, sensitive_columns, closeness_columns, semaphore):
     """
-    Calculate the t-closeness of a dataset.
+    Summarize a batch of rows for the t-closeness: whether each closeness column is numeric, and the histogram of each
+    closeness column within each equivalence class. Classes with missing sensitive values are kept, as their rows
+    count towards the overall distributions.
 
     Args:
-        df (pd.DataFrame): The dataset to analyze.
+        df (pd.DataFrame): The batch of rows.
         sensitive_columns (list): List of columns containing sensitive attributes.
         closeness_columns (list): List of columns for t-closeness measurement.
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
 
     Returns:
-        str: Average distance of attribute means or an error message.
+        dict: The summary, with the keys 'closeness_columns', 'numeric' (one flag per closeness column) and
+            'histograms' (one value counter per closeness column, for each class).
     """
     check_columns(df, sensitive_columns, semaphore)
     check_columns(df, closeness_columns, semaphore)
 
-    non_numeric_attributes = [attr for attr in closeness_columns if not pd.api.types.is_numeric_dtype(df[attr])]
-    if non_numeric_attributes:
-        return(f"NaN")
+    summary = {
+        "closeness_columns": list(closeness_columns),
+        "numeric": [bool(pd.api.types.is_numeric_dtype(df[column])) for column in closeness_columns],
+        "histograms": {},
+    }
+
+    for position, column in enumerate(closeness_columns):
+        rows = df[df[column].notna()]
+        value_counts = rows.groupby(sensitive_columns + [column], dropna=False, sort=False).size()
+        for *key, value, count in zip(*normalized_levels(value_counts.index), value_counts.tolist()):
+            class_histograms = summary['histograms'].setdefault(tuple(key), [Counter() for _ in closeness_columns])
+            class_histograms[position][value] += count
+
+    return summary
+
+def merge_summaries(first, second):
+    """
+    Merge two summaries of the same metric. Merging is associative and commutative, so the summaries of any
+    partitioning of a dataset merge into the summary of the whole dataset. The arguments are not modified.
+
+    Args:
+        first (dict): A k-anonymity, l-diversity or t-closeness summary.
+        second (dict): A summary of the same metric and columns.
+
+    Returns:
+        dict: The merged summary.
+    """
+    merged = {}
+
+    if 'class_counts' in first:
+        class_counts = dict(first['class_counts'])
+        for key, count in second['class_counts'].items():
+            class_counts[key] = class_counts.get(key, 0) + count
+        merged['class_counts'] = class_counts
+
+    if 'distinct_values' in first:
+        distinct_values = {key: [set(values) for values in class_sets] for key, class_sets in first['distinct_values'].items()}
+        for key, class_sets in second['distinct_values'].items():
+            if key in distinct_values:
+                for values, other_values in zip(distinct_values[key], class_sets):
+                    values.update(other_values)
+            else:
+                distinct_values[key] = [set(values) for values in class_sets]
+        merged['distinct_values'] = distinct_values
+
+    if 'sketches' in first:
+        merged['precision'] = first['precision']
+        sketches = {key: [sketch.copy() for sketch in class_sketches] for key, class_sketches in first['sketches'].items()}
+        for key, class_sketches in second['sketches'].items():
+            if key in sketches:
+                for sketch, other_sketch in zip(sketches[key], class_sketches):
+                    sketch.merge(other_sketch)
+            else:
+                sketches[key] = [sketch.copy() for sketch in class_sketches]
+        merged['sketches'] = sketches
 
-    overall_attribute_means = df[closeness_columns].mean()
-    group_distances = df.groupby(sensitive_columns)[closeness_columns].apply(lambda x: (x - overall_attribute_means).abs().mean())
-    average_group_distance = str(group_distances.mean())
-    return average_group_distance
+    if 'histograms' in first:
+        merged['closeness_columns'] = first['closeness_columns']
+        merged['numeric'] = [numeric and other_numeric for numeric, other_numeric in zip(first['numeric'], second['numeric'])]
+        histograms = {key: [Counter(histogram) for histogram in class_histograms] for key, class_histograms in first['histograms'].items()}
+        for key, class_histograms in second['histograms'].items():
+            if key in histograms:
+                for histogram, other_histogram in zip(histograms[key], class_histograms):
+                    histogram.update(other_histogram)
+            else:
+                histograms[key] = [Counter(histogram) for histogram in class_histograms]
+        merged['histograms'] = histograms
+
+    return merged
+
+def finalize_k_anonymity(summary):
+    """
+    Finalize a k-anonymity summary into the metric.
+
+    Returns:
+        str: Minimum count among the grouped sensitive attribute combinations.
+    """
+    counts = [count for key, count in summary['class_counts'].items() if None not in key]
+    return str(min(counts)) if counts else "nan"
+
+def finalize_l_diversity(summary):
+    """
+    Finalize an l-diversity summary into the metric. Combinations with missing values have a diversity of 0.
+
+    Returns:
+        str: Average diversity among the unique sensitive attribute combinations.
+    """
+    approximate = 'sketches' in summary
+    class_values = summary['sketches'] if approximate else summary['distinct_values']
+
+    diversities = []
+    for key in summary['class_counts']:
+        class_entries = class_values.get(key)
+        if None in key or class_entries is None:
+            diversities.append(0)
+        elif approximate:
+            diversities.append(min(sketch.estimate() for sketch in class_entries))
+        else:
+            diversities.append(min(len(values) for values in class_entries))
+
+    if not approximate:
+        return str(sum(diversities) / len(diversities))
+
+    estimate = sum(diversities) / len(diversities)
+    relative_standard_error = standard_error(summary['precision'])
+    margin = CONFIDENCE_Z_SCORES[0.95] * relative_standard_error
+    return json.dumps({
+        "estimate": round(estimate, 4),
+        "relative_standard_error": round(relative_standard_error, 4),
+        "confidence": 0.95,
+        "confidence_interval": [round(estimate * (1 - margin), 4), round(estimate * (1 + margin), 4)],
+    })
+
+def finalize_t_closeness(summary):
+    """
+    Finalize a t-closeness summary into the metric: for each closeness column, the maximum, over the equivalence
+    classes, of the Earth Mover's Distance between the class distribution and the overall distribution. Numeric
+    columns use the ordered distance, and other columns the equal distance (see earth_movers_distances).
+
+    Returns:
+        str: The t of each closeness column.
+    """
+    keys = list(summary['histograms'])
+    measured = np.array([None not in key for key in keys], dtype=bool)
+
+    t_values = {}
+    for position, column in enumerate(summary['closeness_columns']):
+        class_codes, values, counts = [], [], []
+        for code, key in enumerate(keys):
+            histogram = summary['histograms'][key][position]
+            class_codes.extend([code] * len(histogram))
+            values.extend(histogram.keys())
+            counts.extend(histogram.values())
+
+        ordered = summary['numeric'][position]
+        if ordered:
+            _, value_codes = np.unique(np.asarray(values, dtype=float), return_inverse=True)
+        else:
+            value_codes, _ = pd.factorize(pd.Series(values, dtype=object))
+
+        distances = earth_movers_distances(np.asarray(class_codes, dtype=np.int64), np.asarray(value_codes, dtype=np.int64), np.asarray(counts, dtype=float), len(keys), ordered)
+        distances = distances[measured & ~np.isnan(distances)]
+        t_values[column] = distances.max() if len(distances) else float('nan')
+
+    return str(pd.Series(t_values, index=summary['closeness_columns'], dtype=float))
+
+def earth_movers_distances(class_codes, value_codes, counts, class_count, ordered):
+    """
+    Computes, for every equivalence class at once, the Earth Mover's Distance between the distribution of a column
+    within the class and its overall distribution, from the sparse (class, value, count) entries of the class
+    histograms.
+
+    With the equal distance, the distance is half the total variation, sum(|p - q|) / 2. With the ordered distance,
+    over the m distinct values in ascending order, it is sum(|P - Q|) / (m - 1), where P and Q are the cumulative
+    class and overall distributions. Between two consecutive values of a class, P is constant and Q ascends, so the
+    sum over each such run of values is computed in constant time from the prefix sums of Q.
+
+    Args:
+        class_codes (numpy.ndarray): The class of each entry, between 0 and class_count - 1.
+        value_codes (numpy.ndarray): The value of each entry, as its rank among the distinct values when ordered.
+        counts (numpy.ndarray): The number of rows of each entry.
+        class_count (int): The number of classes.
+        ordered (bool): Whether to use the ordered distance instead of the equal distance.
+
+    Returns:
+        numpy.ndarray: The distance of each class, NaN for classes without entries.
+    """
+    distances = np.full(class_count, np.nan)
+    if not len(counts):
+        return distances
+
+    class_totals = np.bincount(class_codes, weights=counts, minlength=class_count)
+    overall = np.bincount(value_codes, weights=counts)
+    overall /= overall.sum()
+    probabilities = counts / class_totals[class_codes]
+    present = class_totals > 0
+
+    if not ordered:
+        # Values absent from a class contribute their whole overall probability.
+        differences = np.bincount(class_codes, weights=np.abs(probabilities - overall[value_codes]), minlength=class_count)
+        covered = np.bincount(class_codes, weights=overall[value_codes], minlength=class_count)
+        distances[present] = ((differences + 1 - covered) / 2)[present]
+        return distances
+
+    value_count = len(overall)
+    if value_count < 2:
+        distances[present] = 0.0
+        return distances
+
+    order = np.lexsort((value_codes, class_codes))
+    class_codes, value_codes, probabilities = class_codes[order], value_codes[order], probabilities[order]
+
+    class_cumulative = pd.Series(probabilities).groupby(class_codes).cumsum().to_numpy()
+    overall_cumulative = np.cumsum(overall)
+    overall_prefix = np.concatenate(([0.0], np.cumsum(overall_cumulative)))
+
+    first = np.concatenate(([True], class_codes[1:] != class_codes[:-1]))
+    last = np.concatenate((class_codes[1:] != class_codes[:-1], [True]))
+    starts = value_codes
+    ends = np.concatenate((value_codes[1:], [value_count]))
+    ends[last] = value_count
+
+    # Within [start, end), Q is below P before the split and at or above it after.
+    splits = np.clip(np.searchsorted(overall_cumulative, class_cumulative, side='left'), starts, ends)
+    runs = (class_cumulative * (splits - starts) - (overall_prefix[splits] - overall_prefix[starts])
+            + (overall_prefix[ends] - overall_prefix[splits]) - class_cumulative * (ends - splits))
+
+    # Before the first value of a class, P is 0.
+    heads = np.bincount(class_codes[first], weights=overall_prefix[value_codes[first]], minlength=class_count)
+    totals = np.bincount(class_codes, weights=runs, minlength=class_count) + heads
+    distances[present] = (totals / (value_count - 1))[present]
+    return distances
+
+def summarize_metrics(df, sensitive_columns, closeness_columns, diversity_columns, semaphore, l_diversity_error=None):
+    """
+    Summarize a batch of rows for the k-anonymity, t-closeness and l-diversity. 'l_diversity_error' selects the
+    approximate l-diversity (see summarize_l_diversity).
+
+    Returns:
+        dict: The summaries, under the keys 'k_anonymity', 't_closeness' and 'l_diversity'.
+    """
+    return {
+        "k_anonymity": summarize_k_anonymity(df, sensitive_columns, semaphore),
+        "t_closeness": summarize_t_closeness(df, sensitive_columns, closeness_columns, semaphore),
+        "l_diversity": summarize_l_diversity(df, sensitive_columns, diversity_columns, semaphore, l_diversity_error),
+    }
+
+def calculate_snapshot_metrics(snapshot, sensitive_columns, closeness_columns, diversity_columns, l_diversity_error=None):
+    """
+    Calculate the k-anonymity, t-closeness and l-diversity of a snapshot of the metric columns of a dataset. The
+    snapshot is not shared, so it can be measured in another thread or process while the dataset changes.
+
+    Returns:
+        tuple: The k-anonymity, t-closeness and l-diversity.
+    """
+    semaphore = Semaphore()
+    return (
+        calculate_k_anonymity(snapshot, sensitive_columns, semaphore),
+        calculate_t_closeness(snapshot, sensitive_columns, closeness_columns, semaphore),
+        calculate_l_diversity(snapshot, sensitive_columns, diversity_columns, semaphore, l_diversity_error),
+    )
+
+def merge_metric_summaries(first, second):
+    return {metric: merge_summaries(first[metric], second[metric]) for metric in first}
+
+def finalize_metric_summaries(summaries):
+    """
+    Finalize the summaries of summarize_metrics.
+
+    Returns:
+        tuple: The k-anonymity, t-closeness and l-diversity.
+    """
+    return (
+        finalize_k_anonymity(summaries['k_anonymity']),
+        finalize_t_closeness(summaries['t_closeness']),
+        finalize_l_diversity(summaries['l_diversity']),
+    )
+
+def dump_summary(summary):
+    """
+    Converts a summary into JSON-serializable values, to be sent to another process (see load_summary).
+    """
+    dumped = dict(summary)
+    if 'class_counts' in summary:
+        dumped['class_counts'] = [[list(key), count] for key, count in summary['class_counts'].items()]
+    if 'distinct_values' in summary:
+        dumped['distinct_values'] = [[list(key), [list(values) for values in class_sets]] for key, class_sets in summary['distinct_values'].items()]
+    if 'sketches' in summary:
+        dumped['sketches'] = [[list(key), [sketch.to_list() for sketch in class_sketches]] for key, class_sketches in summary['sketches'].items()]
+    if 'histograms' in summary:
+        dumped['histograms'] = [[list(key), [list(histogram.items()) for histogram in class_histograms]] for key, class_histograms in summary['histograms'].items()]
+    return dumped
+
+def load_summary(dumped):
+    """
+    Converts the values of dump_summary back into a summary.
+    """
+    summary = dict(dumped)
+    if 'class_counts' in dumped:
+        summary['class_counts'] = {tuple(key): count for key, count in dumped['class_counts']}
+    if 'distinct_values' in dumped:
+        summary['distinct_values'] = {tuple(key): [set(values) for values in class_sets] for key, class_sets in dumped['distinct_values']}
+    if 'sketches' in dumped:
+        summary['sketches'] = {tuple(key): [HyperLogLog.from_list(sketch) for sketch in class_sketches] for key, class_sketches in dumped['sketches']}
+    if 'histograms' in dumped:
+        summary['histograms'] = {tuple(key): [Counter(dict(histogram)) for histogram in class_histograms] for key, class_histograms in dumped['histograms']}
+    return summary
+
+def sketch_classes(df, sensitive_columns, diversity_columns, precision):
+    """
+    Builds, for each equivalence class, one HyperLogLog sketch of the values of each diversity column. The registers of
+    every class are computed at once, from the maximum rank of each (class, register) pair.
+    """
+    sketches = {}
+    for position, column in enumerate(diversity_columns):
+        rows = df[sensitive_columns + [column]].dropna()
+        indexes, ranks = hash_registers(hash_values(rows[column]), precision)
+
+        registers = pd.DataFrame({key_position: rows[sensitive_column].to_numpy() for key_position, sensitive_column in enumerate(sensitive_columns)})
+        registers['register'] = indexes
+        registers['rank'] = ranks
+        max_ranks = registers.groupby(list(range(len(sensitive_columns))) + ['register'], sort=False)['rank'].max()
+
+        class_registers = {}
+        for key, rank in max_ranks.items():
+            class_registers.setdefault(class_key(key[:-1]), []).append((key[-1], int(rank)))
+
+        for key, key_registers in class_registers.items():
+            class_sketches = sketches.setdefault(key, [HyperLogLog(precision) for _ in diversity_columns])
+            class_sketches[position].update_registers(key_registers)
+
+    return sketches
+
+def count_classes(df, sensitive_columns):
+    class_counts = {}
+    for key, count in df.groupby(sensitive_columns, dropna=False, sort=False).size().items():
+        key = class_key(key if isinstance(key, tuple) else (key,))
+        class_counts[key] = class_counts.get(key, 0) + int(count)
+    return class_counts
+
+def normalized_levels(index):
+    """
+    Normalizes the levels of a group index at once, as class_key does for a single key.
+
+    Returns:
+        list: One list of values per level, with None for missing values.
+    """
+    levels = [pd.Series(index.get_level_values(level)) for level in range(index.nlevels)]
+    return [values.astype(object).where(values.notna(), None).tolist() for values in levels]
+
+def class_key(values):
+    """
+    Normalizes the sensitive attribute values of an equivalence class into a hashable key, with None for missing values.
+    """
+    return tuple(None if pd.isna(value) else (value.item() if hasattr(value, 'item') else value) for value in values)
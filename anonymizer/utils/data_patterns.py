@@ -0,0 +1,95 @@
+import re
+
+try:
+    from re import _parser as regex_parser
+except ImportError:
+    import sre_parse as regex_parser
+
+PII_PATTERNS = {
+    'email': r'[\w.+-]+@[A-Za-z0-9-]+\.[A-Za-z0-9.-]+',
+    'cnpj': r'\b\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}\b',
+    'cpf': r'\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b',
+    'phone': r'(?:\+55\s?)?(?:\(\d{2}\)|\b\d{2})\s?9?\d{4}[-\s]?\d{4}\b',
+    'rg': r'\b\d{1,2}\.?\d{3}\.?\d{3}-?[\dXx]\b',
+    'cep': r'\b\d{5}-\d{3}\b',
+}
+
+def compile_patterns(patterns):
+    """
+    Compiles a named set of patterns into a single alternation, so every pattern is searched in one scan.
+
+    Each pattern becomes a named group, which identifies the pattern of a match through 'match.lastgroup'.
+    When patterns overlap, the one listed first wins. Each expression is compiled on its own first, so its errors
+    point into the expression. Expressions that would change meaning inside the alternation are rejected: numbered
+    backreferences (the numbers of the groups shift), inline global flags (use scoped flags such as '(?i:...)'),
+    group names used twice, and expressions that can match the empty string, which would match at every position.
+
+    Args:
+        patterns (list or dict): Names of built-in patterns (see PII_PATTERNS), or a dictionary mapping
+            pattern names to regular expressions. A None expression refers to the built-in pattern of that name.
+
+    Returns:
+        tuple: The compiled matcher (re.Pattern) and the list of pattern names.
+
+    Raises:
+        ValueError: If the set is empty, a name is invalid or unknown, or an expression does not compile or is
+            rejected.
+    """
+    if isinstance(patterns, list):
+        patterns = {name: None for name in patterns}
+    elif not isinstance(patterns, dict):
+        raise ValueError("Patterns should be a list of names or a dictionary of expressions.")
+
+    if not patterns:
+        raise ValueError("Patterns not provided in the configuration.")
+
+    groups = []
+    group_names = set(patterns)
+    for name, expression in patterns.items():
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError(f"Invalid pattern name: {name}")
+
+        if expression is None:
+            if name not in PII_PATTERNS:
+                raise ValueError(f"Unknown pattern: {name}")
+            expression = PII_PATTERNS[name]
+        elif not isinstance(expression, str):
+            raise ValueError(f"Pattern '{name}' should be an string.")
+
+        check_expression(name, expression, group_names)
+        groups.append(f'(?P<{name}>{expression})')
+
+    try:
+        matcher = re.compile('|'.join(groups))
+    except re.error as e:
+        raise ValueError(f"Invalid pattern: {e}")
+
+    return matcher, list(patterns)
+
+def check_expression(name, expression, group_names):
+    """
+    Checks that an expression compiles on its own, and keeps its meaning as a group of the alternation (see
+    compile_patterns). The names of its groups are added to the group names already in use.
+
+    Raises:
+        ValueError: If the expression does not compile or is rejected.
+    """
+    try:
+        compiled = re.compile(expression)
+        minimum_width = regex_parser.parse(expression).getwidth()[0]
+    except re.error as e:
+        raise ValueError(f"Invalid pattern '{name}': {e}")
+
+    if any(escape.group(1) in '123456789' for escape in re.finditer(r'\\(.)', expression, re.DOTALL)):
+        raise ValueError(f"Invalid pattern '{name}': numbered backreferences are not supported, use named groups.")
+
+    if re.match(r'\(\?[aiLmsux]+\)', expression):
+        raise ValueError(f"Invalid pattern '{name}': global flags are not supported, use scoped flags such as '(?i:...)'.")
+
+    if minimum_width == 0:
+        raise ValueError(f"Invalid pattern '{name}': the pattern matches the empty string.")
+
+    for group_name in compiled.groupindex:
+        if group_name in group_names:
+            raise ValueError(f"Invalid pattern '{name}': the group name '{group_name}' is already used.")
+        group_names.add(group_name)
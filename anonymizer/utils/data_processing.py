@@ -26,9 +26,24 @@ def csv_to_dataframe(csv_file):
     df = pd.read_csv(csv_file)
     return df
 
+def decode_bytes(df):
+    """
+    Decodes the bytes values of a DataFrame (e.g. ciphertexts) into UTF-8 strings, replacing invalid sequences, so
+    the DataFrame can be serialized. Only object columns can hold bytes values.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame, modified in place.
+
+    Returns:
+        None
+    """
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].apply(lambda x: x.decode('utf-8', errors='replace') if isinstance(x, bytes) else x)
+
 def convert_to_string(df, columns, semaphore):
     """
-    Converts the specified columns to string type.
+    Converts the specified columns to string type. Columns that only hold strings are left untouched.
 
     Args:
         df (pandas.DataFrame): The DataFrame to be converted.
@@ -40,7 +55,14 @@ def convert_to_string(df, columns, semaphore):
     """
     semaphore.acquire()  
     try:
-        df[columns] = df[columns].applymap(lambda x: str(x) if pd.notna(x) else x)
+        for column in columns:
+            values = df[column]
+            if pd.api.types.infer_dtype(values, skipna=True) in ['string', 'empty']:
+                continue
+            elif pd.api.types.is_numeric_dtype(values):
+                df[column] = values.astype(str).where(values.notna(), values).astype(object)
+            else:
+                df[column] = values.map(lambda x: str(x) if pd.notna(x) else x)
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
@@ -51,7 +73,7 @@ def convert_to_string(df, columns, semaphore):
 
 def convert_to_numeric(df, columns, semaphore):
     """
-    Converts the specified columns to numeric type.
+    Converts the specified columns to numeric type. Columns that are already numeric are left untouched.
 
     Args:
         df (pandas.DataFrame): The DataFrame to be converted.
@@ -63,7 +85,9 @@ def convert_to_numeric(df, columns, semaphore):
     """
     semaphore.acquire()  
     try:
-        df[columns] = df[columns].apply(pd.to_numeric, errors='coerce')
+        for column in columns:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = pd.to_numeric(df[column], errors='coerce')
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
@@ -71,21 +95,40 @@ def convert_to_numeric(df, columns, semaphore):
 
     return None
 
-def convert_to_datetime(df, columns, semaphore):
+def convert_to_datetime(df, columns, semaphore, profile=None):
     """
-    Converts the specified columns to datetime type.
+    Converts the specified columns to datetime type. Columns that are already datetimes are left untouched.
+
+    When the column profile provides the format shared by the column dates, it is used to parse the column
+    in a single vectorized pass; only the values that do not match it go through the generic parser.
 
     Args:
         df (pandas.DataFrame): The DataFrame to be converted.
         columns (str or list): Name of the column(s) to be converted.
         semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        profile (dict, optional): The column profiles (see anonymizer.utils.data_profiling.profile_dataframe).
     
     Returns:
         None
     """
+    profile = profile or {}
+
     semaphore.acquire()  
     try:
-        df[columns] = df[columns].apply(pd.to_datetime, errors='coerce', format='mixed')
+        for column in columns:
+            values = df[column]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                continue
+
+            datetime_format = profile.get(column, {}).get('datetime_format')
+            if datetime_format:
+                converted = pd.to_datetime(values, errors='coerce', format=datetime_format)
+                unmatched = converted.isna() & values.notna()
+                if unmatched.any():
+                    converted[unmatched] = pd.to_datetime(values[unmatched], errors='coerce', format='mixed')
+                df[column] = converted
+            else:
+                df[column] = pd.to_datetime(values, errors='coerce', format='mixed')
     except Exception as e:
         raise Exception("Unespected Error: " + str(e))
     finally:
@@ -116,6 +159,99 @@ def convert_to_bool(df, columns, semaphore):
 
     return None
 
+def apply_string_transforms(df, columns, semaphore, transforms):
+    """
+    Converts the specified columns to strings, fills their missing values and applies the given column
+    transforms, in order, in a single pass over each column.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be transformed.
+        columns (list): List of column names to be transformed.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        transforms (list): Functions mapping a pandas.Series of strings to the transformed Series.
+
+    Returns:
+        None
+    """
+    check_columns(df, columns, semaphore)
+    convert_to_string(df, columns, semaphore)
+    check_nan_fields(df, columns, semaphore)
+
+    semaphore.acquire()
+    try:
+        for column in columns:
+            values = df[column]
+            for transform in transforms:
+                values = transform(values)
+            df[column] = values
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return None
+
+def snapshot_columns(df, columns, semaphore):
+    """
+    Records the specified columns of the DataFrame, so that an algorithm that fails partway can be rolled back with
+    restore_columns. Only these columns are copied, and the copy of an object column only copies the references to
+    its values. Names that are not columns of the DataFrame are ignored.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame.
+        columns (list): List of column names to be recorded.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+
+    Returns:
+        dict: The snapshot, with the position and a copy of each recorded column.
+    """
+    if not isinstance(columns, list):
+        return {"positions": {}, "values": {}}
+
+    semaphore.acquire()
+    try:
+        recorded = [column for column in dict.fromkeys(column for column in columns if isinstance(column, str)) if column in df.columns]
+        return {
+            "positions": {column: df.columns.get_loc(column) for column in recorded},
+            "values": {column: df[column].copy() for column in recorded},
+        }
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+def restore_columns(df, snapshot, semaphore, created_columns=None):
+    """
+    Restores the columns recorded by snapshot_columns, at their former positions when they have been dropped, and
+    drops the given columns created since the snapshot. Other columns are left untouched.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be restored.
+        snapshot (dict): The snapshot of snapshot_columns.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        created_columns (list, optional): Columns created since the snapshot, to be dropped.
+
+    Returns:
+        None
+    """
+    semaphore.acquire()
+    try:
+        for column in created_columns or []:
+            if isinstance(column, str) and column in df.columns and column not in snapshot['values']:
+                del df[column]
+
+        for column, position in sorted(snapshot['positions'].items(), key=lambda item: item[1]):
+            if column in df.columns:
+                df[column] = snapshot['values'][column]
+            else:
+                df.insert(min(position, len(df.columns)), column, snapshot['values'][column])
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return None
+
 def check_columns(df, columns, semaphore):
     """
     Checks if any columns are duplicated in the list and if specified columns are present in the DataFrame.
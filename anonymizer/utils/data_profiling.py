@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from anonymizer.utils.data_processing import check_columns
+from anonymizer.utils.data_patterns import PII_PATTERNS
+
+PROFILE_PII_CLASSES = ['cpf', 'cnpj', 'email', 'phone', 'cep']
+
+DATETIME_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%Y/%m/%d',
+    '%Y/%m/%d %H:%M:%S',
+]
+
+def profile_dataframe(df, columns, semaphore, sample_size=1000, seed=None, threshold=0.95):
+    """
+    Profiles the specified columns of a DataFrame from a bounded random sample of its rows.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be profiled.
+        columns (list): List of column names to be profiled.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        sample_size (int, optional): Maximum number of rows inspected per column.
+        seed (int, optional): Seed used to draw the sample.
+        threshold (float, optional): Minimum ratio of sampled values that must agree with a type or PII class.
+
+    Returns:
+        dict: The profile of each column (see profile_column).
+    """
+    if not isinstance(sample_size, int) or isinstance(sample_size, bool) or sample_size < 1:
+        raise ValueError("Sample size should be a positive integer.")
+
+    check_columns(df, columns, semaphore)
+
+    semaphore.acquire()
+    try:
+        if len(df) > sample_size:
+            positions = np.sort(np.random.default_rng(seed).choice(len(df), size=sample_size, replace=False))
+            sample = df[columns].iloc[positions]
+        else:
+            sample = df[columns].copy()
+        row_count = len(df)
+    except Exception as e:
+        raise Exception("Unespected Error: " + str(e))
+    finally:
+        semaphore.release()
+
+    return {column: profile_column(sample[column], row_count, threshold) for column in columns}
+
+def profile_column(sample, row_count, threshold=0.95):
+    """
+    Profiles a sample of a column.
+
+    Args:
+        sample (pandas.Series): The sampled values of the column.
+        row_count (int): Number of rows of the whole column.
+        threshold (float, optional): Minimum ratio of sampled values that must agree with a type or PII class.
+
+    Returns:
+        dict: The column profile, with the following keys:
+            - 'dtype' (str): The storage type of the column.
+            - 'logical_type' (str): 'numeric', 'boolean', 'datetime', 'string' or 'empty'.
+            - 'datetime_format' (str): The format shared by the sampled dates, if any. Used to speed up conversions.
+            - 'null_ratio' (float): Ratio of missing values in the sample.
+            - 'distinct' (int): Number of distinct values in the sample.
+            - 'cardinality_ratio' (float): Ratio of distinct values among the non-missing sampled values.
+            - 'pii_class' (str): The most likely PII class ('cpf', 'cnpj', 'email', 'phone', 'cep', 'date' or 'numeric'), if any.
+            - 'pii_ratio' (float): Ratio of non-missing sampled values that match the PII class.
+            - 'sample_size' (int): Number of sampled values.
+            - 'row_count' (int): Number of rows of the column.
+    """
+    values = sample.dropna()
+    sample_length = len(sample)
+    value_count = len(values)
+
+    profile = {
+        'dtype': str(sample.dtype),
+        'logical_type': 'empty',
+        'datetime_format': None,
+        'null_ratio': round(1 - value_count / sample_length, 4) if sample_length else 0.0,
+        'distinct': 0,
+        'cardinality_ratio': 0.0,
+        'pii_class': None,
+        'pii_ratio': 0.0,
+        'sample_size': sample_length,
+        'row_count': row_count,
+    }
+
+    if not value_count:
+        return profile
+
+    distinct = values.astype(str).nunique()
+    profile['distinct'] = int(distinct)
+    profile['cardinality_ratio'] = round(distinct / value_count, 4)
+
+    if pd.api.types.is_bool_dtype(values):
+        profile['logical_type'] = 'boolean'
+    elif pd.api.types.is_numeric_dtype(values):
+        profile['logical_type'] = 'numeric'
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        profile['logical_type'] = 'datetime'
+    else:
+        strings = values.astype(str)
+        if pd.to_numeric(strings, errors='coerce').notna().mean() >= threshold:
+            profile['logical_type'] = 'numeric'
+        else:
+            datetime_format, datetime_ratio = infer_datetime_format(strings)
+            if datetime_ratio >= threshold:
+                profile['logical_type'] = 'datetime'
+                profile['datetime_format'] = datetime_format
+            else:
+                profile['logical_type'] = 'string'
+
+    pii_class, pii_ratio = infer_pii_class(values.astype(str))
+    if pii_ratio >= threshold or profile['logical_type'] not in ['numeric', 'datetime']:
+        profile['pii_class'] = pii_class if pii_ratio > 0 else None
+        profile['pii_ratio'] = pii_ratio
+    elif profile['logical_type'] == 'datetime':
+        profile['pii_class'] = 'date'
+        profile['pii_ratio'] = 1.0
+    else:
+        profile['pii_class'] = 'numeric'
+        profile['pii_ratio'] = 1.0
+
+    return profile
+
+def infer_datetime_format(strings):
+    """
+    Finds the datetime format matched by most of the sampled strings.
+
+    Only unambiguous (ISO 8601 like) formats are tried, so parsing with the inferred format always
+    gives the same dates as the generic parser.
+
+    Args:
+        strings (pandas.Series): The sampled non-missing values, as strings.
+
+    Returns:
+        tuple: The format (or None when no format matches at all) and the ratio of strings that match it.
+    """
+    best_format, best_ratio = None, 0.0
+    for datetime_format in DATETIME_FORMATS:
+        ratio = pd.to_datetime(strings, format=datetime_format, errors='coerce').notna().mean()
+        if ratio > best_ratio:
+            best_format, best_ratio = datetime_format, ratio
+            if ratio == 1:
+                break
+
+    if best_ratio < 1:
+        mixed_ratio = pd.to_datetime(strings, format='mixed', errors='coerce').notna().mean()
+        if mixed_ratio > best_ratio:
+            return None, round(mixed_ratio, 4)
+
+    return best_format, round(best_ratio, 4)
+
+def infer_pii_class(strings):
+    """
+    Finds the PII class whose pattern fully matches most of the sampled strings.
+
+    Args:
+        strings (pandas.Series): The sampled non-missing values, as strings.
+
+    Returns:
+        tuple: The PII class (or None) and the ratio of strings that match it.
+    """
+    best_class, best_ratio = None, 0.0
+    stripped = strings.str.strip()
+    for pii_class in PROFILE_PII_CLASSES:
+        ratio = stripped.str.fullmatch(PII_PATTERNS[pii_class]).mean()
+        if ratio > best_ratio:
+            best_class, best_ratio = pii_class, ratio
+
+    return best_class, round(float(best_ratio), 4)
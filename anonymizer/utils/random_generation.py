@@ -0,0 +1,55 @@
+import numpy as np
+
+def create_seed_sequence(seed=None):
+    """
+    Creates the root seed sequence of a task.
+
+    Args:
+        seed (int, optional): The task seed. When omitted, fresh entropy is drawn from the operating system.
+
+    Returns:
+        numpy.random.SeedSequence: The root seed sequence. Its 'entropy' attribute can be stored to replay the task.
+    """
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("Seed should be a non-negative integer.")
+
+    return np.random.SeedSequence(seed)
+
+def spawn_seed_sequence(seed_sequence, *keys):
+    """
+    Derives an independent child seed sequence identified by the given keys.
+
+    Unlike SeedSequence.spawn, the derivation is stateless, so the same keys always produce the same
+    child stream no matter in which order, or in which thread, the children are requested.
+
+    Args:
+        seed_sequence (numpy.random.SeedSequence): The parent seed sequence.
+        keys (int): The non-negative integers identifying the child (e.g. parameter id, column position).
+
+    Returns:
+        numpy.random.SeedSequence: The child seed sequence.
+    """
+    return np.random.SeedSequence(
+        entropy=seed_sequence.entropy,
+        spawn_key=tuple(seed_sequence.spawn_key) + tuple(keys),
+        pool_size=seed_sequence.pool_size
+    )
+
+def get_random_generator(configuration, *keys):
+    """
+    Returns a random generator for an algorithm call, derived from the seed sequence in its configuration.
+
+    Args:
+        configuration (dict): The algorithm configuration.
+            - 'seed_sequence' (numpy.random.SeedSequence, optional): The seed sequence of the parameter.
+              When missing, the generator is seeded with fresh entropy.
+        keys (int): Additional keys identifying an independent stream (e.g. the column position).
+
+    Returns:
+        numpy.random.Generator: The random generator.
+    """
+    seed_sequence = configuration.get('seed_sequence')
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence()
+
+    return np.random.default_rng(spawn_seed_sequence(seed_sequence, *keys))
@@ -0,0 +1,211 @@
+ALGORITHMS = {}
+
+COLUMN_TRANSFORMS = {}
+
+COST_CLASSES = ['low', 'medium', 'high']
+
+STRUCTURE_CHANGES = [None, 'drops_columns', 'adds_columns', 'replaces_columns']
+
+TYPE_NAMES = {bool: 'a boolean', int: 'an integer', float: 'a float', str: 'a string', list: 'a list', dict: 'a dictionary'}
+
+ENCRYPTION_KEY = {'key': {'label': 'Encryption key', 'type': str, 'required': True}}
+
+N_VALUE = {'n': {'label': 'N Value', 'type': int, 'required': True, 'minimum': 1}}
+
+NONCE_COLUMNS = {'template': '{column}[{parameter_id}]_nonce'}
+
+# The schema of each algorithm: what a request may ask of it, and how it changes the data. The schemas are kept apart
+# from the algorithm implementations, so requests can be checked (see service.validation) without importing pandas,
+# NumPy or the algorithm libraries. Each schema has the keys:
+#   - 'row_local' (bool): Whether the output of a row depends on that row only, so the algorithm can run on row
+#     partitions and row groups independently. Algorithms that are not row-local are dataset-global.
+#   - 'structure' (str): How the algorithm changes the columns of the data: 'drops_columns', 'adds_columns',
+#     'replaces_columns' (drops its columns and adds others), or None when it only changes their values.
+#   - 'configuration' (dict): The fields of the configuration (see check_configuration). Fields that are not declared
+#     are not checked.
+#   - 'output_columns' (dict): The columns created by the algorithms that add or replace columns (see
+#     output_columns): a 'template' formatted with each of its columns and its parameter ID, or the configuration
+#     'field' that names a single created column, with its 'default'.
+ALGORITHM_SCHEMAS = {
+    'encrypt.chacha20': {'row_local': True, 'structure': 'adds_columns', 'configuration': ENCRYPTION_KEY, 'output_columns': NONCE_COLUMNS},
+    'encrypt.aes': {'row_local': True, 'structure': None, 'configuration': ENCRYPTION_KEY},
+    'encrypt.salsa20': {'row_local': True, 'structure': 'adds_columns', 'configuration': ENCRYPTION_KEY, 'output_columns': NONCE_COLUMNS},
+    'generalize.percent': {'row_local': True, 'structure': None, 'configuration': {}},
+    'generalize.age': {'row_local': True, 'structure': None, 'configuration': {}},
+    'generalize.mondrian': {'row_local': False, 'structure': None, 'configuration': {
+        'k': {'label': 'K', 'type': int, 'required': True, 'minimum': 1},
+    }},
+    'hash.md5': {'row_local': True, 'structure': None, 'configuration': {}},
+    'hash.sha1': {'row_local': True, 'structure': None, 'configuration': {}},
+    'hash.sha256': {'row_local': True, 'structure': None, 'configuration': {}},
+    'mask.full': {'row_local': True, 'structure': None, 'configuration': {}},
+    'mask.range': {'row_local': True, 'structure': None, 'configuration': {
+        'start_index': {'label': 'Start Index', 'type': int, 'required': True, 'minimum': 1},
+        'end_index': {'label': 'End Index', 'type': int, 'required': True},
+    }},
+    'mask.last_n_characters': {'row_local': True, 'structure': None, 'configuration': N_VALUE},
+    'mask.first_n_characters': {'row_local': True, 'structure': None, 'configuration': N_VALUE},
+    'mask.email': {'row_local': True, 'structure': None, 'configuration': {}},
+    'mask.cpf': {'row_local': True, 'structure': None, 'configuration': {}},
+    'mask.patterns': {'row_local': True, 'structure': None, 'configuration': {
+        'patterns': {'label': 'Patterns', 'type': (list, dict)},
+        'mask_char': {'label': 'Mask char', 'type': str},
+    }},
+    'null_out.columns': {'row_local': True, 'structure': 'drops_columns', 'configuration': {}},
+    'perturb.date': {'row_local': True, 'structure': None, 'configuration': {
+        'unit': {'label': 'Unit of Time', 'type': str, 'required': True, 'choices': ['days', 'hours', 'minutes', 'seconds', 'milliseconds', 'microseconds', 'nanoseconds']},
+        'min_value': {'label': 'Minimum number of units', 'type': int, 'required': True},
+        'max_value': {'label': 'Maximum number of units', 'type': int, 'required': True},
+    }},
+    'perturb.numeric_range': {'row_local': True, 'structure': None, 'configuration': {
+        'min_value': {'label': 'Minimum of the range', 'type': int, 'required': True},
+        'max_value': {'label': 'Maximum of the range', 'type': int, 'required': True},
+    }},
+    'perturb.numeric_gaussian': {'row_local': True, 'structure': None, 'configuration': {
+        'std': {'label': 'Perturbation std', 'type': float, 'required': True},
+    }},
+    'perturb.numeric_laplacian': {'row_local': True, 'structure': None, 'configuration': {
+        'value': {'label': 'Perturbation value', 'type': int, 'required': True},
+    }},
+    'pseudonymize.columns': {'row_local': True, 'structure': None, 'configuration': {}},
+    'pseudonymize.rows': {'row_local': True, 'structure': 'replaces_columns', 'configuration': {
+        'output_column': {'label': 'Output column', 'type': str},
+    }, 'output_columns': {'field': 'output_column', 'default': 'Object'}},
+    'pseudonymize.fast': {'row_local': True, 'structure': None, 'configuration': {
+        'key': {'label': 'Pseudonymization key', 'type': str, 'required': True},
+        'format': {'label': 'Format', 'type': str, 'choices': ['base32', 'integer']},
+    }},
+    'swap.columns': {'row_local': False, 'structure': None, 'configuration': {}},
+    'swap.rows': {'row_local': False, 'structure': None, 'configuration': {
+        'group_by': {'label': 'Group By column', 'type': str, 'column': True},
+    }},
+}
+
+def get_schema(algorithm):
+    """
+    Returns the schema of an algorithm (see ALGORITHM_SCHEMAS), or None for names that are not algorithms.
+    """
+    return ALGORITHM_SCHEMAS.get(algorithm) if isinstance(algorithm, str) else None
+
+def register_algorithm(name, deterministic=False, seeded=False, column_local=False, cost='medium'):
+    """
+    Registers an algorithm under its name, with the capabilities the planner, the partitioning and the result cache
+    rely on, and those of its schema (see ALGORITHM_SCHEMAS). Capabilities default to the safest assumption, so an
+    algorithm declared without them runs one step at a time, and is never cached.
+
+    Args:
+        name (str): Name of the algorithm in the execution parameters. It must have a schema.
+        deterministic (bool, optional): Whether the output depends only on the input and configuration.
+        seeded (bool, optional): Whether the algorithm is randomized and draws from the task seed, so it is
+            deterministic when the seed is given.
+        column_local (bool, optional): Whether each column is transformed independently of the others, so the
+            algorithm can run on separate columns in parallel.
+        cost (str, optional): Approximate cost class per cell: 'low', 'medium' or 'high'.
+
+    Returns:
+        function: The decorator, which returns the algorithm function unchanged.
+    """
+    if cost not in COST_CLASSES:
+        raise ValueError(f"Cost class should be one of {COST_CLASSES}.")
+    if name not in ALGORITHM_SCHEMAS:
+        raise ValueError(f"Algorithm {name} has no schema.")
+    if ALGORITHM_SCHEMAS[name]['structure'] not in STRUCTURE_CHANGES:
+        raise ValueError(f"Structure change should be one of {STRUCTURE_CHANGES}.")
+    if ALGORITHM_SCHEMAS[name]['structure'] in ['adds_columns', 'replaces_columns'] and 'output_columns' not in ALGORITHM_SCHEMAS[name]:
+        raise ValueError(f"Algorithm {name} creates columns, but its schema does not declare them.")
+
+    def decorator(function):
+        ALGORITHMS[name] = dict(
+            ALGORITHM_SCHEMAS[name],
+            function=function,
+            deterministic=deterministic,
+            seeded=seeded,
+            column_local=column_local,
+            cost=cost,
+        )
+        return function
+
+    return decorator
+
+def register_transform(name):
+    """
+    Registers the column transform of an algorithm: a function that takes the algorithm configuration and returns a
+    string-to-string function (see anonymizer.utils.data_processing.apply_string_transforms). Algorithms with a column
+    transform can be fused with the neighbouring ones into a single pass over their columns.
+
+    Args:
+        name (str): Name of the algorithm in the execution parameters.
+
+    Returns:
+        function: The decorator, which returns the transform function unchanged.
+    """
+    def decorator(function):
+        COLUMN_TRANSFORMS[name] = function
+        return function
+
+    return decorator
+
+def check_configuration(schema, configuration):
+    """
+    Checks a configuration against the schema of an algorithm, without the data. Constraints between fields, and
+    between the configuration and the data, are left to the algorithm.
+
+    Args:
+        schema (dict): The schema of the algorithm. Each field is declared by a dictionary with the keys:
+            - 'label' (str): Name of the field in the error messages.
+            - 'type' (type or tuple): The accepted type(s). Booleans are not accepted as numbers.
+            - 'required' (bool, optional): Whether the field must be given. As in the algorithms, empty values and
+              zero count as not given.
+            - 'choices' (list, optional): The accepted values.
+            - 'minimum' (int or float, optional): The smallest accepted value.
+            - 'column' (bool, optional): Whether the value names a column of the data (see column_fields).
+        configuration (dict): The configuration to be checked.
+
+    Raises:
+        ValueError: If the configuration is not a dictionary, or a field is missing or invalid.
+    """
+    if not isinstance(configuration, dict):
+        raise ValueError("Configuration should be a dictionary.")
+
+    for field, declaration in schema.items():
+        value = configuration.get(field)
+        if value is None or (declaration.get('required') and not value):
+            if declaration.get('required'):
+                raise ValueError(f"{declaration['label']} not provided in the configuration.")
+            continue
+
+        types = declaration['type'] if isinstance(declaration['type'], tuple) else (declaration['type'],)
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise ValueError(f"{declaration['label']} should be {' or '.join(TYPE_NAMES[type_] for type_ in types)}.")
+
+        if 'choices' in declaration and value not in declaration['choices']:
+            raise ValueError(f"{declaration['label']} should be one of {declaration['choices']}.")
+
+        if 'minimum' in declaration and value < declaration['minimum']:
+            raise ValueError(f"{declaration['label']} should be at least {declaration['minimum']}.")
+
+def column_fields(schema):
+    return [field for field, declaration in schema.items() if declaration.get('column')]
+
+def output_columns(schema, columns, configuration, parameter_id):
+    """
+    Returns the columns created by a parameter of an algorithm, as declared by the 'output_columns' of its schema
+    (see ALGORITHM_SCHEMAS).
+
+    Args:
+        schema (dict): The schema of the algorithm, or None.
+        columns (list): The columns of the parameter.
+        configuration (dict): The configuration of the parameter.
+        parameter_id (int): The ID of the parameter.
+
+    Returns:
+        list: The created columns, empty for algorithms that do not create columns.
+    """
+    declaration = (schema or {}).get('output_columns')
+    if not declaration:
+        return []
+
+    if 'template' in declaration:
+        return [declaration['template'].format(column=column, parameter_id=parameter_id) for column in columns]
+
+    return [configuration.get(declaration['field'], declaration['default'])]
@@ -0,0 +1,157 @@
+import math
+import numpy as np
+import pandas as pd
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+def precision_for_error(relative_error):
+    """
+    Returns the HyperLogLog precision whose relative standard error (1.04 / sqrt(2 ** precision)) is within the
+    given bound.
+
+    Args:
+        relative_error (float): The relative standard error bound, between 0 and 1.
+
+    Returns:
+        int: The precision, between 4 and 16.
+
+    Raises:
+        ValueError: If the bound is not a number between 0 and 1.
+    """
+    if isinstance(relative_error, bool) or not isinstance(relative_error, (int, float)) or not 0 < relative_error < 1:
+        raise ValueError("Relative error should be a number between 0 and 1.")
+
+    precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+def standard_error(precision):
+    return 1.04 / math.sqrt(2 ** precision)
+
+def hash_values(values):
+    """
+    Hashes the non-missing values of a Series into 64-bit integers, consistently across batches and processes.
+    Numeric values are hashed as floats, so 1 and 1.0 have the same hash, and other values as strings.
+
+    Args:
+        values (pandas.Series): The values.
+
+    Returns:
+        numpy.ndarray: The unsigned 64-bit hashes.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        array = values.to_numpy(dtype='float64')
+    else:
+        array = values.astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(array, categorize=False)
+
+def bit_length(values):
+    lengths = np.zeros(len(values), dtype=np.int64)
+    remaining = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = remaining >= (np.uint64(1) << np.uint64(shift))
+        lengths[mask] += shift
+        remaining[mask] >>= np.uint64(shift)
+    lengths += (remaining > 0)
+    return lengths
+
+def hash_registers(hashes, precision):
+    """
+    Splits 64-bit hashes into HyperLogLog register indexes (the first 'precision' bits) and ranks (the position of the
+    first set bit of the remaining bits).
+
+    Returns:
+        tuple: The register indexes and the ranks, as numpy arrays.
+    """
+    value_bits = 64 - precision
+    indexes = (hashes >> np.uint64(value_bits)).astype(np.int64)
+    remaining = hashes & np.uint64((1 << value_bits) - 1)
+    ranks = value_bits - bit_length(remaining) + 1
+    return indexes, ranks
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch. Registers are kept sparse (register index to rank) while few are set, so the
+    sketch of a small set takes memory proportional to its cardinality, and dense (one byte per register) otherwise.
+
+    Sketches of the same precision merge by taking the maximum rank of each register, so the sketch of a union is the
+    merge of the sketches of its parts.
+    """
+    def __init__(self, precision):
+        self.precision = precision
+        self.size = 2 ** precision
+        self.sparse = {}
+        self.dense = None
+
+    def update_registers(self, registers):
+        if self.dense is not None:
+            for index, rank in registers:
+                if rank > self.dense[index]:
+                    self.dense[index] = rank
+            return
+
+        for index, rank in registers:
+            if rank > self.sparse.get(index, 0):
+                self.sparse[index] = rank
+
+        if len(self.sparse) > self.size // 8:
+            self.dense = bytearray(self.size)
+            for index, rank in self.sparse.items():
+                self.dense[index] = rank
+            self.sparse = {}
+
+    def merge(self, other):
+        """
+        Merges another sketch of the same precision into this one.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Sketches of different precisions cannot be merged.")
+        self.update_registers(other.registers())
+        return self
+
+    def registers(self):
+        if self.dense is not None:
+            return [(index, rank) for index, rank in enumerate(self.dense) if rank]
+        return list(self.sparse.items())
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.update_registers(self.registers())
+        return sketch
+
+    def estimate(self):
+        """
+        Estimates the number of distinct values added to the sketch, with the linear counting correction for small
+        cardinalities.
+
+        Returns:
+            float: The estimated cardinality.
+        """
+        registers = self.registers()
+        zeros = self.size - len(registers)
+        harmonic_sum = zeros + sum(2.0 ** -rank for _, rank in registers)
+
+        if self.size == 16:
+            alpha = 0.673
+        elif self.size == 32:
+            alpha = 0.697
+        elif self.size == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / self.size)
+
+        estimate = alpha * self.size ** 2 / harmonic_sum
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+
+        return estimate
+
+    def to_list(self):
+        return [self.precision, [list(register) for register in self.registers()]]
+
+    @classmethod
+    def from_list(cls, values):
+        precision, registers = values
+        sketch = cls(precision)
+        sketch.update_registers((index, rank) for index, rank in registers)
+        return sketch
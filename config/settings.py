@@ -46,7 +46,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',  
+        'service.authentication.CachedTokenAuthentication',
     ),
 
 }
@@ -115,6 +115,70 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# The 'results' cache holds the content-addressed results of repeated submissions (see service/result_cache.py).
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) to share the entries among processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'anonymizer-results',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 256,
+        },
+    },
+}
+
 # Celery settings (better to use environment variable)
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
+CELERY_BEAT_SCHEDULE = {
+    'apply-retention-policies': {
+        'task': 'service.tasks.apply_retention_policies',
+        'schedule': 3600.0,
+    },
+}
+
+# Anonymizer settings
+# Cost model used to estimate requests (see 'python manage.py calibrate_cost_model'). None uses the built-in model.
+ANONYMIZER_COST_MODEL = None
+# Route synchronous requests whose estimated runtime exceeds the threshold to the asynchronous path.
+ANONYMIZER_SYNC_AUTO_ROUTING = False
+ANONYMIZER_SYNC_ROUTING_THRESHOLD_SECONDS = 5.0
+# Admission control of the synchronous route. The concurrency limits apply to each server process. An AdmissionPolicy
+# overrides the row, byte and per-user concurrency limits of a user.
+ANONYMIZER_SYNC_MAX_ROWS = 100000
+ANONYMIZER_SYNC_MAX_BYTES = 20 * 2 ** 20
+ANONYMIZER_SYNC_MAX_CONCURRENCY = 4
+ANONYMIZER_SYNC_MAX_CONCURRENCY_PER_USER = 2
+ANONYMIZER_SYNC_QUEUE_TIMEOUT_SECONDS = 2.0
+ANONYMIZER_SYNC_RETRY_AFTER_SECONDS = 5
+# Server-sent task events. Redis carries the events from the workers; None uses the Celery broker.
+ANONYMIZER_TASK_EVENTS = True
+ANONYMIZER_EVENTS_REDIS_URL = None
+ANONYMIZER_EVENTS_HEARTBEAT_SECONDS = 15
+ANONYMIZER_EVENTS_POLL_SECONDS = 2
+ANONYMIZER_EVENTS_MAX_SECONDS = 3600
+# Largest synchronous result stored in the 'results' cache.
+ANONYMIZER_RESULT_CACHE_MAX_ENTRY_BYTES = 5 * 2 ** 20
+# Token authentication cache. None keeps a bounded in-process cache; a cache alias (e.g. a Redis cache) shares it.
+ANONYMIZER_TOKEN_CACHE = None
+ANONYMIZER_TOKEN_CACHE_TIMEOUT = 60
+ANONYMIZER_TOKEN_CACHE_MAX_ENTRIES = 1024
+# Retention of task results, for users without a policy of their own (see RetentionPolicy). None keeps them forever.
+ANONYMIZER_RETENTION_COMPRESS_AFTER_HOURS = None
+ANONYMIZER_RETENTION_PURGE_AFTER_DAYS = None
+# Maximum number of SQLite pages reclaimed per retention run.
+ANONYMIZER_RETENTION_VACUUM_PAGES = 1000
+# Rows per partition of distributed asynchronous tasks, unless the request sets 'partition_rows'. None disables it.
+ANONYMIZER_PARTITION_ROWS = None
+# Worker processes that measure the real data of asynchronous tasks while the algorithms run. 0 uses a thread, as do
+# daemonic workers such as the children of the Celery prefork pool.
+ANONYMIZER_METRIC_PROCESSES = 1
+# Rows per row group of out-of-core asynchronous tasks, unless the request sets 'row_group_rows'. None disables it.
+ANONYMIZER_ROW_GROUP_ROWS = None
+# Local directory of the columnar files of out-of-core tasks. None uses the system temporary directory.
+ANONYMIZER_OUT_OF_CORE_DIR = None
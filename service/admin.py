@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import AdmissionPolicy, RetentionPolicy
+
+admin.site.register(RetentionPolicy)
+admin.site.register(AdmissionPolicy)
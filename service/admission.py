@@ -0,0 +1,184 @@
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import close_old_connections
+from .models import AdmissionPolicy
+import functools
+import threading
+
+_lock = threading.Lock()
+_executor = None
+_global_slots = None
+_user_slots = {}
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a synchronous request is not admitted.
+
+    Attributes:
+        status (int): The HTTP status of the rejection (413 for oversized payloads, 429 for saturation).
+        retry_after (int): Seconds after which the request may be retried, if retrying can help.
+    """
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def get_limits(user_id=None):
+    """
+    Returns the admission limits of the synchronous route, read from the ANONYMIZER_SYNC_* settings. The row, byte
+    and per-user concurrency limits of a user with an AdmissionPolicy are those of the policy, where it sets them.
+
+    The concurrency limits apply to each server process.
+
+    Args:
+        user_id (int, optional): The primary key of the user.
+
+    Returns:
+        dict: The limits.
+    """
+    limits = {
+        'max_rows': settings.ANONYMIZER_SYNC_MAX_ROWS,
+        'max_bytes': settings.ANONYMIZER_SYNC_MAX_BYTES,
+        'max_concurrency': settings.ANONYMIZER_SYNC_MAX_CONCURRENCY,
+        'max_concurrency_per_user': settings.ANONYMIZER_SYNC_MAX_CONCURRENCY_PER_USER,
+        'queue_timeout_seconds': settings.ANONYMIZER_SYNC_QUEUE_TIMEOUT_SECONDS,
+        'retry_after_seconds': settings.ANONYMIZER_SYNC_RETRY_AFTER_SECONDS,
+    }
+
+    policy = AdmissionPolicy.objects.filter(user_id=user_id).first() if user_id is not None else None
+    if policy:
+        for limit, value in [('max_rows', policy.max_rows), ('max_bytes', policy.max_bytes), ('max_concurrency_per_user', policy.max_concurrency)]:
+            if value is not None:
+                limits[limit] = value
+
+    return limits
+
+def check_content_length(meta, limits):
+    """
+    Rejects a request whose declared body size exceeds the byte ceiling, before the body is read and parsed.
+
+    Args:
+        meta (dict): The request META, holding the 'CONTENT_LENGTH' header.
+        limits (dict): The limits of the user (see get_limits).
+
+    Raises:
+        AdmissionRejected: If the body is larger than the ceiling.
+    """
+    try:
+        content_length = int(meta.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+
+    max_bytes = limits['max_bytes']
+    if max_bytes and content_length > max_bytes:
+        raise AdmissionRejected(f"Payload exceeds the synchronous limit of {max_bytes} bytes. Use the asynchronous route.", 413)
+
+def check_row_count(data, limits):
+    """
+    Rejects a payload with more rows than the row ceiling.
+
+    Args:
+        data (list): List of dictionaries representing the input data.
+        limits (dict): The limits of the user (see get_limits).
+
+    Raises:
+        AdmissionRejected: If the data has more rows than the ceiling.
+    """
+    max_rows = limits['max_rows']
+    if max_rows and isinstance(data, list) and len(data) > max_rows:
+        raise AdmissionRejected(f"Payload exceeds the synchronous limit of {max_rows} rows. Use the asynchronous route.", 413)
+
+def get_global_slots():
+    global _global_slots, _executor
+    with _lock:
+        if _global_slots is None:
+            max_concurrency = get_limits()['max_concurrency']
+            _global_slots = threading.BoundedSemaphore(max_concurrency)
+            _executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='anonymizer-sync')
+        return _global_slots
+
+def get_executor():
+    get_global_slots()
+    return _executor
+
+@contextmanager
+def admit(user_id, limits):
+    """
+    Admits a synchronous request of a user, holding one of the user's slots and one of the global slots until the
+    context exits.
+
+    A user at their limit is rejected at once. When every global slot is taken, the request waits up to the queue
+    timeout for one to be released.
+
+    Args:
+        user_id (int): The primary key of the user.
+        limits (dict): The limits of the user (see get_limits).
+
+    Raises:
+        AdmissionRejected: With status 429 and a retry hint, if the request is not admitted.
+    """
+    with _lock:
+        if _user_slots.get(user_id, 0) >= limits['max_concurrency_per_user']:
+            raise AdmissionRejected("Too many concurrent synchronous requests for this user.", 429, limits['retry_after_seconds'])
+        _user_slots[user_id] = _user_slots.get(user_id, 0) + 1
+
+    try:
+        global_slots = get_global_slots()
+        if not global_slots.acquire(timeout=limits['queue_timeout_seconds']):
+            raise AdmissionRejected("The server is busy with other synchronous requests.", 429, limits['retry_after_seconds'])
+        try:
+            yield
+        finally:
+            global_slots.release()
+    finally:
+        with _lock:
+            _user_slots[user_id] -= 1
+            if not _user_slots[user_id]:
+                del _user_slots[user_id]
+
+def run_admitted(user_id, limits, function, *args):
+    """
+    Runs a synchronous workload on the bounded pool, once the request is admitted, and waits for its result.
+
+    Args:
+        user_id (int): The primary key of the user.
+        limits (dict): The limits of the user (see get_limits).
+        function (callable): The workload.
+        args: The arguments of the workload.
+
+    Returns:
+        The result of the workload.
+
+    Raises:
+        AdmissionRejected: If the request is not admitted.
+    """
+    with admit(user_id, limits):
+        return get_executor().submit(function, *args).result()
+
+def offload_view(view):
+    """
+    Wraps a synchronous view into an asynchronous one that runs it on a worker thread.
+
+    Under ASGI, synchronous views share a single thread, so a long synchronous request would hold every other
+    synchronous view. Offloaded views run in parallel instead, and the event loop stays free while they wait on the
+    bounded pool. Under WSGI the wrapper is transparent.
+
+    Args:
+        view (callable): The synchronous view.
+
+    Returns:
+        callable: The asynchronous view.
+    """
+    def run(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    @functools.wraps(view)
+    async def offloaded_view(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False)(request, *args, **kwargs)
+
+    return offloaded_view
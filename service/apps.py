@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'service'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from rest_framework.authtoken.models import Token
+        from .authentication import invalidate_saved_token, invalidate_user_tokens
+
+        # Drops cached token credentials when a token or its user changes.
+        post_save.connect(invalidate_saved_token, sender=Token)
+        post_delete.connect(invalidate_saved_token, sender=Token)
+        post_save.connect(invalidate_user_tokens, sender=User)
+        post_delete.connect(invalidate_user_tokens, sender=User)
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+import hashlib
+import threading
+import time
+
+class TTLCache:
+    """
+    Bounded in-process cache whose entries expire after a fixed time. When full, the least recently used entry is
+    evicted.
+    """
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class TokenCacheStats:
+    """
+    Hit, miss and invalidation counters of the token cache, for this process.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def increment(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+token_cache_stats = TokenCacheStats()
+
+def get_token_cache():
+    """
+    Returns the cache of authenticated tokens: the Django cache named by the ANONYMIZER_TOKEN_CACHE setting (e.g. a
+    Redis cache shared by every process), or a bounded in-process cache when the setting is None.
+    """
+    global _local_cache
+    alias = getattr(settings, 'ANONYMIZER_TOKEN_CACHE', None)
+    if alias:
+        return caches[alias]
+
+    with _local_cache_lock:
+        if _local_cache is None:
+            _local_cache = TTLCache(
+                getattr(settings, 'ANONYMIZER_TOKEN_CACHE_MAX_ENTRIES', 1024),
+                getattr(settings, 'ANONYMIZER_TOKEN_CACHE_TIMEOUT', 60)
+            )
+        return _local_cache
+
+def token_cache_key(key):
+    return 'token:' + hashlib.sha256(key.encode()).hexdigest()
+
+def invalidate_token(key):
+    get_token_cache().delete(token_cache_key(key))
+    token_cache_stats.increment('invalidations')
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the token and its user, so authenticated requests skip the token query and the
+    join to the user while the entry lives.
+
+    Entries expire after ANONYMIZER_TOKEN_CACHE_TIMEOUT seconds, and are invalidated when the token is deleted or
+    rotated, or when its user is saved or deleted. With the in-process cache, invalidations only reach the process
+    that made the change, so the timeout bounds how long other processes may accept a revoked token.
+    """
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key = token_cache_key(key)
+
+        credentials = cache.get(cache_key)
+        if credentials is not None:
+            token_cache_stats.increment('hits')
+            return credentials
+
+        token_cache_stats.increment('misses')
+        credentials = super().authenticate_credentials(key)
+        cache.set(cache_key, credentials)
+
+        return credentials
+
+def invalidate_saved_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+def invalidate_user_tokens(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from .planning import DROP_ALGORITHM, is_column_list, is_row_local
+
+def get_partition_rows(payload):
+    """
+    Returns the number of rows per partition of a distributed task: the 'partition_rows' of the payload, or the
+    ANONYMIZER_PARTITION_ROWS setting. None disables the distributed mode.
+    """
+    partition_rows = payload.get('partition_rows', getattr(settings, 'ANONYMIZER_PARTITION_ROWS', None))
+    if partition_rows is None:
+        return None
+    if not isinstance(partition_rows, int) or isinstance(partition_rows, bool) or partition_rows < 1:
+        raise ValueError("Partition rows should be a positive integer.")
+    return partition_rows
+
+def split_execution_plan(steps):
+    """
+    Splits an execution plan into the leading row-local steps, which run on each partition, and the remaining steps,
+    which run on the merged data. Dataset-global steps such as swaps, and every step after them, run after the merge,
+    on a single worker, where they draw from the same seed streams as a single-worker run. The permutations of the
+    swaps are not applied one partition at a time, since they move values across partitions.
+
+    Args:
+        steps (list): The plan steps (see service.planning.optimize_execution_parameters).
+
+    Returns:
+        tuple: The partition steps and the merge steps.
+    """
+    for index, step in enumerate(steps):
+        if not is_row_local(step['algorithm']) or not is_column_list(step['columns']):
+            return steps[:index], steps[index:]
+    return steps, []
+
+def partition_bounds(rows, partition_rows):
+    return [(start, min(start + partition_rows, rows)) for start in range(0, rows, partition_rows)]
+
+def fill_partition_columns(df, steps):
+    """
+    Fills the missing values of the columns used by the partition steps over the whole DataFrame, as the algorithms
+    would. The algorithms fill missing values from the neighbouring rows, which would differ at partition boundaries.
+    """
+    columns = []
+    for step in steps:
+        if step['algorithm'] != DROP_ALGORITHM:
+            columns += [column for column in step['columns'] if column in df.columns and column not in columns]
+
+    if columns:
+        df[columns] = df[columns].fillna(method='ffill').fillna(method='bfill')
+
+def merge_errors(errors):
+    """
+    Removes the errors repeated by several partitions.
+    """
+    merged_errors = []
+    for error in errors:
+        if error not in merged_errors:
+            merged_errors.append(error)
+    return merged_errors
+
+def merge_reports(reports):
+    """
+    Merges the reports of the partitions into one report per parameter, adding up their counters.
+    """
+    merged_reports = {}
+    for report_info in reports:
+        key = (report_info['parameter_id'], report_info['algorithm'])
+        if key in merged_reports:
+            merged_reports[key]['report'] = add_counters(merged_reports[key]['report'], report_info['report'])
+        else:
+            merged_reports[key] = dict(report_info)
+    return list(merged_reports.values())
+
+def add_counters(first, second):
+    if isinstance(first, dict) and isinstance(second, dict):
+        merged = dict(first)
+        for key, value in second.items():
+            merged[key] = add_counters(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(first, (int, float)) and isinstance(second, (int, float)) and not isinstance(first, bool):
+        return first + second
+    return first
@@ -0,0 +1,152 @@
+from django.conf import settings
+
+# Calibrated with 'python manage.py calibrate_cost_model' (20000 rows). Override with the ANONYMIZER_COST_MODEL setting.
+DEFAULT_COST_MODEL = {
+    'base': {
+        'string': {'seconds_per_cell': 2.53e-06, 'bytes_per_cell': 202},
+        'numeric': {'seconds_per_cell': 1.34e-06, 'bytes_per_cell': 186},
+    },
+    'metrics': {'seconds_per_row': 8.2e-06, 'bytes_per_row': 58},
+    'algorithms': {
+        'encrypt.chacha20': {'seconds_per_cell': 2.52e-06, 'bytes_per_cell': 85},
+        'encrypt.aes': {'seconds_per_cell': 2.85e-06, 'bytes_per_cell': 86},
+        'encrypt.salsa20': {'seconds_per_cell': 2.29e-06, 'bytes_per_cell': 85},
+        'generalize.percent': {'seconds_per_cell': 3.3e-07, 'bytes_per_cell': 49},
+        'generalize.age': {'seconds_per_cell': 3.11e-07, 'bytes_per_cell': 49},
+        'generalize.mondrian': {'seconds_per_cell': 2e-07, 'bytes_per_cell': 46},
+        'hash.md5': {'seconds_per_cell': 1.67e-06, 'bytes_per_cell': 118},
+        'hash.sha1': {'seconds_per_cell': 1.63e-06, 'bytes_per_cell': 126},
+        'hash.sha256': {'seconds_per_cell': 1.64e-06, 'bytes_per_cell': 150},
+        'mask.full': {'seconds_per_cell': 4.21e-07, 'bytes_per_cell': 37},
+        'mask.range': {'seconds_per_cell': 1.8e-06, 'bytes_per_cell': 97},
+        'mask.first_n_characters': {'seconds_per_cell': 1.14e-06, 'bytes_per_cell': 97},
+        'mask.last_n_characters': {'seconds_per_cell': 1.72e-06, 'bytes_per_cell': 97},
+        'mask.email': {'seconds_per_cell': 1.41e-06, 'bytes_per_cell': 102},
+        'mask.cpf': {'seconds_per_cell': 2.58e-06, 'bytes_per_cell': 183},
+        'mask.patterns': {'seconds_per_cell': 1.57e-05, 'bytes_per_cell': 148},
+        'null_out.columns': {'seconds_per_cell': 2.09e-08, 'bytes_per_cell': 0},
+        'perturb.date': {'seconds_per_cell': 3.33e-07, 'bytes_per_cell': 25},
+        'perturb.numeric_range': {'seconds_per_cell': 9.51e-08, 'bytes_per_cell': 17},
+        'perturb.numeric_gaussian': {'seconds_per_cell': 1.36e-07, 'bytes_per_cell': 17},
+        'perturb.numeric_laplacian': {'seconds_per_cell': 1.09e-07, 'bytes_per_cell': 18},
+        'pseudonymize.columns': {'seconds_per_cell': 1.67e-06, 'bytes_per_cell': 120},
+        'pseudonymize.rows': {'seconds_per_cell': 2e-06, 'bytes_per_cell': 166},
+        'pseudonymize.fast': {'seconds_per_cell': 1.4e-06, 'bytes_per_cell': 154},
+        'swap.columns': {'seconds_per_cell': 4.23e-07, 'bytes_per_cell': 37},
+        'swap.rows': {'seconds_per_cell': 4.22e-07, 'bytes_per_cell': 41},
+    },
+    'default': {'seconds_per_cell': 1.6e-05, 'bytes_per_cell': 200},
+}
+
+TYPE_SAMPLE_SIZE = 100
+
+def get_cost_model():
+    return getattr(settings, 'ANONYMIZER_COST_MODEL', None) or DEFAULT_COST_MODEL
+
+def infer_column_types(data):
+    """
+    Infers, from the first records of the data, whether each column holds numbers or strings.
+
+    Args:
+        data (list): List of dictionaries representing the input data.
+
+    Returns:
+        dict: 'numeric' or 'string' for each column.
+    """
+    column_types = {}
+    for record in data[:TYPE_SAMPLE_SIZE]:
+        if not isinstance(record, dict):
+            continue
+        for column, value in record.items():
+            if value is None:
+                column_types.setdefault(column, 'numeric')
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                column_types[column] = 'string'
+            else:
+                column_types.setdefault(column, 'numeric')
+
+    return column_types
+
+def estimate_cost(payload, asynchronous=False):
+    """
+    Estimates the runtime and peak memory of processing a payload, from the row count, the column types and the
+    chosen algorithms, using a cost model calibrated from benchmark runs.
+
+    Args:
+        payload (dict): A dictionary containing 'data' and 'execution_parameters' (see service.tasks.sync_process_data).
+        asynchronous (bool, optional): Whether the privacy metrics of the asynchronous route are included.
+
+    Returns:
+        dict: The estimate, with the following keys:
+            - 'rows' (int): Number of rows of the data.
+            - 'columns' (int): Number of columns of the data.
+            - 'estimated_seconds' (float): Estimated processing time.
+            - 'estimated_peak_memory_bytes' (int): Estimated peak memory of the processing.
+            - 'parameters' (list): Estimated processing time of each parameter.
+    """
+    cost_model = get_cost_model()
+    data = payload.get('data') or []
+    if not isinstance(data, list):
+        raise ValueError("Data should be a list of records.")
+
+    rows = len(data)
+    column_types = infer_column_types(data)
+
+    base_seconds = 0.0
+    base_bytes = 0.0
+    for column_type in column_types.values():
+        base_cost = cost_model['base'][column_type]
+        base_seconds += base_cost['seconds_per_cell'] * rows
+        base_bytes += base_cost['bytes_per_cell'] * rows
+
+    estimated_seconds = base_seconds
+    step_bytes = 0.0
+    parameters = []
+
+    execution_parameters = payload.get('execution_parameters') or []
+    for parameter_id, parameter in enumerate(execution_parameters, start=1):
+        algorithm = parameter.get('algorithm') if isinstance(parameter, dict) else None
+        columns = parameter.get('columns') if isinstance(parameter, dict) else None
+        cells = rows * (len(columns) if isinstance(columns, list) else 0)
+
+        algorithm_cost = cost_model['algorithms'].get(algorithm, cost_model['default']) if isinstance(algorithm, str) else cost_model['default']
+        seconds = algorithm_cost['seconds_per_cell'] * cells
+        estimated_seconds += seconds
+        step_bytes = max(step_bytes, algorithm_cost['bytes_per_cell'] * cells)
+        parameters.append({"parameter_id": parameter_id, "algorithm": algorithm, "estimated_seconds": round(seconds, 3)})
+
+    metrics_bytes = 0.0
+    if asynchronous:
+        metric_columns = sum(len(payload.get(key) or []) for key in ['sensitive_columns', 'diversity_columns', 'closeness_columns'])
+        metric_factor = max(1.0, metric_columns / 3)
+        estimated_seconds += 2 * cost_model['metrics']['seconds_per_row'] * rows * metric_factor
+        metrics_bytes = cost_model['metrics']['bytes_per_row'] * rows * metric_factor
+
+    return {
+        "rows": rows,
+        "columns": len(column_types),
+        "estimated_seconds": round(estimated_seconds, 3),
+        "estimated_peak_memory_bytes": int(base_bytes + max(step_bytes, metrics_bytes)),
+        "parameters": parameters
+    }
+
+def should_route_to_async(payload):
+    """
+    Checks whether a synchronous request should be routed to the asynchronous path, because its estimated runtime
+    exceeds the ANONYMIZER_SYNC_ROUTING_THRESHOLD_SECONDS setting. Routing is enabled by the ANONYMIZER_SYNC_AUTO_ROUTING
+    setting, and can be overridden per request with the 'auto_route' attribute.
+
+    Args:
+        payload (dict): The synchronous request payload.
+
+    Returns:
+        tuple: Whether the request should be routed, and the estimate (None when routing is disabled).
+    """
+    auto_route = payload.get('auto_route', getattr(settings, 'ANONYMIZER_SYNC_AUTO_ROUTING', False))
+    if auto_route is not True:
+        return False, None
+
+    estimate = estimate_cost(payload)
+    threshold = getattr(settings, 'ANONYMIZER_SYNC_ROUTING_THRESHOLD_SECONDS', 5.0)
+
+    return estimate['estimated_seconds'] > threshold, estimate
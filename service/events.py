@@ -0,0 +1,219 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .models import Task
+import asyncio
+import json
+import redis
+import redis.asyncio
+import threading
+import time
+
+CHANNEL_PREFIX = 'anonymizer:task:'
+
+TERMINAL_STATUSES = {'COMPLETED', 'COMPLETED_WITH_ERRORS', 'ERROR'}
+
+HUB_FAILED = object()
+
+QUEUE_SIZE = 100
+
+HUB_RETRY_SECONDS = 5.0
+
+_publisher = None
+_publisher_lock = threading.Lock()
+_hub = None
+
+def events_enabled():
+    return getattr(settings, 'ANONYMIZER_TASK_EVENTS', True)
+
+def get_events_url():
+    return getattr(settings, 'ANONYMIZER_EVENTS_REDIS_URL', None) or getattr(settings, 'CELERY_BROKER_URL', None)
+
+def get_publisher():
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = redis.Redis.from_url(get_events_url(), socket_connect_timeout=1, socket_timeout=1)
+        return _publisher
+
+def publish_task_event(task_id, user_pk, status, progress=None):
+    """
+    Publishes a status or progress change of a task to its event channel. Publishing is best effort: subscribers
+    reconcile with the database, so a lost event only delays them.
+
+    Args:
+        task_id (str): The ID of the task.
+        user_pk (int): The primary key of the user that owns the task.
+        status (str): The status of the task.
+        progress (dict, optional): The progress of the task ('completed_steps' and 'total_steps', or
+            'completed_row_groups' and 'total_row_groups' for out-of-core tasks).
+
+    Returns:
+        None
+    """
+    if not events_enabled() or not get_events_url():
+        return
+
+    event = {"task_id": str(task_id), "user_id": user_pk, "status": status, "progress": progress}
+    try:
+        get_publisher().publish(CHANNEL_PREFIX + str(task_id), json.dumps(event))
+    except Exception:
+        pass
+
+def step_progress_callback(task_id, user_pk, status, total_steps):
+    """
+    Returns a future callback that publishes the progress of a task each time one of its plan steps finishes.
+    """
+    lock = threading.Lock()
+    completed_steps = [0]
+
+    def step_done(future):
+        with lock:
+            completed_steps[0] += 1
+            progress = {"completed_steps": completed_steps[0], "total_steps": total_steps}
+        publish_task_event(task_id, user_pk, status, progress)
+
+    return step_done
+
+class TaskEventHub:
+    """
+    Shares one Redis subscription among every event stream of the process, and dispatches the events to per-task
+    queues. When the subscription fails, the subscribed queues receive HUB_FAILED and their streams fall back to
+    polling the database.
+    """
+    def __init__(self, url):
+        self.url = url
+        self.loop = asyncio.get_running_loop()
+        self.queues = {}
+        self.listener = None
+        self.retry_at = 0.0
+
+    def subscribe(self, task_id):
+        """
+        Returns a queue that receives the events of a task, or None when Redis is unavailable.
+        """
+        if self.listener is None:
+            if time.monotonic() < self.retry_at:
+                return None
+            self.listener = self.loop.create_task(self.listen())
+
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.queues.setdefault(str(task_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, task_id, queue):
+        queues = self.queues.get(str(task_id))
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.queues[str(task_id)]
+
+    async def listen(self):
+        client = redis.asyncio.Redis.from_url(self.url, socket_connect_timeout=1)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(CHANNEL_PREFIX + '*')
+            async for message in pubsub.listen():
+                if message.get('type') != 'pmessage':
+                    continue
+                try:
+                    event = json.loads(message['data'])
+                except ValueError:
+                    continue
+                for queue in list(self.queues.get(str(event.get('task_id')), ())):
+                    if not queue.full():
+                        queue.put_nowait(event)
+        except Exception:
+            pass
+        finally:
+            self.listener = None
+            self.retry_at = time.monotonic() + HUB_RETRY_SECONDS
+            for queues in self.queues.values():
+                for queue in queues:
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(HUB_FAILED)
+            self.queues = {}
+            try:
+                await pubsub.close()
+                await client.close()
+            except Exception:
+                pass
+
+def get_event_hub():
+    global _hub
+    if not events_enabled() or not get_events_url():
+        return None
+
+    if _hub is None or _hub.loop is not asyncio.get_running_loop():
+        _hub = TaskEventHub(get_events_url())
+    return _hub
+
+def get_task_event(task_id, user_pk):
+    status = Task.objects.filter(task_id=task_id, user_id=user_pk).values_list('status', flat=True).first()
+    if status is None:
+        return None
+    return {"task_id": str(task_id), "user_id": user_pk, "status": status, "progress": None}
+
+def format_event(event):
+    data = {"task_id": event['task_id'], "status": event['status'], "progress": event.get('progress')}
+    return f"event: status\ndata: {json.dumps(data)}\n\n"
+
+async def task_event_stream(task_id, user_pk):
+    """
+    Streams the status and progress changes of a task as server-sent events, until the task finishes.
+
+    Events are pushed from the Redis channel of the task. The database is read when the stream opens, on each
+    heartbeat without events, and every poll interval when Redis is unavailable, so a stream never misses the end of
+    its task.
+
+    Args:
+        task_id (str): The ID of the task.
+        user_pk (int): The primary key of the user. Events of tasks owned by other users are never sent.
+
+    Yields:
+        str: The server-sent event messages ('status' events, keep-alive comments and a final 'timeout' event).
+    """
+    heartbeat_seconds = getattr(settings, 'ANONYMIZER_EVENTS_HEARTBEAT_SECONDS', 15)
+    poll_seconds = getattr(settings, 'ANONYMIZER_EVENTS_POLL_SECONDS', 2)
+    max_seconds = getattr(settings, 'ANONYMIZER_EVENTS_MAX_SECONDS', 3600)
+    read_task_event = sync_to_async(get_task_event)
+
+    hub = get_event_hub()
+    queue = hub.subscribe(task_id) if hub else None
+    started = time.monotonic()
+    last_status = None
+
+    try:
+        event = await read_task_event(task_id, user_pk)
+        while True:
+            if event is not None and (event.get('progress') is not None or event['status'] != last_status):
+                yield format_event(event)
+                last_status = event['status']
+                if last_status in TERMINAL_STATUSES:
+                    return
+            else:
+                yield ": keepalive\n\n"
+
+            if time.monotonic() - started > max_seconds:
+                yield f"event: timeout\ndata: {json.dumps({'task_id': str(task_id)})}\n\n"
+                return
+
+            event = None
+            if queue is not None:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                if event is HUB_FAILED:
+                    queue = None
+                    event = None
+                elif event is not None and event.get('user_id') != user_pk:
+                    event = None
+            else:
+                await asyncio.sleep(poll_seconds)
+
+            if event is None:
+                event = await read_task_event(task_id, user_pk)
+    finally:
+        if hub is not None and queue is not None:
+            hub.unsubscribe(task_id, queue)
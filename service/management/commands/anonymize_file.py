@@ -0,0 +1,251 @@
+from django.core.management.base import BaseCommand, CommandError
+from concurrent.futures import ProcessPoolExecutor
+from threading import Semaphore
+from anonymizer.utils.data_processing import csv_to_dataframe, decode_bytes
+from anonymizer.utils.sketches import precision_for_error
+from anonymizer.utils.random_generation import create_seed_sequence, spawn_seed_sequence
+from anonymizer.utils.data_analysis import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness
+from anonymizer.utils.data_analysis import finalize_metric_summaries, merge_metric_summaries
+from service.distribution import merge_errors, merge_reports, partition_bounds, split_execution_plan
+from service.out_of_core import fill_columns, fill_row_group
+from service.planning import describe_plan, optimize_execution_parameters
+from service.tasks import apply_plan_step, check_metric_columns, merge_row_group_summaries, profile_execution_parameters
+import django
+import json
+import os
+import pandas as pd
+import time
+
+FILE_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'}
+
+def file_format(path, file_format=None):
+    file_format = file_format or FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in FILE_FORMATS.values():
+        raise CommandError(f"Unknown format of '{path}'. Use --input-format or --output-format (csv, ndjson or parquet).")
+    return file_format
+
+def read_file(path, file_format):
+    try:
+        if file_format == 'csv':
+            return csv_to_dataframe(path)
+        elif file_format == 'ndjson':
+            return pd.read_json(path, lines=True, orient='records', dtype=False, convert_dates=False)
+        return pd.read_parquet(path)
+    except ImportError:
+        raise CommandError("Parquet files require pyarrow or fastparquet, which are not installed.")
+
+def write_file(df, path, file_format):
+    try:
+        if file_format == 'csv':
+            df.to_csv(path, index=False)
+        elif file_format == 'ndjson':
+            df.to_json(path, orient='records', lines=True, force_ascii=False, default_handler=str)
+        else:
+            df.to_parquet(path, index=False)
+    except ImportError:
+        raise CommandError("Parquet files require pyarrow or fastparquet, which are not installed.")
+
+def process_chunk(df, carried_values, execution_plan, entropy, profile, chunk_index, metric_configuration, measure_anonymized_data):
+    """
+    Processes a chunk of the rows of a file with the row-local steps of its execution plan, in a worker process.
+    Each chunk draws from its own child seed streams, as the partitions of a distributed task do.
+
+    Args:
+        df (pd.DataFrame): The rows of the chunk.
+        carried_values (dict): The values that fill the leading missing values of the chunk (see fill_row_group).
+        execution_plan (list): The row-local plan steps (see service.distribution.split_execution_plan).
+        entropy (int): The entropy of the seed sequence.
+        profile (dict): The profile of the input columns.
+        chunk_index (int): The position of the chunk.
+        metric_configuration (dict): The metric configuration (see service.tasks.complete_task).
+        measure_anonymized_data (bool): Whether the chunk also summarizes its anonymized data for the metrics.
+
+    Returns:
+        dict: The processed rows, the errors and reports of the chunk, and its metric summaries, or the errors that
+        prevented them.
+    """
+    errors = []
+    reports = []
+    semaphore = Semaphore()
+    seed_sequence = create_seed_sequence(entropy)
+    summary_arguments = (metric_configuration['sensitive_columns'], metric_configuration['closeness_columns'], metric_configuration['diversity_columns'], semaphore, metric_configuration['l_diversity_error'])
+
+    real_data_summaries, real_data_error = merge_row_group_summaries(df, None, False, summary_arguments)
+    fill_row_group(df, carried_values)
+
+    for step in execution_plan:
+        for parameter in step['parameters']:
+            parameter_id = parameter['parameter_id']
+            parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id, chunk_index), "profile": profile})
+        apply_plan_step(step, df, semaphore, errors, reports)
+
+    decode_bytes(df)
+
+    anonymized_data_summaries, anonymized_data_error = None, False
+    if measure_anonymized_data:
+        anonymized_data_summaries, anonymized_data_error = merge_row_group_summaries(df, None, False, summary_arguments)
+
+    return {
+        "data": df,
+        "errors": errors,
+        "reports": reports,
+        "real_data_summaries": real_data_summaries,
+        "real_data_error": real_data_error,
+        "anonymized_data_summaries": anonymized_data_summaries,
+        "anonymized_data_error": anonymized_data_error,
+    }
+
+def merge_summaries(summaries):
+    merged = None
+    for summary in summaries:
+        merged = summary if merged is None else merge_metric_summaries(merged, summary)
+    return merged
+
+class Command(BaseCommand):
+    help = 'Anonymizes a CSV, NDJSON or Parquet file with a JSON execution plan, across all cores, and writes the anonymized file and its metrics report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='The file to be anonymized.')
+        parser.add_argument('output', help='The anonymized file.')
+        parser.add_argument('--plan', required=True, help="JSON file with the 'execution_parameters', and optionally the 'sensitive_columns', 'diversity_columns', 'closeness_columns', 'l_diversity_error' and 'seed', as in an asynchronous request.")
+        parser.add_argument('--report', default=None, help='The metrics report. Defaults to the output file with a .report.json suffix.')
+        parser.add_argument('--input-format', choices=['csv', 'ndjson', 'parquet'], default=None, help='Format of the input file. Defaults to its extension.')
+        parser.add_argument('--output-format', choices=['csv', 'ndjson', 'parquet'], default=None, help='Format of the output file. Defaults to its extension.')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Number of worker processes. Defaults to the number of cores.')
+        parser.add_argument('--chunk-rows', type=int, default=50000, help='Maximum number of rows of each chunk given to a worker process.')
+        parser.add_argument('--seed', type=int, default=None, help='Seed of the random generators, used to replay the processing exactly.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['chunk_rows'] < 1:
+            raise CommandError('The number of processes and of chunk rows should be positive integers.')
+
+        input_format = file_format(options['input'], options['input_format'])
+        output_format = file_format(options['output'], options['output_format'])
+        report_path = options['report'] or options['output'] + '.report.json'
+
+        with open(options['plan']) as plan_file:
+            plan = json.load(plan_file)
+        if isinstance(plan, list):
+            plan = {"execution_parameters": plan}
+
+        seed = options['seed'] if options['seed'] is not None else plan.get('seed')
+        seed_sequence = create_seed_sequence(seed)
+        metric_configuration = {
+            "sensitive_columns": plan.get('sensitive_columns', []),
+            "closeness_columns": plan.get('closeness_columns', []),
+            "diversity_columns": plan.get('diversity_columns', []),
+            "l_diversity_error": plan.get('l_diversity_error'),
+        }
+
+        started = time.perf_counter()
+        df = read_file(options['input'], input_format)
+        read_seconds = time.perf_counter() - started
+
+        semaphore = Semaphore()
+        try:
+            check_metric_columns(df, metric_configuration, semaphore)
+            if metric_configuration['l_diversity_error'] is not None:
+                precision_for_error(metric_configuration['l_diversity_error'])
+        except ValueError as ve:
+            raise CommandError(str(ve))
+
+        execution_parameters = plan.get('execution_parameters', [])
+        profile = profile_execution_parameters(df, execution_parameters, semaphore)
+        execution_plan = optimize_execution_parameters(execution_parameters, df.columns.tolist())
+        chunk_steps, merge_steps = split_execution_plan(execution_plan)
+
+        # The rows are split into at least one chunk per process. Each chunk carries the values that fill its leading
+        # missing values, so the chunks are filled as the whole file would be.
+        processes = options['processes']
+        chunk_rows = max(1, min(options['chunk_rows'], -(-len(df) // processes)))
+        columns = [column for column in fill_columns(chunk_steps) if column in df.columns]
+        filled = df[columns].fillna(method='ffill').fillna(method='bfill')
+
+        process_started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as executor:
+            futures = [
+                executor.submit(process_chunk, df.iloc[start:stop].reset_index(drop=True), filled.iloc[max(start - 1, 0)].to_dict(), chunk_steps, seed_sequence.entropy, profile, chunk_index, metric_configuration, not merge_steps)
+                for chunk_index, (start, stop) in enumerate(partition_bounds(len(df), chunk_rows))
+            ]
+            chunk_results = [future.result() for future in futures]
+        del df, filled
+
+        errors = merge_errors([error for chunk_result in chunk_results for error in chunk_result['errors']])
+        reports = merge_reports([report for chunk_result in chunk_results for report in chunk_result['reports']])
+        df = pd.concat([chunk_result['data'] for chunk_result in chunk_results], ignore_index=True) if chunk_results else pd.DataFrame()
+
+        for step in merge_steps:
+            for parameter in step['parameters']:
+                parameter_id = parameter['parameter_id']
+                parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id), "profile": profile})
+            apply_plan_step(step, df, semaphore, errors, reports)
+
+        decode_bytes(df)
+
+        metrics = {}
+        for prefix, algorithm in [("real_data", "real_data_analysis"), ("anonymized_data", "anonymized_data_analysis")]:
+            a_error_message = next((chunk_result[prefix + '_error'] for chunk_result in chunk_results if chunk_result[prefix + '_error']), False)
+            if a_error_message:
+                errors.append({"parameter_id": 0, "algorithm": algorithm, "error_message": a_error_message})
+                continue
+
+            try:
+                summaries = merge_summaries(chunk_result[prefix + '_summaries'] for chunk_result in chunk_results)
+                if summaries is not None:
+                    values = finalize_metric_summaries(summaries)
+                else:
+                    values = (
+                        calculate_k_anonymity(df, metric_configuration['sensitive_columns'], semaphore),
+                        calculate_t_closeness(df, metric_configuration['sensitive_columns'], metric_configuration['closeness_columns'], semaphore),
+                        calculate_l_diversity(df, metric_configuration['sensitive_columns'], metric_configuration['diversity_columns'], semaphore, metric_configuration['l_diversity_error']),
+                    )
+                metrics.update(zip([prefix + "_k_anonymity", prefix + "_t_closeness", prefix + "_l_diversity"], values))
+            except ValueError as ve:
+                a_error_message = str(ve)
+            except Exception as e:
+                a_error_message = "Unespected Error: " + str(e)
+
+            if a_error_message:
+                errors.append({"parameter_id": 0, "algorithm": algorithm, "error_message": a_error_message})
+        process_seconds = time.perf_counter() - process_started
+
+        write_started = time.perf_counter()
+        write_file(df, options['output'], output_format)
+        write_seconds = time.perf_counter() - write_started
+
+        rows = len(df)
+        total_seconds = read_seconds + process_seconds + write_seconds
+        statistics = {
+            "rows": rows,
+            "chunks": len(chunk_results),
+            "processes": processes,
+            "read_seconds": round(read_seconds, 3),
+            "process_seconds": round(process_seconds, 3),
+            "write_seconds": round(write_seconds, 3),
+            "rows_per_second": round(rows / total_seconds, 1) if total_seconds else None,
+            "input_megabytes_per_second": round(os.path.getsize(options['input']) / 2 ** 20 / total_seconds, 2) if total_seconds else None,
+        }
+
+        report = {
+            "input": options['input'],
+            "output": options['output'],
+            "status": 'COMPLETED_WITH_ERRORS' if errors else 'COMPLETED',
+            "seed": str(seed_sequence.entropy),
+            "profile": profile,
+            "execution_plan": describe_plan(execution_plan),
+            "errors": errors,
+            "reports": reports,
+            "statistics": statistics,
+        }
+        report.update(metrics)
+
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=4, default=str)
+
+        for error in errors:
+            self.stderr.write(f"Parameter {error['parameter_id']} ({error['algorithm']}): {error['error_message']}")
+
+        self.stdout.write(
+            f"{rows} rows in {total_seconds:.2f}s ({statistics['rows_per_second']} rows/s, {statistics['input_megabytes_per_second']} MiB/s) "
+            f"with {processes} processes: read {read_seconds:.2f}s, process {process_seconds:.2f}s, write {write_seconds:.2f}s. Report: {report_path}"
+        )
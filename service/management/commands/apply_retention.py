@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from service.retention import apply_retention, enable_incremental_vacuum, reclaim_space
+import json
+
+class Command(BaseCommand):
+    help = 'Compresses and purges task results according to the retention policies, and reclaims the freed space.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of tasks updated per query.')
+        parser.add_argument('--vacuum-pages', type=int, default=None, help='Maximum number of database pages to reclaim.')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true', help='Switch the SQLite database to incremental auto-vacuum (runs one full VACUUM).')
+
+    def handle(self, *args, **options):
+        if options['enable_incremental_vacuum']:
+            enable_incremental_vacuum()
+
+        summary = apply_retention(batch_size=options['batch_size'])
+        summary.update(reclaim_space(options['vacuum_pages']))
+
+        if not summary['incremental_vacuum']:
+            self.stderr.write('Incremental vacuum is not enabled; freed pages are reused but not returned to the file system. Run with --enable-incremental-vacuum once to enable it.')
+
+        self.stdout.write(json.dumps(summary))
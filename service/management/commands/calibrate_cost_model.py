@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand
+from threading import Semaphore
+from anonymizer.utils.data_processing import value_to_dataframe
+from anonymizer.utils.data_analysis import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness
+from service.registry import ALGORITHM_FUNCTIONS
+import json
+import time
+import tracemalloc
+
+BENCHMARK_CONFIGURATIONS = {
+    'encrypt.chacha20': ('string', {'key': 'benchmark'}),
+    'encrypt.aes': ('string', {'key': 'benchmark'}),
+    'encrypt.salsa20': ('string', {'key': 'benchmark'}),
+    'generalize.percent': ('numeric', {}),
+    'generalize.age': ('numeric', {}),
+    'generalize.mondrian': ('numeric', {'k': 5}),
+    'hash.md5': ('string', {}),
+    'hash.sha1': ('string', {}),
+    'hash.sha256': ('string', {}),
+    'mask.full': ('string', {}),
+    'mask.range': ('string', {'start_index': 2, 'end_index': 6}),
+    'mask.first_n_characters': ('string', {'n': 3}),
+    'mask.last_n_characters': ('string', {'n': 3}),
+    'mask.email': ('email', {}),
+    'mask.cpf': ('cpf', {}),
+    'mask.patterns': ('text', {}),
+    'null_out.columns': ('string', {}),
+    'perturb.date': ('date', {'unit': 'days', 'min_value': 1, 'max_value': 30}),
+    'perturb.numeric_range': ('numeric', {'min_value': 1, 'max_value': 10}),
+    'perturb.numeric_gaussian': ('numeric', {'std': 1.0}),
+    'perturb.numeric_laplacian': ('numeric', {'value': 1}),
+    'pseudonymize.columns': ('string', {}),
+    'pseudonymize.rows': ('string', {}),
+    'pseudonymize.fast': ('string', {'key': 'benchmark'}),
+    'swap.columns': ('string', {}),
+    'swap.rows': ('string', {}),
+}
+
+def benchmark_value(kind, row):
+    if kind == 'numeric':
+        return row % 100
+    elif kind == 'email':
+        return f'user{row}@example.com'
+    elif kind == 'cpf':
+        return f'{row % 1000:03d}.{row % 997:03d}.{row % 991:03d}-{row % 97:02d}'
+    elif kind == 'text':
+        return f'Contato {row}: user{row}@example.com, telefone (48) 9{row % 10000:04d}-{row % 9973:04d}'
+    elif kind == 'date':
+        return f'2020-{row % 12 + 1:02d}-{row % 28 + 1:02d}'
+    return f'value-{row}'
+
+def benchmark_records(kind, rows):
+    return [{'a': benchmark_value(kind, row), 'b': benchmark_value(kind, row + 1)} for row in range(rows)]
+
+def measure(prepare, function, repeat):
+    """
+    Measures the fastest of 'repeat' untraced runs of a function, and its peak memory in one extra traced run.
+    'prepare' builds the argument of each run outside of the measurements.
+    """
+    elapsed = []
+    for _ in range(repeat):
+        argument = prepare()
+        started = time.perf_counter()
+        function(argument)
+        elapsed.append(time.perf_counter() - started)
+
+    argument = prepare()
+    tracemalloc.start()
+    function(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(elapsed), peak
+
+class Command(BaseCommand):
+    help = 'Benchmarks every algorithm and prints the calibrated cost model to be used as the ANONYMIZER_COST_MODEL setting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of rows of each benchmark dataset.')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of runs of each benchmark. The fastest run is kept.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        cells = rows * 2
+
+        cost_model = {'base': {}, 'metrics': {}, 'algorithms': {}}
+
+        for kind in ['string', 'numeric']:
+            def build_and_serialize(records):
+                df = value_to_dataframe(records)
+                json.dumps(df.to_dict(orient='records'))
+
+            elapsed, peak = measure(lambda: benchmark_records(kind, rows), build_and_serialize, repeat)
+            cost_model['base'][kind] = {'seconds_per_cell': elapsed / cells, 'bytes_per_cell': peak / cells}
+
+        def calculate_metrics(df):
+            calculate_k_anonymity(df, ['a'], Semaphore())
+            calculate_t_closeness(df, ['a'], ['b'], Semaphore())
+            calculate_l_diversity(df, ['a'], ['b'], Semaphore())
+
+        elapsed, peak = measure(lambda: value_to_dataframe(benchmark_records('numeric', rows)), calculate_metrics, repeat)
+        cost_model['metrics'] = {'seconds_per_row': elapsed / rows, 'bytes_per_row': peak / rows}
+
+        for algorithm, (kind, configuration) in BENCHMARK_CONFIGURATIONS.items():
+            algorithm_function = ALGORITHM_FUNCTIONS.get(algorithm)
+            if not algorithm_function:
+                continue
+
+            elapsed, peak = measure(
+                lambda: value_to_dataframe(benchmark_records(kind, rows)),
+                lambda df: algorithm_function(df, ['a', 'b'], Semaphore(), **dict(configuration)),
+                repeat
+            )
+            cost_model['algorithms'][algorithm] = {'seconds_per_cell': elapsed / cells, 'bytes_per_cell': peak / cells}
+            self.stderr.write(f'{algorithm}: {elapsed:.3f}s, {peak / 2 ** 20:.1f} MiB')
+
+        self.stdout.write(json.dumps(cost_model, indent=4))
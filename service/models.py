@@ -15,8 +15,15 @@ class Task(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=100, default='PENDING')
     errors = models.TextField(default="[]")
+    reports = models.TextField(default="[]")
     result = models.TextField(blank=True, null=True)
+    result_compressed = models.BinaryField(blank=True, null=True)
+    result_state = models.CharField(max_length=20, default='STORED')
+    result_file = models.CharField(max_length=500, blank=True, null=True)
     creation_date = models.DateTimeField(auto_now_add=True)
+    seed = models.TextField(blank=True, null=True)
+    profile = models.TextField(blank=True, null=True)
+    execution_plan = models.TextField(blank=True, null=True)
     real_data_k_anonymity = models.TextField(blank=True, null=True)
     real_data_t_closeness = models.TextField(blank=True, null=True)
     real_data_l_diversity = models.TextField(blank=True, null=True)
@@ -26,4 +33,34 @@ class Task(models.Model):
 
     def __str__(self):
         return f"Task ID: {self.task_id}, Description: {self.description}, User: {self.user.username}, Status: {self.status}"
-    
\ No newline at end of file
+    
+
+class RetentionPolicy(models.Model):
+    """
+    Retention of task results. A policy with no user is the global policy, and applies to every user without a
+    policy of their own. Empty periods disable the corresponding stage.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True, null=True)
+    compress_after_hours = models.PositiveIntegerField(blank=True, null=True)
+    purge_after_days = models.PositiveIntegerField(blank=True, null=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        scope = self.user.username if self.user else 'global'
+        return f"Retention policy: {scope}, Compress after: {self.compress_after_hours} hours, Purge after: {self.purge_after_days} days"
+
+
+class AdmissionPolicy(models.Model):
+    """
+    Admission limits of the synchronous route for a user. Empty limits fall back to the ANONYMIZER_SYNC_MAX_ROWS,
+    ANONYMIZER_SYNC_MAX_BYTES and ANONYMIZER_SYNC_MAX_CONCURRENCY_PER_USER settings, which apply to every user
+    without a policy of their own.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    max_rows = models.PositiveIntegerField(blank=True, null=True)
+    max_bytes = models.PositiveBigIntegerField(blank=True, null=True)
+    max_concurrency = models.PositiveIntegerField(blank=True, null=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Admission policy: {self.user.username}, Max rows: {self.max_rows}, Max bytes: {self.max_bytes}, Max concurrency: {self.max_concurrency}"
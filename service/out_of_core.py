@@ -0,0 +1,121 @@
+from django.conf import settings
+from .distribution import partition_bounds
+from .planning import DROP_ALGORITHM, is_column_list, is_row_local
+import json
+import os
+import shutil
+import tempfile
+
+# The columnar and DataFrame modules are imported by the functions that use them, so the web process, which only
+# validates requests and streams results from this module, does not load pandas at startup.
+
+def get_row_group_rows(payload):
+    """
+    Returns the number of rows per row group of an out-of-core task: the 'row_group_rows' of the payload, or the
+    ANONYMIZER_ROW_GROUP_ROWS setting. None disables the out-of-core mode.
+    """
+    row_group_rows = payload.get('row_group_rows', getattr(settings, 'ANONYMIZER_ROW_GROUP_ROWS', None))
+    if row_group_rows is None:
+        return None
+    if not isinstance(row_group_rows, int) or isinstance(row_group_rows, bool) or row_group_rows < 1:
+        raise ValueError("Row group rows should be a positive integer.")
+    return row_group_rows
+
+def get_task_directory(task_id):
+    """
+    Returns the local directory of the columnar files of a task, under the ANONYMIZER_OUT_OF_CORE_DIR setting.
+    """
+    base_directory = getattr(settings, 'ANONYMIZER_OUT_OF_CORE_DIR', None) or os.path.join(tempfile.gettempdir(), 'anonymizer')
+    return os.path.join(base_directory, str(task_id))
+
+def split_row_group_steps(steps):
+    """
+    Splits an execution plan into the row-local steps, which run one row group at a time, and the other steps, which
+    need the whole dataset and cannot run out of core.
+
+    Returns:
+        tuple: The row group steps and the global steps.
+    """
+    row_group_steps, global_steps = [], []
+    for step in steps:
+        if is_row_local(step['algorithm']) and is_column_list(step['columns']):
+            row_group_steps.append(step)
+        else:
+            global_steps.append(step)
+    return row_group_steps, global_steps
+
+def fill_columns(steps):
+    """
+    Returns the columns whose missing values the steps fill (see service.distribution.fill_partition_columns).
+    """
+    columns = []
+    for step in steps:
+        if step['algorithm'] != DROP_ALGORITHM:
+            columns += [column for column in step['columns'] if column not in columns]
+    return columns
+
+def first_valid_values(reader, columns):
+    """
+    Returns the first valid value of each of the columns, reading as few row groups as needed.
+    """
+    first_values = {}
+    for df in reader.iter_row_groups():
+        for column in columns:
+            if column not in first_values and column in df.columns:
+                index = df[column].first_valid_index()
+                if index is not None:
+                    first_values[column] = df[column][index]
+        if all(column in first_values or column not in reader.columns for column in columns):
+            break
+    return first_values
+
+def fill_row_group(df, carried_values):
+    """
+    Fills the missing values of a row group forward, from the last valid value of the previous row groups, or the
+    first valid value of the dataset for the leading ones, as the algorithms filling the whole dataset at once would.
+    The carried values are updated with the last values of the row group.
+
+    Args:
+        df (pd.DataFrame): The rows of the row group.
+        carried_values (dict): The value carried into the row group of each column to be filled.
+    """
+    for column, value in carried_values.items():
+        if column in df.columns:
+            df[column] = df[column].fillna(method='ffill').fillna(value)
+            carried_values[column] = df[column].iloc[-1]
+
+def spill_records(records, directory, row_group_rows):
+    """
+    Converts the records into row groups, and writes them to a columnar directory.
+
+    Args:
+        records (list): List of dictionaries representing the input data.
+        directory (str): The columnar directory.
+        row_group_rows (int): Number of rows per row group.
+
+    Returns:
+        int: The number of row groups.
+    """
+    from anonymizer.utils.columnar import ColumnarWriter
+    from anonymizer.utils.data_processing import value_to_dataframe
+
+    writer = ColumnarWriter(directory)
+    for start, stop in partition_bounds(len(records), row_group_rows):
+        writer.write(value_to_dataframe(records[start:stop]))
+
+    writer.close()
+    return len(writer.row_groups)
+
+def stream_result_file(directory):
+    """
+    Yields the rows of a columnar result directory as newline-delimited JSON, one row group at a time.
+    """
+    from anonymizer.utils.columnar import ColumnarReader
+
+    reader = ColumnarReader(directory)
+    for df in reader.iter_row_groups():
+        yield ''.join(json.dumps(record, default=str) + '\n' for record in df.to_dict(orient='records'))
+
+def remove_task_files(path):
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
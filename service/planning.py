@@ -0,0 +1,225 @@
+from anonymizer.utils.registry import column_fields, get_schema, output_columns
+from .registry import COLUMN_TRANSFORMS, get_capability
+
+FUSED_ALGORITHM = 'plan.fused'
+
+DROP_ALGORITHM = 'null_out.columns'
+
+# The capabilities of the algorithms are declared in their schemas and where they are defined (see
+# anonymizer.utils.registry). Names that are not registered have none of them.
+
+def is_column_local(algorithm):
+    """
+    Whether the algorithm transforms each of its columns independently of the others.
+    """
+    return bool(get_capability(algorithm, 'column_local'))
+
+def is_row_local(algorithm):
+    """
+    Whether the output of the algorithm for a row depends on that row only, so it can run on row partitions
+    independently. Fused steps are row-local, since only column-local string transforms are fused.
+    """
+    return algorithm == FUSED_ALGORITHM or bool(get_capability(algorithm, 'row_local'))
+
+def is_string_transform(algorithm):
+    """
+    Whether the algorithm has a column transform that maps strings to strings, and can therefore share a single
+    conversion pass with the neighbouring ones.
+    """
+    return isinstance(algorithm, str) and algorithm in COLUMN_TRANSFORMS
+
+def is_deterministic(algorithm):
+    """
+    Whether the output of the algorithm depends only on its input and configuration.
+    """
+    return bool(get_capability(algorithm, 'deterministic'))
+
+def is_seeded(algorithm):
+    """
+    Whether the algorithm is randomized and draws from the task seed, and is therefore deterministic when the seed
+    is given.
+    """
+    return bool(get_capability(algorithm, 'seeded'))
+
+def optimize_execution_parameters(execution_parameters, input_columns):
+    """
+    Compiles the execution parameters into an optimized execution plan. The plan gives the same data as running the
+    parameters in the submitted order:
+        - Columns that are dropped by a later 'null_out.columns', and that no parameter between them reads, are removed
+          from the column-local parameters before it, and parameters left without columns are removed. Parameters that
+          add columns, such as the nonce columns of the encryptions, are kept whole, so their output is unchanged.
+        - Drops of input columns that no earlier parameter still needs are moved to the start of the plan.
+        - Consecutive string transforms (hashes and masks) on the same columns are fused into a single step, which
+          converts and checks the columns once and applies every transform in one pass.
+    A parameter reads its columns and the columns named in its configuration, such as the 'group_by' column of
+    'swap.rows' (see read_columns).
+
+    Args:
+        execution_parameters (list): List of dictionaries containing the processing parameters.
+            Each dictionary contains the following keys:
+                - 'algorithm' (str): Name of the algorithm to apply.
+                - 'configuration' (dict): Algorithm-specific configuration parameters.
+                - 'columns' (list): Columns the algorithm is applied to.
+        input_columns (list): Columns of the input data.
+
+    Returns:
+        list: The plan steps. Each step is a dictionary with the following keys:
+            - 'algorithm' (str): Name of the algorithm, or 'plan.fused' for fused steps.
+            - 'columns' (list): Columns the step is applied to.
+            - 'parameters' (list): The parameters run by the step, as dictionaries with the keys
+              'parameter_id' (the position in the submitted list, starting at 1), 'algorithm' and 'configuration'.
+    """
+    steps = []
+    for parameter_id, parameter in enumerate(execution_parameters, start=1):
+        algorithm = parameter.get('algorithm', {})
+        columns = parameter.get('columns', {})
+        steps.append({
+            "algorithm": algorithm,
+            "columns": columns,
+            "parameters": [{"parameter_id": parameter_id, "algorithm": algorithm, "configuration": parameter.get('configuration', {})}]
+        })
+
+    if not all(isinstance(step['algorithm'], str) and is_column_list(step['columns']) for step in steps):
+        return steps
+
+    steps = prune_dropped_columns(steps)
+    steps = hoist_drops(steps, input_columns)
+    steps = fuse_string_transforms(steps)
+
+    return steps
+
+def prune_dropped_columns(steps):
+    dropped_later = set()
+    pruned_steps = []
+
+    for step in reversed(steps):
+        if step['algorithm'] == DROP_ALGORITHM:
+            dropped_later.update(step['columns'])
+        elif is_column_local(step['algorithm']) and get_capability(step['algorithm'], 'structure') is None:
+            columns = [column for column in step['columns'] if column not in dropped_later]
+            if not columns:
+                continue
+            step = dict(step, columns=columns)
+            dropped_later.difference_update(configuration_columns(step))
+        else:
+            dropped_later.difference_update(read_columns(step))
+
+        pruned_steps.append(step)
+
+    return pruned_steps[::-1]
+
+def hoist_drops(steps, input_columns):
+    hoisted_steps = []
+    kept_steps = []
+    needed_columns = set()
+
+    for step in steps:
+        if step['algorithm'] == DROP_ALGORITHM:
+            if all(column in input_columns and column not in needed_columns for column in step['columns']):
+                hoisted_steps.append(step)
+                continue
+        else:
+            needed_columns.update(read_columns(step))
+            needed_columns.update(created_columns(step))
+
+        kept_steps.append(step)
+
+    return hoisted_steps + kept_steps
+
+def fuse_string_transforms(steps):
+    fused_steps = []
+
+    for step in steps:
+        previous = fused_steps[-1] if fused_steps else None
+        if (
+            previous is not None
+            and is_string_transform(step['algorithm'])
+            and (is_string_transform(previous['algorithm']) or previous['algorithm'] == FUSED_ALGORITHM)
+            and previous['columns'] == step['columns']
+        ):
+            fused_steps[-1] = dict(previous, algorithm=FUSED_ALGORITHM, parameters=previous['parameters'] + step['parameters'])
+        else:
+            fused_steps.append(step)
+
+    return fused_steps
+
+def step_dependencies(steps):
+    """
+    Returns, for each step of an execution plan, the earlier steps it must wait for. Column-local steps that keep the
+    columns of the data run alongside the earlier steps on other columns. Every other step waits for all the earlier
+    steps, and is waited for by all the later ones.
+
+    Args:
+        steps (list): The plan steps (see optimize_execution_parameters).
+
+    Returns:
+        list: The positions of the earlier steps each step depends on.
+    """
+    dependencies = []
+    for index, step in enumerate(steps):
+        dependencies.append([
+            previous_index for previous_index, previous in enumerate(steps[:index])
+            if not (is_parallel_step(previous) and is_parallel_step(step) and not set(read_columns(previous)) & set(read_columns(step)))
+        ])
+
+    return dependencies
+
+def is_parallel_step(step):
+    return is_column_list(step['columns']) and all(
+        is_column_local(parameter['algorithm']) and get_capability(parameter['algorithm'], 'structure') is None
+        for parameter in step['parameters']
+    )
+
+def describe_plan(steps):
+    """
+    Describes an execution plan without the algorithm configurations, which may hold secrets such as encryption keys.
+
+    Args:
+        steps (list): The plan steps (see optimize_execution_parameters).
+
+    Returns:
+        list: One dictionary per step with the keys 'algorithm', 'columns', 'parameter_ids' and, for fused steps, 'algorithms'.
+    """
+    description = []
+    for step in steps:
+        step_description = {
+            "algorithm": step['algorithm'],
+            "columns": step['columns'],
+            "parameter_ids": [parameter['parameter_id'] for parameter in step['parameters']]
+        }
+        if step['algorithm'] == FUSED_ALGORITHM:
+            step_description['algorithms'] = [parameter['algorithm'] for parameter in step['parameters']]
+        description.append(step_description)
+
+    return description
+
+def created_columns(step):
+    """
+    Returns the columns created by a step, as declared by the schemas of its algorithms (see
+    anonymizer.utils.registry.output_columns).
+    """
+    columns = []
+    for parameter in step['parameters']:
+        configuration = parameter['configuration'] if isinstance(parameter['configuration'], dict) else {}
+        columns += output_columns(get_schema(parameter['algorithm']), step['columns'], configuration, parameter['parameter_id'])
+
+    return columns
+
+def configuration_columns(step):
+    """
+    Returns the columns named in the configurations of a step (see anonymizer.utils.registry.column_fields), such as
+    the 'group_by' column of 'swap.rows'. The step reads them without transforming them.
+    """
+    columns = []
+    for parameter in step['parameters']:
+        configuration = parameter['configuration'] if isinstance(parameter['configuration'], dict) else {}
+        schema = get_schema(parameter['algorithm'])
+        columns += [configuration[field] for field in column_fields(schema['configuration'] if schema else {}) if isinstance(configuration.get(field), str)]
+
+    return columns
+
+def read_columns(step):
+    return step['columns'] + configuration_columns(step)
+
+def is_column_list(columns):
+    return isinstance(columns, list) and all(isinstance(column, str) for column in columns)
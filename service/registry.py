@@ -0,0 +1,71 @@
+from collections.abc import Mapping
+from importlib import import_module
+from anonymizer.utils import registry
+
+# Modules whose algorithms register themselves with anonymizer.utils.registry. They are imported the first time an
+# algorithm or its capabilities are looked up, so importing the registry does not load pandas, NumPy or the algorithm
+# libraries.
+ALGORITHM_MODULES = [
+    'anonymizer.lib.encryption',
+    'anonymizer.lib.generalization',
+    'anonymizer.lib.hashing',
+    'anonymizer.lib.masking',
+    'anonymizer.lib.null_out',
+    'anonymizer.lib.perturbation',
+    'anonymizer.lib.pseudonymization',
+    'anonymizer.lib.swapping',
+]
+
+_loaded = False
+
+def load_algorithms():
+    """
+    Imports the algorithm modules, once.
+
+    Returns:
+        dict: The registered algorithms (see anonymizer.utils.registry.register_algorithm).
+    """
+    global _loaded
+    if not _loaded:
+        for module_name in ALGORITHM_MODULES:
+            import_module(module_name)
+        _loaded = True
+    return registry.ALGORITHMS
+
+def get_capability(algorithm, capability):
+    """
+    Returns a capability of an algorithm, or None for names that are not registered. The capabilities of the schema
+    (see anonymizer.utils.registry.ALGORITHM_SCHEMAS) are read without loading the algorithm modules.
+    """
+    schema = registry.get_schema(algorithm)
+    if schema is None:
+        return None
+    if capability in schema:
+        return schema[capability]
+    specification = load_algorithms().get(algorithm)
+    return specification[capability] if specification else None
+
+class LazyRegistry(Mapping):
+    """
+    Maps algorithm names to their functions, or to their column transforms, loading the algorithm modules on first use.
+    """
+    def __init__(self, transforms=False):
+        self.transforms = transforms
+
+    def __getitem__(self, name):
+        algorithms = load_algorithms()
+        if self.transforms:
+            return registry.COLUMN_TRANSFORMS[name]
+        return algorithms[name]['function']
+
+    def __iter__(self):
+        load_algorithms()
+        return iter(registry.COLUMN_TRANSFORMS if self.transforms else registry.ALGORITHMS)
+
+    def __len__(self):
+        load_algorithms()
+        return len(registry.COLUMN_TRANSFORMS if self.transforms else registry.ALGORITHMS)
+
+ALGORITHM_FUNCTIONS = LazyRegistry()
+
+COLUMN_TRANSFORMS = LazyRegistry(transforms=True)
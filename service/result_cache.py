@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from .models import Task
+from .planning import is_deterministic, is_seeded
+import hashlib
+import hmac
+import json
+
+RESULT_CACHE_ALIAS = 'results'
+
+def get_result_cache():
+    try:
+        return caches[RESULT_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+
+def is_cacheable(payload):
+    """
+    Checks whether a request opted in to the result cache and always produces the same result.
+
+    Args:
+        payload (dict): The request payload.
+            - 'cache' (bool, optional): Opts in to the result cache.
+
+    Returns:
+        bool: True if every algorithm of the plan is deterministic, or draws from an explicit seed.
+    """
+    if payload.get('cache') is not True or get_result_cache() is None:
+        return False
+
+    execution_parameters = payload.get('execution_parameters')
+    if not isinstance(execution_parameters, list) or not all(isinstance(parameter, dict) for parameter in execution_parameters):
+        return False
+
+    for parameter in execution_parameters:
+        algorithm = parameter.get('algorithm')
+        if is_deterministic(algorithm):
+            continue
+        if is_seeded(algorithm) and payload.get('seed') is not None:
+            continue
+        return False
+
+    return True
+
+def normalize_execution_parameters(execution_parameters):
+    return [
+        {
+            "algorithm": parameter.get('algorithm'),
+            "columns": parameter.get('columns', []),
+            "configuration": parameter.get('configuration') or {}
+        }
+        for parameter in execution_parameters
+    ]
+
+def result_cache_key(route, payload, user_pk):
+    """
+    Computes the content address of a request: a keyed digest of its data, normalized execution parameters, seed,
+    metric columns and user, plus the description of asynchronous tasks, since a hit returns the original task. The
+    digest is keyed with the SECRET_KEY, so it reveals nothing about the configurations.
+
+    Args:
+        route (str): 'sync' or 'async'. The routes produce different results and never share entries.
+        payload (dict): The request payload.
+        user_pk (int): The primary key of the user.
+
+    Returns:
+        str: The cache key.
+    """
+    content = {
+        "user": user_pk,
+        "data": payload.get('data'),
+        "execution_parameters": normalize_execution_parameters(payload.get('execution_parameters', [])),
+        "seed": payload.get('seed'),
+    }
+    if route == 'async':
+        content.update({
+            "sensitive_columns": payload.get('sensitive_columns'),
+            "diversity_columns": payload.get('diversity_columns'),
+            "closeness_columns": payload.get('closeness_columns'),
+            "l_diversity_error": payload.get('l_diversity_error'),
+            "description": payload.get('description'),
+        })
+
+    serialized = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str).encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), serialized, hashlib.sha256).hexdigest()
+
+    return f'{route}:{digest}'
+
+def get_cached_task(cache_key, user_pk):
+    """
+    Returns the ID of the task previously submitted for the same content, unless it failed or its result was purged.
+
+    Args:
+        cache_key (str): The content address of the request.
+        user_pk (int): The primary key of the user.
+
+    Returns:
+        str: The task ID, or None.
+    """
+    cache = get_result_cache()
+    task_id = cache.get(cache_key)
+    if task_id is None:
+        return None
+
+    task = Task.objects.filter(task_id=task_id, user_id=user_pk).values('status', 'result_state').first()
+    if task is not None and (task['status'] == 'ERROR' or task['result_state'] == 'PURGED'):
+        cache.delete(cache_key)
+        return None
+
+    return task_id
+
+def set_cached_task(cache_key, task_id):
+    get_result_cache().set(cache_key, task_id)
+
+def get_cached_result(cache_key):
+    return get_result_cache().get(cache_key)
+
+def set_cached_result(cache_key, result):
+    """
+    Stores the result of a synchronous request, unless it is larger than ANONYMIZER_RESULT_CACHE_MAX_ENTRY_BYTES.
+    """
+    max_entry_bytes = getattr(settings, 'ANONYMIZER_RESULT_CACHE_MAX_ENTRY_BYTES', 5 * 2 ** 20)
+    if len(result) <= max_entry_bytes:
+        get_result_cache().set(cache_key, result)
@@ -0,0 +1,160 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import RetentionPolicy, Task
+from .out_of_core import remove_task_files
+import zlib
+
+FINISHED_STATUSES = ['COMPLETED', 'COMPLETED_WITH_ERRORS', 'ERROR']
+
+def get_task_result(task):
+    """
+    Returns the result of a task, decompressing it when it has been compacted.
+
+    Args:
+        task (service.models.Task): The task.
+
+    Returns:
+        str: The result, or None when the task has no result or it has been purged.
+    """
+    if task.result_state == 'COMPRESSED' and task.result_compressed is not None:
+        return zlib.decompress(bytes(task.result_compressed)).decode('utf-8')
+    return task.result
+
+def get_policies():
+    """
+    Returns the retention policies to apply: one per user with a policy of their own, and the global policy under
+    the None key. The global policy comes from the latest RetentionPolicy without user, or else from the
+    ANONYMIZER_RETENTION_COMPRESS_AFTER_HOURS and ANONYMIZER_RETENTION_PURGE_AFTER_DAYS settings.
+    """
+    policies = {None: {
+        'compress_after_hours': getattr(settings, 'ANONYMIZER_RETENTION_COMPRESS_AFTER_HOURS', None),
+        'purge_after_days': getattr(settings, 'ANONYMIZER_RETENTION_PURGE_AFTER_DAYS', None),
+    }}
+
+    for policy in RetentionPolicy.objects.order_by('creation_date'):
+        policies[policy.user_id] = {
+            'compress_after_hours': policy.compress_after_hours,
+            'purge_after_days': policy.purge_after_days,
+        }
+
+    return policies
+
+def scoped_tasks(user_pk, policies):
+    tasks = Task.objects.filter(status__in=FINISHED_STATUSES)
+    if user_pk is None:
+        return tasks.exclude(user_id__in=[pk for pk in policies if pk is not None])
+    return tasks.filter(user_id=user_pk)
+
+def compress_results(tasks, batch_size):
+    """
+    Compresses, in batches, the stored results of the given tasks.
+
+    Returns:
+        tuple: The number of compressed results, and the number of bytes saved.
+    """
+    compressed, saved_bytes = 0, 0
+    while True:
+        batch = list(tasks.filter(result_state='STORED', result__isnull=False).only('pk', 'result')[:batch_size])
+        if not batch:
+            return compressed, saved_bytes
+
+        for task in batch:
+            result = task.result.encode('utf-8')
+            task.result_compressed = zlib.compress(result, 6)
+            task.result = None
+            task.result_state = 'COMPRESSED'
+            saved_bytes += len(result) - len(task.result_compressed)
+
+        Task.objects.bulk_update(batch, ['result', 'result_compressed', 'result_state'])
+        compressed += len(batch)
+
+def purge_results(tasks, batch_size):
+    """
+    Purges, in batches, the results of the given tasks, and removes the result files of out-of-core tasks. Their
+    metadata and metrics are kept.
+
+    Returns:
+        int: The number of purged results.
+    """
+    purged = 0
+    while True:
+        batch = list(tasks.exclude(result_state='PURGED').values_list('pk', 'result_file')[:batch_size])
+        if not batch:
+            return purged
+
+        purged += Task.objects.filter(pk__in=[pk for pk, _ in batch]).update(result=None, result_compressed=None, result_file=None, result_state='PURGED')
+        for _, result_file in batch:
+            remove_task_files(result_file)
+
+def apply_retention(now=None, batch_size=500):
+    """
+    Applies the retention policies to the results of the finished tasks: results older than the compression period
+    are compressed, and results older than the purge period are purged.
+
+    Args:
+        now (datetime.datetime, optional): The reference time. Defaults to the current time.
+        batch_size (int, optional): Number of tasks updated per query, which bounds the write locks held at once.
+
+    Returns:
+        dict: The number of compressed and purged results, and the bytes saved by compression.
+    """
+    now = now or timezone.now()
+    summary = {"compressed": 0, "purged": 0, "compressed_bytes_saved": 0}
+
+    policies = get_policies()
+    for user_pk, policy in policies.items():
+        tasks = scoped_tasks(user_pk, policies)
+
+        if policy['purge_after_days'] is not None:
+            summary['purged'] += purge_results(tasks.filter(creation_date__lt=now - timedelta(days=policy['purge_after_days'])), batch_size)
+
+        if policy['compress_after_hours'] is not None:
+            compressed, saved_bytes = compress_results(tasks.filter(creation_date__lt=now - timedelta(hours=policy['compress_after_hours'])), batch_size)
+            summary['compressed'] += compressed
+            summary['compressed_bytes_saved'] += saved_bytes
+
+    return summary
+
+def reclaim_space(pages=None):
+    """
+    Returns free database pages to the file system incrementally, with SQLite's 'PRAGMA incremental_vacuum', instead
+    of a blocking full VACUUM. Requires the incremental auto-vacuum mode (see enable_incremental_vacuum).
+
+    Args:
+        pages (int, optional): Maximum number of pages to reclaim. Defaults to ANONYMIZER_RETENTION_VACUUM_PAGES.
+
+    Returns:
+        dict: The number of reclaimed pages, and whether the database supports incremental reclaiming.
+    """
+    if connection.vendor != 'sqlite':
+        return {"reclaimed_pages": 0, "incremental_vacuum": False}
+
+    pages = pages if pages is not None else getattr(settings, 'ANONYMIZER_RETENTION_VACUUM_PAGES', 1000)
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != 2:
+            return {"reclaimed_pages": 0, "incremental_vacuum": False}
+
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+        cursor.fetchall()
+        cursor.execute('PRAGMA freelist_count')
+        reclaimed_pages = free_pages - cursor.fetchone()[0]
+
+    return {"reclaimed_pages": reclaimed_pages, "incremental_vacuum": True}
+
+def enable_incremental_vacuum():
+    """
+    Switches an SQLite database to the incremental auto-vacuum mode. The switch needs one full VACUUM, so it should be
+    run once, during maintenance.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
@@ -1,43 +1,40 @@
-from celery import shared_task, current_task
-from concurrent.futures import ThreadPoolExecutor, wait
-from threading import Semaphore
-from anonymizer.utils.data_processing import value_to_dataframe
+from celery import chord, shared_task, current_task
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock, Semaphore
+from django.conf import settings
+from django.db import transaction
+from anonymizer.utils.data_processing import value_to_dataframe, apply_string_transforms, check_columns, decode_bytes, restore_columns, snapshot_columns
+from anonymizer.utils.random_generation import create_seed_sequence, spawn_seed_sequence
+from anonymizer.utils.data_profiling import profile_dataframe
 from anonymizer.utils.data_analysis import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness
-from anonymizer.lib.encryption import encrypt_aes, encrypt_chacha20, encrypt_salsa20
-from anonymizer.lib.generalization import age_generalization, percent_generalization
-from anonymizer.lib.hashing import apply_md5, apply_sha1, apply_sha256
-from anonymizer.lib.masking import mask_cpf, mask_email, mask_first_n_characters, mask_full, mask_last_n_characters, mask_range
-from anonymizer.lib.null_out import drop_columns
-from anonymizer.lib.perturbation import perturb_date, perturb_numeric_gaussian, perturb_numeric_laplacian, perturb_numeric_range
-from anonymizer.lib.pseudonymization import pseudonymize_columns, pseudonymize_rows
-from anonymizer.lib.swapping import swap_columns, swap_rows
+from anonymizer.utils.data_analysis import calculate_snapshot_metrics, dump_summary, finalize_metric_summaries, load_summary, merge_metric_summaries, summarize_metrics
 from .models import Task
-
-ALGORITHM_FUNCTIONS = {
-    'encrypt.chacha20': encrypt_chacha20,
-    'encrypt.aes': encrypt_aes,
-    'encrypt.salsa20': encrypt_salsa20,
-    'generalize.percent': percent_generalization,
-    'generalize.age': age_generalization,
-    'hash.md5': apply_md5,
-    'hash.sha1': apply_sha1,
-    'hash.sha256': apply_sha256,
-    'mask.full': mask_full,
-    'mask.range': mask_range,
-    'mask.first_n_characters': mask_first_n_characters,
-    'mask.last_n_characters': mask_last_n_characters,
-    'mask.email': mask_email,
-    'mask.cpf': mask_cpf,
-    'null_out.columns': drop_columns,
-    'perturb.date': perturb_date,
-    'perturb.numeric_range': perturb_numeric_range,
-    'perturb.numeric_gaussian': perturb_numeric_gaussian,
-    'perturb.numeric_laplacian': perturb_numeric_laplacian,
-    'pseudonymize.columns': pseudonymize_columns,
-    'pseudonymize.rows': pseudonymize_rows,
-    'swap.columns': swap_columns,
-    'swap.rows': swap_rows
-}
+from .registry import ALGORITHM_FUNCTIONS, COLUMN_TRANSFORMS
+from .planning import FUSED_ALGORITHM, created_columns, describe_plan, optimize_execution_parameters, step_dependencies
+from .events import publish_task_event, step_progress_callback
+from .retention import apply_retention, reclaim_space
+from .distribution import fill_partition_columns, get_partition_rows, merge_errors, merge_reports, partition_bounds, split_execution_plan
+from .out_of_core import fill_columns, fill_row_group, first_valid_values, get_row_group_rows, get_task_directory, remove_task_files, spill_records, split_row_group_steps
+from anonymizer.utils.columnar import ColumnarReader, ColumnarWriter
+import ast
+import json
+import multiprocessing
+import os
+import pandas as pd
+
+_metric_executor = None
+_metric_executor_lock = Lock()
+
+COMPLETION_FIELDS = [
+    'status',
+    'result',
+    'errors',
+    'reports',
+    'anonymized_data_k_anonymity',
+    'anonymized_data_l_diversity',
+    'anonymized_data_t_closeness',
+]
 
 @shared_task
 def assync_process_data(payload, user_pk):
@@ -50,6 +47,9 @@ def assync_process_data(payload, user_pk):
                      'sensitive_columns' (list): List of columns containing sensitive attributes.
                      'diversity_columns' (list): List of columns containing attributes for diversity measurement.
                      'closeness_columns' (list): List of columns for t-closeness measurement.
+                     'l_diversity_error' (float, optional): Relative error of the approximate l-diversity. Omit it for the exact l-diversity.
+                     'seed' (int, optional): Seed of the random generators, used to replay the task exactly.
+                     'row_group_rows' (int, optional): Rows per row group of the out-of-core mode (see process_out_of_core).
                      'execution_parameters' (list): List of dictionaries containing the processing parameters.
                         Each dictionary contains the following keys:
                             - 'algorithm' (str): Name of the algorithm to apply.
@@ -62,24 +62,28 @@ def assync_process_data(payload, user_pk):
     """
     task_id = current_task.request.id
     errors = [] 
+    reports = []
 
     semaphore = Semaphore()
+    seed_sequence = create_seed_sequence(payload.get('seed'))
+
+    row_group_rows = get_row_group_rows(payload)
+    if row_group_rows and len(payload.get('data', [])) > row_group_rows:
+        process_out_of_core(payload, user_pk, task_id, seed_sequence, row_group_rows)
+        return None
 
     df = value_to_dataframe(payload.get('data', []))
     description = payload.get('description', 'Object')
     sensitive_columns = payload.get('sensitive_columns', [])
     closeness_columns = payload.get('closeness_columns', [])
     diversity_columns = payload.get('diversity_columns', [])
-    real_data_k_anonymity = ""
-    real_data_t_closeness = ""
-    real_data_l_diversity = ""
+    l_diversity_error = payload.get('l_diversity_error')
+    metric_configuration = {"sensitive_columns": sensitive_columns, "closeness_columns": closeness_columns, "diversity_columns": diversity_columns, "l_diversity_error": l_diversity_error}
     a_error_message = False
 
 
     try:
-        real_data_k_anonymity = calculate_k_anonymity(df, sensitive_columns, semaphore)
-        real_data_t_closeness = calculate_t_closeness(df, sensitive_columns, closeness_columns, semaphore)
-        real_data_l_diversity = calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore)
+        check_metric_columns(df, metric_configuration, semaphore)
     except ValueError as ve:
         a_error_message = str(ve)
     except Exception as e:
@@ -92,76 +96,526 @@ def assync_process_data(payload, user_pk):
             "error_message": a_error_message
         }
         errors.append(error_info)
-        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='ERROR', errors = errors,  real_data_k_anonymity=real_data_k_anonymity, real_data_l_diversity= real_data_l_diversity, real_data_t_closeness=real_data_t_closeness)
+        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='ERROR', errors = errors, seed=str(seed_sequence.entropy), real_data_k_anonymity="", real_data_l_diversity="", real_data_t_closeness="")
         task.save()
+        publish_task_event(task_id, user_pk, task.status)
 
     else:
-        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='PENDING', real_data_k_anonymity=real_data_k_anonymity, real_data_l_diversity= real_data_l_diversity, real_data_t_closeness=real_data_t_closeness)
-        task.save()
+        # The real data is measured from a snapshot of the metric columns, alongside the algorithms.
+        real_data_metrics = submit_real_data_metrics(df[metric_columns(metric_configuration)].copy(), metric_configuration)
 
         execution_parameters = payload.get('execution_parameters', {})
+        profile = profile_execution_parameters(df, execution_parameters, semaphore)
+        execution_plan = optimize_execution_parameters(execution_parameters, df.columns.tolist())
+
+        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='PENDING', seed=str(seed_sequence.entropy), profile=profile, execution_plan=describe_plan(execution_plan))
+        task.save()
+        publish_task_event(task_id, user_pk, task.status, {"completed_steps": 0, "total_steps": len(execution_plan)})
+
+        partition_rows = get_partition_rows(payload)
+        partition_steps, merge_steps = split_execution_plan(execution_plan)
+
+        if partition_rows and partition_steps and len(df) > partition_rows:
+            fill_partition_columns(df, partition_steps)
+
+            partitions = [
+                process_partition.s(df.iloc[start:stop].to_dict(orient='records'), partition_steps, seed_sequence.entropy, profile, partition_index, None if merge_steps else metric_configuration)
+                for partition_index, (start, stop) in enumerate(partition_bounds(len(df), partition_rows))
+            ]
+            chord(partitions)(merge_partitions.s(task_id, merge_steps, seed_sequence.entropy, profile, metric_configuration))
+
+            record_real_data_metrics(task_id, real_data_metrics)
+            return None
 
         futures = []
+        step_done = step_progress_callback(task_id, user_pk, task.status, len(execution_plan))
 
+        # Steps run concurrently, except that each step waits for the earlier steps it conflicts with.
         with ThreadPoolExecutor() as executor:
-            for parameter_id, parameter in enumerate(execution_parameters, start=1):
-                algorithm = parameter.get('algorithm', {})
-                configuration = parameter.get('configuration', {})
-                configuration.update({"parameter_id": parameter_id})
-                columns = parameter.get('columns', {})
+            for step, dependencies in zip(execution_plan, step_dependencies(execution_plan)):
+                for parameter in step['parameters']:
+                    parameter_id = parameter['parameter_id']
+                    parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id), "profile": profile})
                 future = executor.submit(
-                    apply_algorithm, algorithm, configuration, columns, df, semaphore, parameter_id, errors
+                    apply_plan_step_after, [futures[index] for index in dependencies], step, df, semaphore, errors, reports
                 )
+                future.add_done_callback(step_done)
                 futures.append(future)
 
         wait(futures)
 
-        for column in df.columns:
-            df[column] = df[column].apply(lambda x: x.decode('utf-8', errors='replace') if isinstance(x, bytes) else x)
+        record_real_data_metrics(task_id, real_data_metrics)
+
+        complete_task(task, df, semaphore, errors, reports, metric_configuration)
+    
+    return None
+
+@shared_task
+def process_partition(records, execution_plan, entropy, profile, partition_index, metric_configuration=None):
+    """
+    Process a partition of the rows of a distributed task with the row-local steps of its execution plan. When the
+    partition steps complete the plan, the partition also summarizes its anonymized data for the metrics, so the
+    merge step does not measure the merged data again.
+
+    Args:
+        records (list): List of dictionaries representing the rows of the partition.
+        execution_plan (list): The row-local plan steps (see service.distribution.split_execution_plan).
+        entropy (int): The entropy of the task seed sequence. Each partition draws from its own child streams.
+        profile (dict): The profile of the input columns.
+        partition_index (int): The position of the partition.
+        metric_configuration (dict, optional): The metric configuration of the task (see complete_task).
 
-        decoded_data = df.to_dict(orient='records')
-        processed_data = json.dumps(decoded_data)
+    Return:
+        dict: The processed rows (as JSON), the errors and reports of the partition, and its metric summaries, if any.
+    """
+    errors = []
+    reports = []
+
+    df = value_to_dataframe(records)
+    semaphore = Semaphore()
+    seed_sequence = create_seed_sequence(entropy)
 
-        anonymized_data_k_anonymity = ""
-        anonymized_data_t_closeness = ""
-        anonymized_data_l_diversity = ""
+    for step in execution_plan:
+        for parameter in step['parameters']:
+            parameter_id = parameter['parameter_id']
+            parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id, partition_index), "profile": profile})
+        apply_plan_step(step, df, semaphore, errors, reports)
 
+    decode_bytes(df)
 
+    metric_summaries = None
+    if metric_configuration:
         try:
+            summaries = summarize_metrics(df, metric_configuration['sensitive_columns'], metric_configuration['closeness_columns'], metric_configuration['diversity_columns'], semaphore, metric_configuration['l_diversity_error'])
+            metric_summaries = {metric: dump_summary(summary) for metric, summary in summaries.items()}
+        except Exception:
+            metric_summaries = None
+
+    return {"data": json.dumps(df.to_dict(orient='records'), default=str), "errors": errors, "reports": reports, "metric_summaries": metric_summaries}
+
+@shared_task
+def merge_partitions(partition_results, task_id, execution_plan, entropy, profile, metric_configuration):
+    """
+    Merge the processed partitions of a distributed task, apply the remaining steps of its execution plan to the
+    merged data, and complete the Task object. The merge holds the whole dataset, and the remaining steps, such as
+    the swaps, run on this worker alone.
+
+    Args:
+        partition_results (list): The results of process_partition, in partition order.
+        task_id (str): The ID of the task.
+        execution_plan (list): The plan steps that run on the merged data (see service.distribution.split_execution_plan).
+        entropy (int): The entropy of the task seed sequence.
+        profile (dict): The profile of the input columns.
+        metric_configuration (dict): The metric configuration of the task (see complete_task).
+
+    Return:
+        None
+    """
+    records = []
+    errors = []
+    reports = []
+    metric_summaries = None
+    for partition_result in partition_results:
+        records += json.loads(partition_result['data'])
+        errors += partition_result['errors']
+        reports += partition_result['reports']
+
+    if all(partition_result.get('metric_summaries') for partition_result in partition_results):
+        for partition_result in partition_results:
+            summaries = {metric: load_summary(summary) for metric, summary in partition_result['metric_summaries'].items()}
+            metric_summaries = summaries if metric_summaries is None else merge_metric_summaries(metric_summaries, summaries)
+
+    errors = merge_errors(errors)
+    reports = merge_reports(reports)
+
+    df = value_to_dataframe(records)
+    semaphore = Semaphore()
+    seed_sequence = create_seed_sequence(entropy)
+
+    for step in execution_plan:
+        for parameter in step['parameters']:
+            parameter_id = parameter['parameter_id']
+            parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id), "profile": profile})
+        apply_plan_step(step, df, semaphore, errors, reports)
+
+    task = Task.objects.get(task_id=task_id)
+    complete_task(task, df, semaphore, errors, reports, metric_configuration, metric_summaries)
+
+    return None
+
+def process_out_of_core(payload, user_pk, task_id, seed_sequence, row_group_rows):
+    """
+    Process a task out of core: the input is spilled to a local columnar directory, processed one row group at a time
+    from memory-mapped reads, and written to a columnar output directory, which the Task object points to. The memory
+    used by the processing is bounded by the size of a row group. The input records still arrive whole, in the task
+    payload, and are held in memory until they are spilled.
+
+    Only row-local steps can run one row group at a time. A plan with other steps fails the task, with an error for
+    each of their parameters, rather than leaving their columns untransformed (the views reject such requests
+    before they are queued). The metrics are merged from the summaries of each row group.
+
+    Args:
+        payload (dict): The task payload (see assync_process_data).
+        user_pk (int): The primary key of the user associated with this task.
+        task_id (str): The ID of the task.
+        seed_sequence (numpy.random.SeedSequence): The task seed sequence. Each row group draws from its own child streams.
+        row_group_rows (int): Number of rows per row group.
+
+    Return:
+        None
+    """
+    errors = []
+    reports = []
+    semaphore = Semaphore()
+
+    description = payload.get('description', 'Object')
+    metric_configuration = {
+        "sensitive_columns": payload.get('sensitive_columns', []),
+        "closeness_columns": payload.get('closeness_columns', []),
+        "diversity_columns": payload.get('diversity_columns', []),
+        "l_diversity_error": payload.get('l_diversity_error'),
+    }
+    execution_parameters = payload.get('execution_parameters', {})
+
+    directory = get_task_directory(task_id)
+    input_directory = os.path.join(directory, 'input')
+    output_directory = os.path.join(directory, 'output')
+
+    try:
+        spill_records(payload.get('data', []), input_directory, row_group_rows)
+        reader = ColumnarReader(input_directory)
+    except Exception as e:
+        remove_task_files(directory)
+        errors.append({"parameter_id": 0, "algorithm": "out_of_core", "error_message": "Unespected Error: " + str(e)})
+        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='ERROR', errors = errors, seed=str(seed_sequence.entropy), real_data_k_anonymity="", real_data_l_diversity="", real_data_t_closeness="")
+        publish_task_event(task_id, user_pk, task.status)
+        return None
+
+    execution_plan = optimize_execution_parameters(execution_parameters, reader.columns)
+
+    a_error_message = False
+    try:
+        check_metric_columns(pd.DataFrame(columns=reader.columns), metric_configuration, semaphore)
+    except ValueError as ve:
+        a_error_message = str(ve)
+    except Exception as e:
+        a_error_message = "Unespected Error: " + str(e)
+
+    if a_error_message:
+        errors.append({"parameter_id": 0, "algorithm": "real_data_analysis", "error_message": a_error_message})
+
+    row_group_steps, global_steps = split_row_group_steps(execution_plan)
+    for step in global_steps:
+        for parameter in step['parameters']:
+            errors.append({"parameter_id": parameter['parameter_id'], "algorithm": parameter['algorithm'], "error_message": "The algorithm cannot run in out-of-core mode."})
+
+    if errors:
+        remove_task_files(directory)
+        task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='ERROR', errors = errors, seed=str(seed_sequence.entropy), real_data_k_anonymity="", real_data_l_diversity="", real_data_t_closeness="")
+        publish_task_event(task_id, user_pk, task.status)
+        return None
+
+    profile = profile_execution_parameters(reader.read_row_group(0), execution_parameters, semaphore)
+
+    task = Task.objects.create(task_id=task_id, description=description, user_id=user_pk, status='PENDING', seed=str(seed_sequence.entropy), profile=profile, execution_plan=describe_plan(execution_plan))
+    publish_task_event(task_id, user_pk, task.status, {"completed_row_groups": 0, "total_row_groups": len(reader.row_groups)})
+
+    carried_values = first_valid_values(reader, fill_columns(row_group_steps))
+    real_data_summaries, real_data_error = None, False
+    anonymized_data_summaries, anonymized_data_error = None, False
+    summary_arguments = (metric_configuration['sensitive_columns'], metric_configuration['closeness_columns'], metric_configuration['diversity_columns'], semaphore, metric_configuration['l_diversity_error'])
+    writer = ColumnarWriter(output_directory)
+
+    try:
+        for row_group_index, df in enumerate(reader.iter_row_groups()):
+            real_data_summaries, real_data_error = merge_row_group_summaries(df, real_data_summaries, real_data_error, summary_arguments)
+            fill_row_group(df, carried_values)
+
+            for step in row_group_steps:
+                for parameter in step['parameters']:
+                    parameter_id = parameter['parameter_id']
+                    parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id, row_group_index), "profile": profile})
+                apply_plan_step(step, df, semaphore, errors, reports)
+
+            decode_bytes(df)
+
+            anonymized_data_summaries, anonymized_data_error = merge_row_group_summaries(df, anonymized_data_summaries, anonymized_data_error, summary_arguments)
+
+            writer.write(df)
+            publish_task_event(task_id, user_pk, task.status, {"completed_row_groups": row_group_index + 1, "total_row_groups": len(reader.row_groups)})
+
+        writer.close()
+    except Exception as e:
+        remove_task_files(directory)
+        errors.append({"parameter_id": 0, "algorithm": "out_of_core", "error_message": "Unespected Error: " + str(e)})
+        task.status = 'ERROR'
+        task.errors = merge_errors(errors)
+        task.reports = merge_reports(reports)
+        task.save()
+        publish_task_event(task.task_id, task.user_id, task.status)
+        return None
+    finally:
+        remove_task_files(input_directory)
+
+    metrics = {}
+    for prefix, summaries, a_error_message, algorithm in [("real_data", real_data_summaries, real_data_error, "real_data_analysis"), ("anonymized_data", anonymized_data_summaries, anonymized_data_error, "anonymized_data_analysis")]:
+        if not a_error_message:
+            try:
+                metrics.update(zip([prefix + "_k_anonymity", prefix + "_t_closeness", prefix + "_l_diversity"], finalize_metric_summaries(summaries)))
+            except ValueError as ve:
+                a_error_message = str(ve)
+            except Exception as e:
+                a_error_message = "Unespected Error: " + str(e)
+
+        if a_error_message:
+            metrics.update({prefix + "_k_anonymity": "", prefix + "_t_closeness": "", prefix + "_l_diversity": ""})
+            errors.append({"parameter_id": 0, "algorithm": algorithm, "error_message": a_error_message})
+
+    errors = merge_errors(errors)
+    for field, value in metrics.items():
+        setattr(task, field, value)
+    task.status = 'COMPLETED_WITH_ERRORS' if errors else 'COMPLETED'
+    task.errors = errors
+    task.reports = merge_reports(reports)
+    task.result_file = output_directory
+    task.result_state = 'FILE'
+    task.save()
+
+    publish_task_event(task.task_id, task.user_id, task.status)
+
+    return None
+
+def merge_row_group_summaries(df, summaries, error_message, summary_arguments):
+    """
+    Summarize the metrics of a row group and merge them into the summaries of the previous row groups. Once a row
+    group cannot be summarized, the summaries stay None and the error of that row group is kept.
+
+    Args:
+        df (pd.DataFrame): The row group.
+        summaries (dict): The merged summaries of the previous row groups, or None.
+        error_message (str): The error of a previous row group, or False.
+        summary_arguments (tuple): The remaining arguments of summarize_metrics.
+
+    Return:
+        tuple: The merged summaries and the error message.
+    """
+    if error_message:
+        return None, error_message
+
+    try:
+        row_group_summaries = summarize_metrics(df, *summary_arguments)
+    except ValueError as ve:
+        return None, str(ve)
+    except Exception as e:
+        return None, "Unespected Error: " + str(e)
+
+    return (row_group_summaries if summaries is None else merge_metric_summaries(summaries, row_group_summaries)), False
+
+def complete_task(task, df, semaphore, errors, reports, metric_configuration, metric_summaries=None):
+    """
+    Measure the anonymized data and store it, with the metrics, errors and reports, in the Task object.
+
+    Args:
+        task (Task): The Task object.
+        df (pd.DataFrame): DataFrame containing the processed data.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        errors (list): The errors of the task.
+        reports (list): The reports of the task.
+        metric_configuration (dict): The metric configuration of the task, with the following keys:
+            - 'sensitive_columns' (list): List of columns containing sensitive attributes.
+            - 'closeness_columns' (list): List of columns for t-closeness measurement.
+            - 'diversity_columns' (list): List of columns containing attributes for diversity measurement.
+            - 'l_diversity_error' (float): The relative error of the approximate l-diversity, or None for the exact one.
+        metric_summaries (dict, optional): The merged metric summaries of the anonymized data, when already computed.
+
+    Return:
+        None
+    """
+    decode_bytes(df)
+
+    decoded_data = df.to_dict(orient='records')
+    processed_data = json.dumps(decoded_data)
+
+    anonymized_data_k_anonymity = ""
+    anonymized_data_t_closeness = ""
+    anonymized_data_l_diversity = ""
+    a_error_message = False
+
+    sensitive_columns = metric_configuration['sensitive_columns']
+    closeness_columns = metric_configuration['closeness_columns']
+    diversity_columns = metric_configuration['diversity_columns']
+
+    try:
+        if metric_summaries is not None:
+            anonymized_data_k_anonymity, anonymized_data_t_closeness, anonymized_data_l_diversity = finalize_metric_summaries(metric_summaries)
+        else:
             anonymized_data_k_anonymity = calculate_k_anonymity(df, sensitive_columns, semaphore)
             anonymized_data_t_closeness = calculate_t_closeness(df, sensitive_columns, closeness_columns, semaphore)
-            anonymized_data_l_diversity = calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore)
-        except ValueError as ve:
-            a_error_message = str(ve)
-        except Exception as e:
-            a_error_message = "Unespected Error: " + str(e)
+            anonymized_data_l_diversity = calculate_l_diversity(df, sensitive_columns, diversity_columns, semaphore, metric_configuration['l_diversity_error'])
+    except ValueError as ve:
+        a_error_message = str(ve)
+    except Exception as e:
+        a_error_message = "Unespected Error: " + str(e)
 
-        if a_error_message:
-            error_info = {
-                "parameter_id": 0,
-                "algorithm": "anonymized_data_analysis",
-                "error_message": a_error_message
-            }
-            errors.append(error_info)
+    if a_error_message:
+        error_info = {
+            "parameter_id": 0,
+            "algorithm": "anonymized_data_analysis",
+            "error_message": a_error_message
+        }
+        errors.append(error_info)
+
+    # The real data metrics may be recorded concurrently, so only the completion fields are saved, and the errors
+    # already recorded are kept.
+    with transaction.atomic():
+        errors = stored_errors(Task.objects.select_for_update().get(pk=task.pk)) + errors
 
         if errors:
             task.status = 'COMPLETED_WITH_ERRORS'
             task.result = processed_data
             task.errors = errors
+            task.reports = reports
             task.anonymized_data_k_anonymity = anonymized_data_k_anonymity
             task.anonymized_data_l_diversity = anonymized_data_l_diversity
             task.anonymized_data_t_closeness = anonymized_data_t_closeness
-            task.save()
+            task.save(update_fields=COMPLETION_FIELDS)
         else:
             task.status = 'COMPLETED'
             task.result = task.result = processed_data
+            task.reports = reports
             task.anonymized_data_k_anonymity = anonymized_data_k_anonymity
             task.anonymized_data_l_diversity = anonymized_data_l_diversity
             task.anonymized_data_t_closeness = anonymized_data_t_closeness
-            task.save()
-    
+            task.save(update_fields=COMPLETION_FIELDS)
+
+    publish_task_event(task.task_id, task.user_id, task.status)
+
+    return None
+
+def metric_columns(metric_configuration):
+    columns = []
+    for key in ['sensitive_columns', 'closeness_columns', 'diversity_columns']:
+        columns += [column for column in metric_configuration[key] if column not in columns]
+    return columns
+
+def check_metric_columns(df, metric_configuration, semaphore):
+    """
+    Checks the metric columns of a task before it starts, so a task with invalid columns fails at once.
+
+    Raises:
+        ValueError: If the sensitive, closeness or diversity columns are invalid or missing (see check_columns).
+    """
+    for key in ['sensitive_columns', 'closeness_columns', 'diversity_columns']:
+        if not isinstance(metric_configuration[key], list):
+            raise ValueError(f"The {key.replace('_', ' ')} should be a list.")
+        check_columns(df, metric_configuration[key], semaphore)
+
+def get_metric_executor():
+    """
+    Returns the executor of the real data metrics: a pool of ANONYMIZER_METRIC_PROCESSES worker processes, so the
+    metrics do not compete with the algorithms for the interpreter lock, or a single thread when the setting is 0.
+    Daemonic processes, such as the children of the Celery prefork pool, cannot start processes of their own, and
+    use the thread.
+    """
+    global _metric_executor
+    with _metric_executor_lock:
+        if _metric_executor is None:
+            processes = getattr(settings, 'ANONYMIZER_METRIC_PROCESSES', 1)
+            if processes and not multiprocessing.current_process().daemon:
+                _metric_executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                _metric_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='anonymizer-metrics')
+        return _metric_executor
+
+def submit_real_data_metrics(snapshot, metric_configuration):
+    """
+    Start measuring the real data, from a snapshot of its metric columns that the algorithms do not modify. A broken
+    pool is replaced, and a pool that cannot start its processes is replaced by the thread for good.
+
+    Args:
+        snapshot (pd.DataFrame): The metric columns of the real data.
+        metric_configuration (dict): The metric configuration of the task (see complete_task).
+
+    Return:
+        concurrent.futures.Future: The future of the k-anonymity, t-closeness and l-diversity.
+    """
+    global _metric_executor
+    arguments = (snapshot, metric_configuration['sensitive_columns'], metric_configuration['closeness_columns'], metric_configuration['diversity_columns'], metric_configuration['l_diversity_error'])
+
+    executor = get_metric_executor()
+    try:
+        return executor.submit(calculate_snapshot_metrics, *arguments)
+    except BrokenProcessPool:
+        with _metric_executor_lock:
+            if _metric_executor is executor:
+                _metric_executor = None
+    except Exception:
+        if not isinstance(executor, ProcessPoolExecutor):
+            raise
+        with _metric_executor_lock:
+            if _metric_executor is executor:
+                _metric_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='anonymizer-metrics')
+
+    return get_metric_executor().submit(calculate_snapshot_metrics, *arguments)
+
+def record_real_data_metrics(task_id, real_data_metrics):
+    """
+    Wait for the real data metrics and store them in the Task object. A failure of the metrics is added to the
+    errors of the task, which may have completed in the meantime.
+
+    Args:
+        task_id (str): The ID of the task.
+        real_data_metrics (concurrent.futures.Future): The future of submit_real_data_metrics.
+
+    Return:
+        None
+    """
+    metrics = {"real_data_k_anonymity": "", "real_data_t_closeness": "", "real_data_l_diversity": ""}
+    a_error_message = False
+
+    try:
+        metrics = dict(zip(["real_data_k_anonymity", "real_data_t_closeness", "real_data_l_diversity"], real_data_metrics.result()))
+    except ValueError as ve:
+        a_error_message = str(ve)
+    except Exception as e:
+        a_error_message = "Unespected Error: " + str(e)
+
+    with transaction.atomic():
+        task = Task.objects.select_for_update().get(task_id=task_id)
+        for field, value in metrics.items():
+            setattr(task, field, value)
+        update_fields = list(metrics)
+
+        if a_error_message:
+            task.errors = stored_errors(task) + [{"parameter_id": 0, "algorithm": "real_data_analysis", "error_message": a_error_message}]
+            update_fields.append('errors')
+            if task.status == 'COMPLETED':
+                task.status = 'COMPLETED_WITH_ERRORS'
+                update_fields.append('status')
+
+        task.save(update_fields=update_fields)
+
     return None
 
+def stored_errors(task):
+    if isinstance(task.errors, list):
+        return list(task.errors)
+    return ast.literal_eval(task.errors) if task.errors else []
+
+@shared_task
+def apply_retention_policies():
+    """
+    Applies the retention policies to the task results, and reclaims the freed database space. Scheduled periodically
+    by Celery beat (see CELERY_BEAT_SCHEDULE).
+
+    Return:
+        dict: The summary of the retention run.
+    """
+    summary = apply_retention()
+    summary.update(reclaim_space())
+
+    return summary
+
 def sync_process_data(payload):
     """
     Process the provided data using the specified algorithms and parameters. 
@@ -169,6 +623,7 @@ def sync_process_data(payload):
     Args:
         payload (dict): A dictionary containing 'data' and 'execution_parameters'.
                      'data' (list): List of dictionaries representing the input data.
+                     'seed' (int, optional): Seed of the random generators, used to replay the processing exactly.
                      'execution_parameters' (list): List of dictionaries containing the processing parameters.
                         Each dictionary contains the following keys:
                             - 'algorithm' (str): Name of the algorithm to apply.
@@ -182,27 +637,119 @@ def sync_process_data(payload):
     df = value_to_dataframe(payload.get('data', []))
 
     semaphore = Semaphore()
+    seed_sequence = create_seed_sequence(payload.get('seed'))
 
     execution_parameters = payload.get('execution_parameters', {})
+    profile = profile_execution_parameters(df, execution_parameters, semaphore)
+    execution_plan = optimize_execution_parameters(execution_parameters, df.columns.tolist())
 
-    for parameter_id, parameter in enumerate(execution_parameters, start=1):
-        algorithm = parameter.get('algorithm', {})
-        configuration = parameter.get('configuration', {})
-        configuration.update({"parameter_id": parameter_id})
-        columns = parameter.get('columns', {})
-        apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_id, errors)
+    for step in execution_plan:
+        for parameter in step['parameters']:
+            parameter_id = parameter['parameter_id']
+            parameter['configuration'].update({"parameter_id": parameter_id, "seed_sequence": spawn_seed_sequence(seed_sequence, parameter_id), "profile": profile})
+        apply_plan_step(step, df, semaphore, errors)
 
-    for column in df.columns:
-            df[column] = df[column].apply(lambda x: x.decode('utf-8', errors='replace') if isinstance(x, bytes) else x)
+    decode_bytes(df)
 
     decoded_data = df.to_dict(orient='records')
     processed_data = json.dumps(decoded_data)
 
     return processed_data
 
-def apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_id, errors):
+def profile_execution_parameters(df, execution_parameters, semaphore):
+    """
+    Profile, from a bounded sample, every input column used by the execution parameters. The profile is given to the
+    algorithms, which use it to plan their conversions.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the data to be processed.
+        execution_parameters (list): List of dictionaries containing the processing parameters.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+
+    Return:
+        dict: The profile of each column, or an empty dictionary when the columns cannot be profiled.
+    """
+    columns = []
+    for parameter in execution_parameters:
+        parameter_columns = parameter.get('columns', [])
+        if isinstance(parameter_columns, list):
+            columns += [column for column in parameter_columns if isinstance(column, str) and column in df.columns and column not in columns]
+
+    try:
+        return profile_dataframe(df, columns, semaphore)
+    except Exception:
+        return {}
+
+def apply_plan_step_after(dependencies, step, df, semaphore, errors, reports=None):
+    """
+    Wait for the plan steps a step depends on (see service.planning.step_dependencies), then apply it. The executor
+    starts the steps in plan order, so the steps waited for have already started, and waiting cannot exhaust its threads.
+
+    Args:
+        dependencies (list): The futures of the steps to wait for.
+
+    Return:
+        None
+    """
+    wait(dependencies)
+    apply_plan_step(step, df, semaphore, errors, reports)
+
+    return None
+
+def apply_plan_step(step, df, semaphore, errors, reports=None):
     """
-    Apply the specified algorithm to the DataFrame using the provided configuration and columns.
+    Apply a step of the execution plan to the DataFrame. Fused steps convert and check their columns once and apply
+    the transforms of all their parameters in a single pass.
+
+    Args:
+        step (dict): The plan step (see service.planning.optimize_execution_parameters).
+        df (pd.DataFrame): DataFrame containing the data to be processed.
+        semaphore (threading.Semaphore): Semaphore to synchronize access to the DataFrame.
+        errors (list): List that receives the errors of the step parameters.
+        reports (list, optional): List that receives the reports of the step parameters, if any.
+
+    Return:
+        None
+    """
+    if step['algorithm'] != FUSED_ALGORITHM:
+        parameter = step['parameters'][0]
+        apply_algorithm(parameter['algorithm'], parameter['configuration'], step['columns'], df, semaphore, parameter['parameter_id'], errors, reports)
+        return None
+
+    transforms = []
+    fused_parameters = []
+    for parameter in step['parameters']:
+        try:
+            transforms.append(COLUMN_TRANSFORMS[parameter['algorithm']](**parameter['configuration']))
+            fused_parameters.append(parameter)
+        except ValueError as ve:
+            errors.append({"parameter_id": parameter['parameter_id'], "algorithm": parameter['algorithm'], "error_message": str(ve)})
+        except Exception as e:
+            errors.append({"parameter_id": parameter['parameter_id'], "algorithm": parameter['algorithm'], "error_message": "Unespected Error: " + str(e)})
+
+    if not transforms:
+        return None
+
+    error_message = False
+    snapshot = snapshot_columns(df, step['columns'], semaphore)
+    try:
+        apply_string_transforms(df, step['columns'], semaphore, transforms)
+    except ValueError as ve:
+        error_message = str(ve)
+    except Exception as e:
+        error_message = "Unespected Error: " + str(e)
+
+    if error_message:
+        restore_columns(df, snapshot, semaphore)
+        for parameter in fused_parameters:
+            errors.append({"parameter_id": parameter['parameter_id'], "algorithm": parameter['algorithm'], "error_message": error_message})
+
+    return None
+
+def apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_id, errors, reports=None):
+    """
+    Apply the specified algorithm to the DataFrame using the provided configuration and columns. The columns of the
+    algorithm are recorded beforehand, so a failed algorithm is rolled back and leaves the DataFrame as it found it.
 
     Args:
         algorithm (str): Name of the algorithm to apply.
@@ -210,6 +757,8 @@ def apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_
         columns (dict): Column-specific configuration parameters.
         df (pd.DataFrame): DataFrame containing the data to be processed.
         parameter_id (int): ID of the current processing parameter.
+        errors (list): List that receives the errors of the algorithm.
+        reports (list, optional): List that receives the report returned by the algorithm, if any.
 
     Return:
         None
@@ -217,15 +766,21 @@ def apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_
 
     algorithm_function = ALGORITHM_FUNCTIONS.get(algorithm)
     error_message = False
+    report = None
 
 
     if algorithm_function:
+        snapshot = snapshot_columns(df, columns, semaphore)
         try:
-            algorithm_function(df, columns, semaphore, **configuration)
+            report = algorithm_function(df, columns, semaphore, **configuration)
         except ValueError as ve:
             error_message = str(ve)
         except Exception as e:
             error_message = "Unespected Error: " + str(e)
+
+        if error_message:
+            parameter = {"algorithm": algorithm, "configuration": configuration, "parameter_id": parameter_id}
+            restore_columns(df, snapshot, semaphore, created_columns({"columns": columns if isinstance(columns, list) else [], "parameters": [parameter]}))
     else:
         error_message = "Invalid algorithm name:" + str(algorithm)
 
@@ -237,4 +792,12 @@ def apply_algorithm(algorithm, configuration, columns, df, semaphore, parameter_
         }
         errors.append(error_info)
 
+    if report and reports is not None:
+        report_info = {
+            "parameter_id": parameter_id,
+            "algorithm": algorithm,
+            "report": report
+        }
+        reports.append(report_info)
+
     return None
@@ -0,0 +1,198 @@
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from threading import Semaphore
+from types import SimpleNamespace
+from unittest import mock
+from anonymizer.lib.generalization import mondrian_generalization
+from anonymizer.lib.masking import mask_patterns
+from anonymizer.utils.data_analysis import calculate_snapshot_metrics, earth_movers_distances, finalize_metric_summaries, merge_metric_summaries, summarize_metrics
+from anonymizer.utils.data_patterns import compile_patterns
+from .planning import optimize_execution_parameters
+from .tasks import process_out_of_core
+import io
+import json
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+def plan_summary(steps):
+    return [(step['algorithm'], step['columns']) for step in steps]
+
+class ExecutionPlanTests(SimpleTestCase):
+    def test_drop_of_a_grouping_column_is_not_hoisted(self):
+        execution_parameters = [
+            {'algorithm': 'swap.rows', 'columns': ['a'], 'configuration': {'group_by': 'g'}},
+            {'algorithm': 'null_out.columns', 'columns': ['g']},
+        ]
+
+        steps = optimize_execution_parameters(execution_parameters, ['a', 'g'])
+
+        self.assertEqual(plan_summary(steps), [('swap.rows', ['a']), ('null_out.columns', ['g'])])
+
+    def test_transform_of_a_grouping_column_is_not_pruned(self):
+        execution_parameters = [
+            {'algorithm': 'mask.full', 'columns': ['g']},
+            {'algorithm': 'swap.rows', 'columns': ['a'], 'configuration': {'group_by': 'g'}},
+            {'algorithm': 'null_out.columns', 'columns': ['g']},
+        ]
+
+        steps = optimize_execution_parameters(execution_parameters, ['a', 'g'])
+
+        self.assertEqual(plan_summary(steps), [('mask.full', ['g']), ('swap.rows', ['a']), ('null_out.columns', ['g'])])
+
+    def test_encryption_of_a_dropped_column_keeps_its_nonce_column(self):
+        execution_parameters = [
+            {'algorithm': 'encrypt.chacha20', 'columns': ['a'], 'configuration': {'key': 'key'}},
+            {'algorithm': 'null_out.columns', 'columns': ['a']},
+        ]
+
+        steps = optimize_execution_parameters(execution_parameters, ['a'])
+
+        self.assertEqual(plan_summary(steps), [('encrypt.chacha20', ['a']), ('null_out.columns', ['a'])])
+
+    def test_transforms_of_dropped_columns_are_pruned_and_drops_hoisted(self):
+        execution_parameters = [
+            {'algorithm': 'hash.md5', 'columns': ['a', 'b']},
+            {'algorithm': 'mask.full', 'columns': ['a', 'b']},
+            {'algorithm': 'null_out.columns', 'columns': ['b']},
+        ]
+
+        steps = optimize_execution_parameters(execution_parameters, ['a', 'b'])
+
+        self.assertEqual(plan_summary(steps), [('null_out.columns', ['b']), ('plan.fused', ['a'])])
+
+class PatternTests(SimpleTestCase):
+    def test_combined_matcher_identifies_each_pattern(self):
+        matcher, names = compile_patterns({'cpf': None, 'code': r'(?i:ab)(?P<digit>\d)(?P=digit)'})
+
+        matches = [(match.lastgroup, match.group()) for match in matcher.finditer('123.456.789-09 and AB77, ab12')]
+
+        self.assertEqual(names, ['cpf', 'code'])
+        self.assertEqual(matches, [('cpf', '123.456.789-09'), ('code', 'AB77')])
+
+    def test_patterns_that_change_meaning_in_the_alternation_are_rejected(self):
+        for expression in [r'(\d)\1', r'(?i)abc', r'x*', r'\b']:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    compile_patterns({'pattern': expression})
+
+    def test_errors_point_into_the_user_pattern(self):
+        with self.assertRaisesRegex(ValueError, "Invalid pattern 'pattern': .* at position 2"):
+            compile_patterns({'cpf': None, 'pattern': 'ab(c'})
+
+    def test_hits_are_counted_per_pattern_and_column(self):
+        df = pd.DataFrame({'text': ['a@b.com 123.456.789-09', 'x 111.222.333-44', 'nothing']})
+
+        report = mask_patterns(df, ['text'], Semaphore(), patterns=['email', 'cpf'])
+
+        self.assertEqual(report, {"pattern_hits": {'text': {'email': 1, 'cpf': 2}}})
+        self.assertEqual(df['text'].tolist(), ['******* **************', 'x **************', 'nothing'])
+
+def metrics_dataframe(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'age': rng.integers(20, 30, rows),
+        'city': rng.choice(list('abcd'), rows),
+        'salary': rng.integers(1, 5, rows) * 1000,
+        'disease': rng.choice(['x', 'y', 'z'], rows),
+    })
+
+def direct_earth_movers_distances(class_codes, value_codes, counts, class_count, ordered):
+    value_count = value_codes.max() + 1
+    overall = np.bincount(value_codes, weights=counts, minlength=value_count) / counts.sum()
+    distances = np.full(class_count, np.nan)
+    for code in np.unique(class_codes):
+        selected = class_codes == code
+        distribution = np.bincount(value_codes[selected], weights=counts[selected], minlength=value_count) / counts[selected].sum()
+        if ordered:
+            distances[code] = np.abs(np.cumsum(distribution) - np.cumsum(overall)).sum() / (value_count - 1)
+        else:
+            distances[code] = np.abs(distribution - overall).sum() / 2
+    return distances
+
+class MetricTests(SimpleTestCase):
+    def test_earth_movers_distances_match_the_cumulative_sums(self):
+        rng = np.random.default_rng(0)
+        entries = pd.DataFrame({'cls': rng.integers(0, 6, 40), 'value': rng.integers(0, 9, 40)}).value_counts().reset_index()
+        class_codes = entries['cls'].to_numpy()
+        value_codes = entries['value'].to_numpy()
+        counts = entries['count'].to_numpy(dtype=float)
+
+        for ordered in [True, False]:
+            with self.subTest(ordered=ordered):
+                expected = direct_earth_movers_distances(class_codes, value_codes, counts, 7, ordered)
+                np.testing.assert_allclose(earth_movers_distances(class_codes, value_codes, counts, 7, ordered), expected)
+
+    def test_merged_partition_summaries_equal_the_whole_dataset(self):
+        df = metrics_dataframe(300)
+        arguments = (['age', 'city'], ['salary'], ['disease'], Semaphore())
+
+        summaries = [summarize_metrics(df.iloc[start:start + 70], *arguments) for start in range(0, len(df), 70)]
+        merged = summaries[0]
+        for summary in summaries[1:]:
+            merged = merge_metric_summaries(merged, summary)
+
+        self.assertEqual(finalize_metric_summaries(merged), finalize_metric_summaries(summarize_metrics(df, *arguments)))
+        self.assertEqual(finalize_metric_summaries(merged), calculate_snapshot_metrics(df, *arguments[:3]))
+
+class GeneralizationTests(SimpleTestCase):
+    def test_every_mondrian_class_has_at_least_k_rows(self):
+        for k in [1, 7, 50]:
+            with self.subTest(k=k):
+                df = metrics_dataframe(300)
+
+                report = mondrian_generalization(df, ['age', 'city', 'salary'], Semaphore(), k=k)
+
+                self.assertGreaterEqual(report['smallest_partition'], k)
+                self.assertGreaterEqual(df.groupby(['age', 'city', 'salary']).size().min(), k)
+
+class RecordedTask(SimpleNamespace):
+    def save(self):
+        pass
+
+def record_tasks(tasks):
+    # The service app has no migrations, so the test database has no Task table.
+    objects = mock.patch('service.tasks.Task.objects').start()
+    objects.create.side_effect = lambda **fields: tasks.append(RecordedTask(**fields)) or tasks[-1]
+    return objects
+
+class OutOfCoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tasks = []
+        record_tasks(self.tasks)
+        self.addCleanup(mock.patch.stopall)
+
+    def test_dropped_metric_column_completes_with_an_analysis_error(self):
+        payload = {
+            "data": [{"a": str(row % 3), "b": str(row)} for row in range(100)],
+            "sensitive_columns": ["a"],
+            "execution_parameters": [{"algorithm": "null_out.columns", "columns": ["a"]}],
+        }
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(ANONYMIZER_OUT_OF_CORE_DIR=directory, ANONYMIZER_TASK_EVENTS=False):
+            process_out_of_core(payload, None, 'task', np.random.SeedSequence(0), 30)
+
+            task = self.tasks[0]
+            self.assertEqual(task.status, 'COMPLETED_WITH_ERRORS')
+            self.assertEqual([error['algorithm'] for error in task.errors], ['anonymized_data_analysis'])
+            self.assertEqual(task.real_data_k_anonymity, '33')
+            self.assertEqual(task.anonymized_data_k_anonymity, '')
+            self.assertEqual(os.listdir(os.path.join(directory, 'task')), ['output'])
+
+class AnonymizeFileTests(SimpleTestCase):
+    def test_dropped_metric_column_reports_an_analysis_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path, output_path, plan_path = (os.path.join(directory, name) for name in ['input.csv', 'output.csv', 'plan.json'])
+            pd.DataFrame({'a': [row % 3 for row in range(100)], 'b': range(100)}).to_csv(input_path, index=False)
+            with open(plan_path, 'w') as plan_file:
+                json.dump({"sensitive_columns": ["a"], "execution_parameters": [{"algorithm": "null_out.columns", "columns": ["a"]}]}, plan_file)
+
+            call_command('anonymize_file', input_path, output_path, plan=plan_path, processes=2, chunk_rows=30, stdout=io.StringIO(), stderr=io.StringIO())
+
+            with open(output_path + '.report.json') as report_file:
+                report = json.load(report_file)
+            self.assertEqual(report['status'], 'COMPLETED_WITH_ERRORS')
+            self.assertEqual([error['algorithm'] for error in report['errors']], ['anonymized_data_analysis'])
+            self.assertEqual(report['real_data_k_anonymity'], '33')
+            self.assertEqual(pd.read_csv(output_path).columns.tolist(), ['b'])
@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     path('anonymize/sync', views.anonymize_sync, name='anonymize_sync'),
     path('anonymize/async', views.anonymize_async, name='anonymize_async'),
+    path('estimate', views.estimate, name='estimate'),
+    path('profile', views.profile, name='profile'),
     path('results', views.results, name='results'),
     path('result_detail/<str:task_id>', views.result_detail, name='result_detail'),
+    path('result_download/<str:task_id>', views.result_download, name='result_download'),
+    path('result_events/<str:task_id>', views.task_events, name='task_events'),
+    path('token_cache_statistics', views.token_cache_statistics, name='token_cache_statistics'),
     path('register', views.register, name='register'),  
     path('login', views.login, name='login'),         
 ]
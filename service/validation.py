@@ -0,0 +1,108 @@
+from anonymizer.utils.registry import check_configuration, column_fields, get_schema
+from .out_of_core import get_row_group_rows
+from .planning import created_columns
+
+METRIC_COLUMN_KEYS = ['sensitive_columns', 'closeness_columns', 'diversity_columns']
+
+def validate_payload(payload):
+    """
+    Checks an anonymization payload before it is queued, without building its DataFrame or loading the algorithms:
+    the metric columns, and every execution parameter against the schema of its algorithm (see
+    anonymizer.utils.registry.ALGORITHM_SCHEMAS) and the columns of the data. The columns created, dropped and
+    replaced by the earlier parameters are followed, so a parameter may use the output column of an earlier one, but
+    not a column an earlier one removed.
+
+    When the payload runs out of core (see service.out_of_core.get_row_group_rows), the algorithms that are not
+    row-local are rejected, since they cannot run one row group at a time.
+
+    Checks that need the data values, such as type conversions, are left to the algorithms.
+
+    Args:
+        payload (dict): The request payload (see service.tasks.assync_process_data).
+
+    Returns:
+        list: The errors, in the format of the task errors. Empty when the payload is valid.
+    """
+    data = payload.get('data')
+    if not isinstance(data, list):
+        return [{"parameter_id": 0, "algorithm": None, "error_message": "Data should be a list of objects."}]
+
+    errors = []
+    columns = set().union(*(record for record in data if isinstance(record, dict)))
+
+    out_of_core = False
+    try:
+        row_group_rows = get_row_group_rows(payload)
+        out_of_core = row_group_rows is not None and len(data) > row_group_rows
+    except ValueError as ve:
+        errors.append({"parameter_id": 0, "algorithm": None, "error_message": str(ve)})
+
+    for key in METRIC_COLUMN_KEYS:
+        try:
+            if not isinstance(payload.get(key, []), list):
+                raise ValueError(f"The {key.replace('_', ' ')} should be a list.")
+            check_payload_columns(payload.get(key, []), columns)
+        except ValueError as ve:
+            errors.append({"parameter_id": 0, "algorithm": "real_data_analysis", "error_message": str(ve)})
+
+    execution_parameters = payload.get('execution_parameters')
+    if not isinstance(execution_parameters, list):
+        errors.append({"parameter_id": 0, "algorithm": None, "error_message": "Execution parameters should be a list."})
+        return errors
+
+    available_columns = set(columns)
+
+    for parameter_id, parameter in enumerate(execution_parameters, start=1):
+        if not isinstance(parameter, dict):
+            errors.append({"parameter_id": parameter_id, "algorithm": None, "error_message": "Execution parameter should be an object."})
+            continue
+
+        algorithm = parameter.get('algorithm')
+        schema = get_schema(algorithm)
+        if schema is None:
+            errors.append({"parameter_id": parameter_id, "algorithm": algorithm, "error_message": "Invalid algorithm name:" + str(algorithm)})
+            continue
+
+        parameter_columns = parameter.get('columns')
+        configuration = parameter.get('configuration', {})
+
+        try:
+            if not isinstance(parameter_columns, list):
+                raise ValueError("Columns should be a list.")
+            check_payload_columns(parameter_columns, available_columns)
+            check_configuration(schema['configuration'], configuration)
+            check_payload_columns([configuration[field] for field in column_fields(schema['configuration']) if configuration.get(field) is not None], available_columns)
+        except ValueError as ve:
+            errors.append({"parameter_id": parameter_id, "algorithm": algorithm, "error_message": str(ve)})
+            continue
+
+        if out_of_core and not schema['row_local']:
+            errors.append({"parameter_id": parameter_id, "algorithm": algorithm, "error_message": "The algorithm cannot run in out-of-core mode."})
+
+        if schema['structure'] in ['drops_columns', 'replaces_columns']:
+            available_columns -= set(parameter_columns)
+        if schema['structure'] in ['adds_columns', 'replaces_columns']:
+            step = {"columns": parameter_columns, "parameters": [{"parameter_id": parameter_id, "algorithm": algorithm, "configuration": configuration}]}
+            available_columns.update(created_columns(step))
+
+    return errors
+
+def check_payload_columns(columns, available_columns):
+    """
+    Checks a list of columns against the columns of the data, as anonymizer.utils.data_processing.check_columns
+    checks them against a DataFrame.
+
+    Raises:
+        ValueError: If a column is not a string, is duplicated, or is missing from the data.
+    """
+    for column in columns:
+        if not isinstance(column, str):
+            raise ValueError(f"Invalid column type. Column name must be a string: {column}")
+
+    duplicate_columns = [column for index, column in enumerate(columns) if column in columns[:index]]
+    if duplicate_columns:
+        raise ValueError(f"The following columns are duplicated in the list: {duplicate_columns}")
+
+    missing_columns = [column for column in columns if column not in available_columns]
+    if missing_columns:
+        raise ValueError(f"The following columns are missing in the DataFrame: {missing_columns}")
@@ -1,15 +1,30 @@
 from rest_framework.decorators import api_view, parser_classes, authentication_classes, permission_classes
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
-from .tasks import assync_process_data, sync_process_data
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .authentication import CachedTokenAuthentication, token_cache_stats
+from threading import Semaphore
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.conf import settings
 from .models import Task
+from .retention import get_task_result
+from .distribution import get_partition_rows
+from .out_of_core import get_row_group_rows, stream_result_file
+from .estimation import estimate_cost, should_route_to_async
+from .admission import AdmissionRejected, check_content_length, check_row_count, get_limits, offload_view, run_admitted
+from .events import task_event_stream
+from .validation import validate_payload
+from .result_cache import get_cached_result, get_cached_task, is_cacheable, result_cache_key, set_cached_result, set_cached_task
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
 import json
 
+# The processing modules (service.tasks, pandas, NumPy and the algorithm libraries) are imported by the views that use
+# them, so web workers do not load them at startup, and workers serving only the other endpoints never do.
+
 @api_view(['POST'])
 @parser_classes([JSONParser])
 def register(request):
@@ -67,7 +82,7 @@ def login(request):
     return Response({"token": token.key}, status=200)
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def results(request):
     """
@@ -92,7 +107,7 @@ def results(request):
     return Response(results)
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def result_detail(request, task_id):
     """
@@ -114,8 +129,14 @@ def result_detail(request, task_id):
             "description": str(task.description),
             "created_at": str(task.creation_date),
             "status": str(task.status),
-            "results": str(task.result),
+            "results": str(get_task_result(task)),
+            "result_state": str(task.result_state),
+            "result_file": str(task.result_file),
             "errors": str(task.errors),
+            "reports": str(task.reports),
+            "seed": str(task.seed),
+            "profile": str(task.profile),
+            "execution_plan": str(task.execution_plan),
             "real_data_k_anonymity": str(task.real_data_k_anonymity),
             "real_data_t_closeness": str(task.real_data_t_closeness),
             "real_data_l_diversity": str(task.real_data_l_diversity),
@@ -127,6 +148,66 @@ def result_detail(request, task_id):
     except Task.DoesNotExist:
         return Response({"message": "Task not found."}, status=404)
     
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def result_download(request, task_id):
+    """
+    Endpoint to download the result file of an out-of-core task, as newline-delimited JSON streamed one row group at
+    a time.
+
+    Args:
+        request (rest_framework.request.Request): The HTTP request object.
+        task_id (str): The ID of the task.
+
+    Return:
+        django.http.StreamingHttpResponse: The 'application/x-ndjson' response.
+    """
+    task = Task.objects.filter(task_id=task_id, user=request.user).only('result_file').first()
+
+    if task is None:
+        return Response({"message": "Task not found."}, status=404)
+
+    if not task.result_file:
+        return Response({"message": "The task has no result file."}, status=404)
+
+    response = StreamingHttpResponse(stream_result_file(task.result_file), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{task_id}.ndjson"'
+
+    return response
+
+
+async def task_events(request, task_id):
+    """
+    Endpoint to stream the status and progress changes of a task as server-sent events, until the task finishes.
+    It replaces polling 'result_detail' for completion. Serve the application over ASGI ('config.asgi') so that waiting
+    clients do not hold a worker thread.
+
+    Args:
+        request (django.http.HttpRequest): The HTTP request object.
+        task_id (str): The ID of the task.
+
+    Return:
+        django.http.StreamingHttpResponse: The 'text/event-stream' response.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    try:
+        authentication = await sync_to_async(CachedTokenAuthentication().authenticate)(request)
+    except AuthenticationFailed as af:
+        return JsonResponse({"detail": str(af.detail)}, status=401)
+
+    if authentication is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    user, _ = authentication
+
+    response = StreamingHttpResponse(task_event_stream(task_id, user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
 
 def check_required_fields(data, fields):
     for field in fields:
@@ -134,10 +215,20 @@ def check_required_fields(data, fields):
             return False
     return True
 
+def admission_response(rejection):
+    headers = {"Retry-After": str(rejection.retry_after)} if rejection.retry_after else None
+    return Response({"message": str(rejection)}, status=rejection.status, headers=headers)
+
+def check_seed(data):
+    seed = data.get('seed')
+    if seed is None:
+        return True
+    return isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0
+
 
 @api_view(['POST'])
 @parser_classes([JSONParser])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def anonymize_async(request):
     """
@@ -154,8 +245,46 @@ def anonymize_async(request):
     if not check_required_fields(data, ['execution_parameters', 'sensitive_columns', 'diversity_columns','closeness_columns', 'data']):
         return Response({"message": "Missing required attributes in the JSON data."}, status=400)
 
+    if not check_seed(data):
+        return Response({"message": "Seed should be a non-negative integer."}, status=400)
+
+    try:
+        get_partition_rows(data)
+        get_row_group_rows(data)
+    except ValueError as ve:
+        return Response({"message": str(ve)}, status=400)
+
+    # The payload is validated before the processing modules are imported, so rejected requests do not load them.
+    errors = validate_payload(data)
+    if errors:
+        return Response({"message": "Invalid anonymization request.", "errors": errors}, status=400)
+
+    from anonymizer.utils.sketches import precision_for_error
+    from .tasks import assync_process_data
+
+    try:
+        if data.get('l_diversity_error') is not None:
+            precision_for_error(data.get('l_diversity_error'))
+    except ValueError as ve:
+        return Response({"message": str(ve)}, status=400)
+
+    cache_key = None
+    if is_cacheable(data):
+        cache_key = result_cache_key('async', data, request.user.pk)
+        cached_task_id = get_cached_task(cache_key, request.user.pk)
+        if cached_task_id:
+            response = {
+                "message": "An identical anonymization task has already been scheduled.",
+                "task_id": cached_task_id,
+                "cached": True
+            }
+            return Response(response, status=200)
+
     task = assync_process_data.delay(data, request.user.pk)
 
+    if cache_key:
+        set_cached_task(cache_key, task.id)
+
     response = {
         "message": "Anonymization task has been scheduled.",
         "task_id": task.id
@@ -163,9 +292,10 @@ def anonymize_async(request):
 
     return Response(response, status=202)
 
+@offload_view
 @api_view(['POST'])
 @parser_classes([JSONParser])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def anonymize_sync(request):
     """
@@ -177,14 +307,163 @@ def anonymize_sync(request):
     Return:
         rest_framework.response.Response: The HTTP response object containing the processed data. 
     """
+    from .tasks import assync_process_data, sync_process_data
+
+    limits = get_limits(request.user.pk)
+
+    try:
+        check_content_length(request.META, limits)
+    except AdmissionRejected as ar:
+        return admission_response(ar)
+
     data = request.data
 
     if not check_required_fields(data, ['execution_parameters', 'data']):
         return Response({"message": "Missing required attributes in the JSON data."}, status=400)
 
+    if not check_seed(data):
+        return Response({"message": "Seed should be a non-negative integer."}, status=400)
+
     try:
-        response = json.dumps(str(sync_process_data(data)))
+        route_to_async, estimate = should_route_to_async(data)
+    except ValueError as ve:
+        return Response({"message": str(ve)}, status=400)
+
+    if route_to_async and check_required_fields(data, ['sensitive_columns', 'diversity_columns', 'closeness_columns']):
+        errors = validate_payload(data)
+        if errors:
+            return Response({"message": "Invalid anonymization request.", "errors": errors}, status=400)
+
+        task = assync_process_data.delay(data, request.user.pk)
+
+        response = {
+            "message": "The estimated processing time exceeds the synchronous limit. Anonymization task has been scheduled.",
+            "task_id": task.id,
+            "estimate": estimate
+        }
+
+        return Response(response, status=202)
+
+    cache_key = result_cache_key('sync', data, request.user.pk) if is_cacheable(data) else None
+    if cache_key:
+        processed_data = get_cached_result(cache_key)
+        if processed_data is not None:
+            return Response(json.dumps(str(processed_data)))
+
+    try:
+        check_row_count(data.get('data'), limits)
+        processed_data = run_admitted(request.user.pk, limits, sync_process_data, data)
+        if cache_key:
+            set_cached_result(cache_key, processed_data)
+        response = json.dumps(str(processed_data))
+    except AdmissionRejected as ar:
+        return admission_response(ar)
     except:
         response = {"Message": "An error occurred while processing the data. Use the asynchronous route for more details."}
 
     return Response(response)
+
+@api_view(['POST'])
+@parser_classes([JSONParser])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def profile(request):
+    """
+    Endpoint to profile the columns of a dataset from a bounded sample, before submitting an anonymization task.
+
+    Args:
+        request (rest_framework.request.Request): The HTTP request object.
+
+    Return:
+        rest_framework.response.Response: The HTTP response object containing the profile of each column.
+    """
+    limits = get_limits(request.user.pk)
+
+    try:
+        check_content_length(request.META, limits)
+    except AdmissionRejected as ar:
+        return admission_response(ar)
+
+    data = request.data
+
+    if not check_required_fields(data, ['data']):
+        return Response({"message": "Missing required attributes in the JSON data."}, status=400)
+
+    from anonymizer.utils.data_processing import value_to_dataframe
+    from anonymizer.utils.data_profiling import profile_dataframe
+
+    try:
+        check_row_count(data.get('data'), limits)
+        df = value_to_dataframe(data.get('data'))
+        columns = data.get('columns') or df.columns.tolist()
+        response = profile_dataframe(df, columns, Semaphore(), sample_size=data.get('sample_size', 1000), seed=data.get('seed'))
+    except AdmissionRejected as ar:
+        return admission_response(ar)
+    except ValueError as ve:
+        return Response({"message": str(ve)}, status=400)
+    except Exception:
+        return Response({"message": "An error occurred while profiling the data."}, status=400)
+
+    return Response(response)
+
+@api_view(['POST'])
+@parser_classes([JSONParser])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def estimate(request):
+    """
+    Endpoint to estimate the runtime and peak memory of an anonymization request, and the route it should use.
+
+    Args:
+        request (rest_framework.request.Request): The HTTP request object.
+
+    Return:
+        rest_framework.response.Response: The HTTP response object containing the estimates of both routes.
+    """
+    limits = get_limits(request.user.pk)
+
+    try:
+        check_content_length(request.META, limits)
+    except AdmissionRejected as ar:
+        return admission_response(ar)
+
+    data = request.data
+
+    if not check_required_fields(data, ['execution_parameters', 'data']):
+        return Response({"message": "Missing required attributes in the JSON data."}, status=400)
+
+    try:
+        check_row_count(data.get('data'), limits)
+        sync_estimate = estimate_cost(data)
+        async_estimate = estimate_cost(data, asynchronous=True)
+    except AdmissionRejected as ar:
+        return admission_response(ar)
+    except ValueError as ve:
+        return Response({"message": str(ve)}, status=400)
+    except Exception:
+        return Response({"message": "An error occurred while estimating the request."}, status=400)
+
+    threshold = getattr(settings, 'ANONYMIZER_SYNC_ROUTING_THRESHOLD_SECONDS', 5.0)
+
+    response = {
+        "sync": sync_estimate,
+        "async": async_estimate,
+        "recommended_route": "async" if sync_estimate['estimated_seconds'] > threshold else "sync"
+    }
+
+    return Response(response)
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAdminUser])
+def token_cache_statistics(request):
+    """
+    Endpoint to retrieve the hit, miss and invalidation counters of the token cache of the serving process.
+
+    Args:
+        request (rest_framework.request.Request): The HTTP request object.
+
+    Return:
+        rest_framework.response.Response: The HTTP response object containing the counters and the hit rate.
+    """
+    return Response(token_cache_stats.as_dict())